@@ -5,7 +5,7 @@ a = Analysis(
     ['collector.py'],
     pathex=[],
     binaries=[],
-    datas=[('topics.json', '.')],
+    datas=[('topics.json', '.'), ('rules.json', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local alert rules evaluated on the live event stream, shared by both collectors
+
+Alerting from Elasticsearch waits for ingest plus a watcher poll; AlertEngine
+evaluates rules as each event is counted and hands alerts to AlertDispatcher,
+which posts them to webhooks.
+
+Alert file (JSON):
+  {
+    "webhooks": {"ops": {"url": "https://hooks.example.com/audiohook", "headers": {"Authorization": "..."}}},
+    "rules": [
+      {"name": "integration-errors", "match": {"severity": ["ERROR", "CRITICAL"]},
+       "group_by": ["integration"], "window_seconds": 60, "threshold": 20,
+       "cooldown_seconds": 300, "webhook": "ops"},
+      {"name": "code-spike", "group_by": ["event_id"], "window_seconds": 300,
+       "rate_change": 4.0, "min_count": 10}
+    ]
+  }
+
+- Fields are event_id, integration, topic, severity and conversation.
+  `match` keeps events whose field equals one of the listed values;
+  `group_by` keeps one window (and one cooldown) per distinct value tuple.
+- `threshold` fires once a group has that many events in the last
+  `window_seconds`; `rate_change` fires once the count is that many times
+  the previous window's (and at least `min_count`). A rule may have both.
+- A group fires at most once per `cooldown_seconds` (default: the window).
+- Each group keeps 2 x 10 buckets (this window and the previous one) with
+  running sums, so an event costs O(1) per matching rule; buckets expire
+  lazily as time advances. Groups idle for two windows are dropped once
+  `max_groups` is reached.
+- The dispatcher queue is bounded: when webhooks cannot keep up, alerts are
+  dropped and counted rather than delaying events. Alerts queued together
+  for the same webhook are posted as one {"alerts": [...]} request; failed
+  requests are retried with exponential backoff.
+
+Evaluation runs on the event loop; its cost is measured per event
+(stats['eval_ns'] / stats['events']).
+"""
+
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import aiohttp
+
+FIELDS = ('event_id', 'integration', 'topic', 'severity', 'conversation')
+BUCKETS = 10  # Per window
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class AlertRule:
+    """A compiled alert rule"""
+
+    __slots__ = ('name', 'match', 'group_by', 'window', 'threshold', 'rate_change', 'min_count',
+                 'cooldown', 'webhook', 'width')
+
+    def __init__(self, spec: Dict[str, Any]):
+        if not isinstance(spec, dict) or not isinstance(spec.get('name'), str):
+            raise ValueError(f'alert rule needs a name: {spec!r}')
+        self.name = spec['name']
+        unknown = (set(spec.get('match', {})) | set(spec.get('group_by', []))) - set(FIELDS)
+        if unknown:
+            raise ValueError(f'alert rule {self.name}: unknown fields {sorted(unknown)}')
+        self.match = [(FIELDS.index(field), frozenset(values if isinstance(values, list) else [values]))
+                      for field, values in spec.get('match', {}).items()]
+        self.group_by = tuple(FIELDS.index(field) for field in spec.get('group_by', []))
+        self.window = float(spec.get('window_seconds', 60))
+        self.threshold = spec.get('threshold')
+        self.rate_change = spec.get('rate_change')
+        self.min_count = int(spec.get('min_count', 1))
+        if self.window <= 0:
+            raise ValueError(f'alert rule {self.name}: window_seconds must be positive')
+        if self.threshold is None and self.rate_change is None:
+            raise ValueError(f'alert rule {self.name}: needs threshold and/or rate_change')
+        self.cooldown = float(spec.get('cooldown_seconds', self.window))
+        self.webhook = spec.get('webhook', 'default')
+        self.width = self.window / BUCKETS
+
+
+def load_alert_rules(path: str) -> Tuple[List[AlertRule], Dict[str, Dict[str, Any]]]:
+    """(rules, webhooks) from an alert file; raises ValueError or OSError"""
+    with open(path, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    if not isinstance(spec, dict):
+        raise ValueError('alert file must be a JSON object')
+    webhooks = {}
+    for name, hook in spec.get('webhooks', {}).items():
+        hook = {'url': hook} if isinstance(hook, str) else hook
+        if not isinstance(hook, dict) or not hook.get('url'):
+            raise ValueError(f'webhook {name} needs a url')
+        webhooks[name] = hook
+    rules = [AlertRule(rule) for rule in spec.get('rules', [])]
+    names = [rule.name for rule in rules]
+    if len(set(names)) != len(names):
+        raise ValueError('alert rule names must be unique')
+    return rules, webhooks
+
+
+class GroupWindow:
+    """Event counts of one group over this window and the previous one, in buckets"""
+
+    __slots__ = ('counts', 'epoch', 'current', 'previous', 'fired_at')
+
+    def __init__(self, epoch: int):
+        self.counts = [0] * (2 * BUCKETS)
+        self.epoch = epoch
+        self.current = 0  # Buckets (epoch - BUCKETS, epoch]
+        self.previous = 0  # Buckets (epoch - 2 * BUCKETS, epoch - BUCKETS]
+        self.fired_at: Optional[float] = None
+
+    def advance(self, epoch: int):
+        if epoch - self.epoch >= 2 * BUCKETS:
+            self.counts = [0] * (2 * BUCKETS)
+            self.current = self.previous = 0
+        else:
+            counts = self.counts
+            for step in range(self.epoch + 1, epoch + 1):
+                moving = counts[(step - BUCKETS) % (2 * BUCKETS)]
+                self.current -= moving
+                self.previous += moving
+                slot = step % (2 * BUCKETS)  # Also the slot of step - 2 * BUCKETS
+                self.previous -= counts[slot]
+                counts[slot] = 0
+        self.epoch = epoch
+
+
+class AlertEngine:
+    """Evaluates alert rules per event and hands fired alerts to `dispatch`"""
+
+    def __init__(self, rules: List[AlertRule], dispatch: Callable[[Dict[str, Any]], Any],
+                 max_groups: int = 10000, source: str = 'collector', clock=time.monotonic):
+        self.rules = rules
+        self.dispatch = dispatch
+        self.max_groups = max_groups
+        self.source = source
+        self.clock = clock
+        self._groups: List[Dict[Tuple, GroupWindow]] = [{} for _ in rules]
+        self.stats = {
+            'rules': len(rules),
+            'events': 0,
+            'eval_ns': 0,
+            'fired': {rule.name: 0 for rule in rules},
+            'suppressed': 0,  # Conditions met during a cooldown
+            'groups': 0,
+            'groups_dropped': 0
+        }
+
+    def observe(self, event_id: Optional[str], integration: Optional[str], topic: Optional[str],
+                severity: Optional[str], conversation: Optional[str]):
+        """Count one event against every matching rule, firing alerts whose condition is met"""
+        started = time.perf_counter_ns()
+        values = (event_id, integration, topic, severity, conversation)
+        now = self.clock()
+        for rule, groups in zip(self.rules, self._groups):
+            for index, allowed in rule.match:
+                if values[index] not in allowed:
+                    break
+            else:
+                key = tuple(values[index] for index in rule.group_by)
+                epoch = int(now / rule.width)
+                group = groups.get(key)
+                if group is None:
+                    group = self._new_group(rule, groups, key, epoch)
+                    if group is None:
+                        continue
+                elif epoch != group.epoch:
+                    group.advance(epoch)
+                group.counts[epoch % (2 * BUCKETS)] += 1
+                group.current += 1
+                self._check(rule, key, group, now)
+        self.stats['events'] += 1
+        self.stats['eval_ns'] += time.perf_counter_ns() - started
+
+    def _new_group(self, rule: AlertRule, groups: Dict[Tuple, GroupWindow], key: Tuple,
+                   epoch: int) -> Optional[GroupWindow]:
+        if len(groups) >= self.max_groups:
+            for stale in [k for k, g in groups.items() if epoch - g.epoch >= 2 * BUCKETS]:
+                del groups[stale]
+            if len(groups) >= self.max_groups:
+                self.stats['groups_dropped'] += 1
+                return None
+        group = groups[key] = GroupWindow(epoch)
+        self.stats['groups'] = sum(len(g) for g in self._groups)
+        return group
+
+    def _check(self, rule: AlertRule, key: Tuple, group: GroupWindow, now: float):
+        kind = None
+        if rule.threshold is not None and group.current >= rule.threshold:
+            kind = 'threshold'
+        elif (rule.rate_change is not None and group.current >= rule.min_count and
+              group.current >= rule.rate_change * group.previous):
+            kind = 'rate_change'
+        if kind is None:
+            return
+        if group.fired_at is not None and now - group.fired_at < rule.cooldown:
+            self.stats['suppressed'] += 1
+            return
+        group.fired_at = now
+        self.stats['fired'][rule.name] += 1
+        self.dispatch({
+            'alert': rule.name,
+            'kind': kind,
+            'group': {FIELDS[index]: value for index, value in zip(rule.group_by, key)},
+            'count': group.current,
+            'previous_count': group.previous,
+            'window_seconds': rule.window,
+            'threshold': rule.threshold,
+            'rate_change': rule.rate_change,
+            'webhook': rule.webhook,
+            'fired_at': datetime.now(timezone.utc).isoformat(),
+            'source': self.source
+        })
+
+    def snapshot(self) -> Dict[str, Any]:
+        events = self.stats['events']
+        return dict(self.stats, eval_ns_per_event=round(self.stats['eval_ns'] / events) if events else None)
+
+
+class AlertDispatcher:
+    """Bounded queue of alerts posted to webhooks by a few worker tasks, with retries"""
+
+    def __init__(self, webhooks: Dict[str, Dict[str, Any]], queue_size: int = 1000, concurrency: int = 2,
+                 max_retries: int = 3, timeout: float = 5.0, retry_base: float = 0.5, retry_max: float = 10.0,
+                 batch_max: int = 50, on_error: Optional[Callable[[str, Exception], None]] = None):
+        self.webhooks = webhooks
+        self.on_error = on_error  # Called with (webhook, error) for unexpected delivery errors
+        self.queue: asyncio.Queue = asyncio.Queue(max(1, queue_size))
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.batch_max = max(1, batch_max)
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._workers: List[asyncio.Task] = []
+        self.stats = {
+            'queued': 0,
+            'dropped': 0,
+            'requests': 0,
+            'sent': 0,
+            'failed': 0,
+            'retries': 0,
+            'last_latency_ms': None,
+            'last_error': None
+        }
+
+    def start(self):
+        if self._workers:
+            return
+        if self.session is None:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def submit(self, alert: Dict[str, Any]):
+        """Queue an alert without waiting; drops it (and counts) when the queue is full"""
+        try:
+            self.queue.put_nowait(alert)
+            self.stats['queued'] += 1
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+
+    async def _worker(self):
+        while True:
+            alerts = [await self.queue.get()]
+            while len(alerts) < self.batch_max and not self.queue.empty():
+                alerts.append(self.queue.get_nowait())
+            by_webhook: Dict[str, List[Dict[str, Any]]] = {}
+            for alert in alerts:
+                by_webhook.setdefault(alert['webhook'], []).append(alert)
+            try:
+                for name, grouped in by_webhook.items():
+                    try:
+                        await self._post(name, grouped)
+                    except Exception as e:
+                        # E.g. an invalid webhook URL or an unencodable alert: fail the group, keep the worker
+                        self.stats['failed'] += len(grouped)
+                        self.stats['last_error'] = f'{name}: {e!r}'[:200]
+                        if self.on_error:
+                            self.on_error(name, e)
+            finally:
+                for _ in alerts:
+                    self.queue.task_done()
+
+    async def _post(self, name: str, alerts: List[Dict[str, Any]]):
+        hook = self.webhooks.get(name)
+        if hook is None:
+            self.stats['failed'] += len(alerts)
+            self.stats['last_error'] = f'no webhook named {name}'
+            return
+        body = json.dumps({'alerts': alerts}).encode('utf-8')
+        headers = {'Content-Type': 'application/json', **hook.get('headers', {})}
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats['retries'] += 1
+                await asyncio.sleep(random.uniform(0, min(self.retry_max, self.retry_base * 2 ** (attempt - 1))))
+            self.stats['requests'] += 1
+            started = time.monotonic()
+            try:
+                async with self.session.post(hook['url'], data=body, headers=headers) as resp:
+                    self.stats['last_latency_ms'] = round((time.monotonic() - started) * 1000, 2)
+                    if resp.status < 300:
+                        self.stats['sent'] += len(alerts)
+                        return
+                    self.stats['last_error'] = f'{name}: HTTP {resp.status}'
+                    if resp.status not in RETRYABLE_STATUSES:
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.stats['last_error'] = f'{name}: {e!r}'[:200]
+        self.stats['failed'] += len(alerts)
+
+    async def close(self, timeout: float = 5.0):
+        """Deliver what is queued (for up to `timeout` seconds), then stop the workers"""
+        if self._workers:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            for task in self._workers:
+                task.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(self.stats, pending=self.queue.qsize(), webhooks=sorted(self.webhooks))
@@ -16,18 +16,50 @@ Features:
 """
 
 import asyncio
+import gzip
 import json
+import multiprocessing
 import os
+import random
+import re
+import shutil
 import signal
 import sys
 import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from operator import itemgetter
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
 import aiohttp
 from aiohttp import web
 
+try:
+    import zstandard as zstd
+except ImportError:  # Optional dependency for COMPRESSION=zstd
+    zstd = None
+
+import codec
+import columnar
+import metrics
+import segment_index
+from alerts import AlertDispatcher, AlertEngine, load_alert_rules
+from channels import ChannelPool, ChannelState, OverlapFilter
+from dedup import DedupCache, event_key
+from event_store import EventStore
+from logpipe import EventLogSampler, LogPipeline
+from partition import PartitionedPool
+from rules import RuleEngine
+from segment_index import list_segments
+from spool import BulkSpool, replay_spool
+from token_manager import TokenManager
+from topic_cache import TopicCache
+from window_stats import EventStats
+
 # ----------------------- Configuration -----------------------
 def getenv_bool(name: str, default: bool = False) -> bool:
     return os.environ.get(name, str(default)).lower() in ('true', '1', 'yes', 'on')
@@ -36,6 +68,10 @@ def getenv_bool(name: str, default: bool = False) -> bool:
 GENESYS_ENV = os.environ.get('GENESYS_ENV', 'usw2.pure.cloud')
 CLIENT_ID = os.environ.get('GENESYS_CLIENT_ID', '')
 CLIENT_SECRET = os.environ.get('GENESYS_CLIENT_SECRET', '')
+GENESYS_LOGIN_URL = os.environ.get('GENESYS_LOGIN_URL', '').rstrip('/')  # Default: https://login.{GENESYS_ENV}
+GENESYS_API_URL = os.environ.get('GENESYS_API_URL', '').rstrip('/')  # Default: https://api.{GENESYS_ENV}
+TOKEN_REFRESH_MARGIN_SECONDS = float(os.environ.get('TOKEN_REFRESH_MARGIN_SECONDS', '300'))  # Renew this long before expiry
+TOKEN_CACHE_FILE = os.environ.get('TOKEN_CACHE_FILE', '')  # Optional 0600 token cache for fast restarts
 
 # AudioHook Topic Configuration
 AUDIOHOOK_TOPICS = [
@@ -44,70 +80,988 @@ AUDIOHOOK_TOPICS = [
     'v2.auditing.integration.audiohook'
 ]
 CUSTOM_TOPICS_FILE = os.environ.get('TOPICS_FILE', './topics.json')
+TOPIC_CACHE_FILE = os.environ.get('TOPIC_CACHE_FILE', './topic_cache.json')  # Empty keeps the cache in memory only
+TOPIC_CACHE_TTL_SECONDS = float(os.environ.get('TOPIC_CACHE_TTL_SECONDS', '86400'))  # 0 = rediscover on every start
 FALLBACK_TOPICS = ['channel.metadata']  # Safe fallback for testing
 
+# Classification Rules (see rules.py; a missing file means the built-in AudioHook rules)
+RULES_FILE = os.environ.get('RULES_FILE', './rules.json')
+RULES_RELOAD_SECONDS = float(os.environ.get('RULES_RELOAD_SECONDS', '5'))  # 0 disables hot reload
+
 # Output Configuration
 OUTPUT_FILE = os.environ.get('OUTPUT_FILE', './audiohook_events.jsonl')
 MAX_FILE_SIZE = int(os.environ.get('MAX_FILE_SIZE', '10485760'))  # 10MB default
-BACKUP_COUNT = int(os.environ.get('BACKUP_COUNT', '5'))
+ROTATE_INTERVAL_SECONDS = int(os.environ.get('ROTATE_INTERVAL_SECONDS', '3600'))  # 0 = size-based only
+COMPRESSION = os.environ.get('COMPRESSION', 'gzip').strip().lower()  # 'gzip', 'zstd' or 'none'
+RETENTION_MAX_BYTES = int(os.environ.get('RETENTION_MAX_BYTES', '1073741824'))  # 1GB of closed segments
+RETENTION_MAX_AGE_HOURS = float(os.environ.get('RETENTION_MAX_AGE_HOURS', '168'))  # 7 days
+SEGMENT_INDEX_LINES = int(os.environ.get('SEGMENT_INDEX_LINES', '1000'))  # Lines per time-index block, 0 disables
 CONSOLE_OUTPUT = getenv_bool('CONSOLE_OUTPUT', True)
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').strip().upper()  # DEBUG, INFO, WARN or ERROR
+LOG_ASYNC = getenv_bool('LOG_ASYNC', True)  # Format and write log lines on a background thread
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))  # Lines beyond this are dropped, not waited on
+EVENT_LOG_SAMPLE_EVERY = int(os.environ.get('EVENT_LOG_SAMPLE_EVERY', '0'))  # Log 1 in N events, 0 = none, 1 = all
+EVENT_LOG_ROLLUP_SECONDS = float(os.environ.get('EVENT_LOG_ROLLUP_SECONDS', '10'))  # Per-code counts, 0 disables
+RAW_PASSTHROUGH = getenv_bool('RAW_PASSTHROUGH', False)  # Splice original eventBody text as raw_event
+
+# Parquet Export (optional, needs pyarrow; empty PARQUET_DIR disables it)
+PARQUET_DIR = os.environ.get('PARQUET_DIR', '')
+PARQUET_COMPRESSION = os.environ.get('PARQUET_COMPRESSION', 'zstd').strip().lower()  # zstd, snappy, gzip or none
+PARQUET_ROW_GROUP_ROWS = int(os.environ.get('PARQUET_ROW_GROUP_ROWS', '50000'))
+PARQUET_ROLL_SECONDS = float(os.environ.get('PARQUET_ROLL_SECONDS', '300'))  # Close and publish files this often
+PARQUET_MAX_FILE_BYTES = int(os.environ.get('PARQUET_MAX_FILE_BYTES', '134217728'))  # 128MB
+
+# Event Store (SQLite, queried through /events filters; empty EVENT_STORE_PATH disables it)
+EVENT_STORE_PATH = os.environ.get('EVENT_STORE_PATH', '')
+EVENT_STORE_RETENTION_HOURS = float(os.environ.get('EVENT_STORE_RETENTION_HOURS', '168'))  # 0 keeps everything
+EVENT_QUERY_MAX = int(os.environ.get('EVENT_QUERY_MAX', '1000'))  # Largest page /events returns from the store
+
+# Write Durability Settings
+FLUSH_POLICY = os.environ.get('FLUSH_POLICY', 'interval').strip().lower()  # 'event' or 'interval'
+FLUSH_INTERVAL_MS = int(os.environ.get('FLUSH_INTERVAL_MS', '200'))
+FSYNC_EVERY = int(os.environ.get('FSYNC_EVERY', '0'))  # fsync every N events, 0 disables
+WRITE_BATCH_SIZE = int(os.environ.get('WRITE_BATCH_SIZE', '500'))
 
 # Elasticsearch Configuration (Optional)
 ELASTIC_URL = os.environ.get('ELASTIC_URL', '')
 ELASTIC_AUTH = os.environ.get('ELASTIC_AUTH', '')
 ELASTIC_INDEX = os.environ.get('ELASTIC_INDEX', 'genesys-audiohook')
 BULK_SIZE = int(os.environ.get('BULK_SIZE', '50'))
+BULK_MAX_BYTES = int(os.environ.get('BULK_MAX_BYTES', '5242880'))  # 5MB payload cap
+BULK_MAX_SECONDS = float(os.environ.get('BULK_MAX_SECONDS', '5'))
+BULK_CONCURRENCY = int(os.environ.get('BULK_CONCURRENCY', '2'))
+BULK_MAX_RETRIES = int(os.environ.get('BULK_MAX_RETRIES', '5'))
+RETRY_BASE_SLEEP = float(os.environ.get('RETRY_BASE_SLEEP', '1.0'))
+RETRY_MAX_SLEEP = float(os.environ.get('RETRY_MAX_SLEEP', '30.0'))
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+# Elasticsearch Outage Spool (empty SPOOL_DIR disables spooling)
+SPOOL_DIR = os.environ.get('SPOOL_DIR', './elastic_spool')
+SPOOL_SEGMENT_BYTES = int(os.environ.get('SPOOL_SEGMENT_BYTES', '16777216'))  # 16MB
+SPOOL_MAX_BYTES = int(os.environ.get('SPOOL_MAX_BYTES', '1073741824'))  # 1GB
+SPOOL_REPLAY_RATE = float(os.environ.get('SPOOL_REPLAY_RATE', '5'))  # bulk payloads per second
+
+# Duplicate Suppression (keys also become Elasticsearch _ids)
+DEDUP_WINDOW_SECONDS = float(os.environ.get('DEDUP_WINDOW_SECONDS', '300'))  # 0 disables suppression
+DEDUP_MAX_ENTRIES = int(os.environ.get('DEDUP_MAX_ENTRIES', '100000'))
+DEDUP_BLOOM_BITS = int(os.environ.get('DEDUP_BLOOM_BITS', '0'))  # 0 = exact cache only
+
+# Pipeline Settings
+INGEST_QUEUE_SIZE = int(os.environ.get('INGEST_QUEUE_SIZE', '10000'))
+SINK_QUEUE_SIZE = int(os.environ.get('SINK_QUEUE_SIZE', '10000'))
+QUEUE_FULL_POLICY = os.environ.get('QUEUE_FULL_POLICY', 'block').strip().lower()  # 'block' or 'drop'
+PROCESS_WORKERS = int(os.environ.get('PROCESS_WORKERS', '0'))  # Decode/format in N processes, 0 = on the event loop
+WORKER_BATCH_SIZE = int(os.environ.get('WORKER_BATCH_SIZE', '200'))  # Frames per hand-off to a worker
 
 # HTTP Status Server
 HTTP_PORT = int(os.environ.get('HTTP_PORT', '8077'))
 HTTP_HOST = os.environ.get('HTTP_HOST', '0.0.0.0')
+RECENT_EVENTS_MAX = int(os.environ.get('RECENT_EVENTS_MAX', '500'))  # Ring buffer size for /events
+RECENT_EVENTS_DEFAULT = 50
+STORE_QUERY_PARAMS = ('conversation_id', 'code', 'event_id', 'entity_id', 'from', 'to', 'cursor')  # /events -> store
+STATS_TOP_K = int(os.environ.get('STATS_TOP_K', '10'))  # Noisiest conversations/integrations on /stats, 0 disables
+STATS_TOP_K_SECONDS = float(os.environ.get('STATS_TOP_K_SECONDS', '300'))  # Top-K covers the last 1-2 periods
+
+# Local Alerts (see alerts.py; a missing file disables alerting)
+ALERT_RULES_FILE = os.environ.get('ALERT_RULES_FILE', './alerts.json')
+ALERT_WEBHOOK_URL = os.environ.get('ALERT_WEBHOOK_URL', '')  # The 'default' webhook, for rules that name none
+ALERT_QUEUE_SIZE = int(os.environ.get('ALERT_QUEUE_SIZE', '1000'))  # Alerts waiting for a webhook; more are dropped
+ALERT_CONCURRENCY = int(os.environ.get('ALERT_CONCURRENCY', '2'))  # Webhook requests in flight
+ALERT_MAX_RETRIES = int(os.environ.get('ALERT_MAX_RETRIES', '3'))
+ALERT_TIMEOUT_SECONDS = float(os.environ.get('ALERT_TIMEOUT_SECONDS', '5'))
+ALERT_MAX_GROUPS = int(os.environ.get('ALERT_MAX_GROUPS', '10000'))  # Group windows kept per rule
 
 # Connection Settings
 RECONNECT_DELAY = float(os.environ.get('RECONNECT_DELAY', '5.0'))
 MAX_RECONNECT_DELAY = float(os.environ.get('MAX_RECONNECT_DELAY', '60.0'))
+CHANNEL_COUNT = int(os.environ.get('CHANNEL_COUNT', '1'))  # Notification channels to spread topics over
+MAX_TOPICS_PER_CHANNEL = int(os.environ.get('MAX_TOPICS_PER_CHANNEL', '1000'))  # Genesys per-channel limit
+CHANNEL_ROTATE_SECONDS = float(os.environ.get('CHANNEL_ROTATE_SECONDS', '82800'))  # 23h; channels expire after 24h (0 disables)
+CHANNEL_OVERLAP_SECONDS = float(os.environ.get('CHANNEL_OVERLAP_SECONDS', '5'))  # Old and new socket run together
 
 # ----------------------- Utilities -----------------------
 def now_iso():
     return datetime.now(timezone.utc).isoformat()
 
+LOGS = LogPipeline(('timestamp', 'level', 'message'), LOG_LEVEL, LOG_QUEUE_SIZE, LOG_ASYNC)
+
 def log(level: str, message: str, **kwargs):
-    """Structured logging"""
-    entry = {
-        'timestamp': now_iso(),
-        'level': level,
-        'message': message,
-        **kwargs
-    }
-    output = json.dumps(entry, ensure_ascii=False)
-    if CONSOLE_OUTPUT:
-        print(output, flush=True)
+    """Structured logging; filtered here, formatted and written by the log thread"""
+    if CONSOLE_OUTPUT and LOGS.enabled_for(level):
+        LOGS.emit(level, message, kwargs)
+
+def segment_path(filepath: Path, when: Optional[datetime] = None) -> Path:
+    """Timestamped name for a closed segment, e.g. audiohook_events-20240115T103045Z.jsonl"""
+    stamp = (when or datetime.now(timezone.utc)).strftime('%Y%m%dT%H%M%SZ')
+    candidate = filepath.with_name(f'{filepath.stem}-{stamp}{filepath.suffix}')
+    counter = 1
+    while any(candidate.with_name(candidate.name + ext).exists() for ext in ('', '.gz', '.zst')):
+        candidate = filepath.with_name(f'{filepath.stem}-{stamp}-{counter}{filepath.suffix}')
+        counter += 1
+    return candidate
 
-def rotate_file(filepath: Path):
-    """Simple file rotation"""
+def rotate_file(filepath: Path, force: bool = False) -> Optional[Path]:
+    """Move the active file to a timestamped segment; returns the segment path"""
     if not filepath.exists():
-        return
+        return None
     
     # Check if rotation is needed
-    if filepath.stat().st_size < MAX_FILE_SIZE:
-        return
+    if not force and filepath.stat().st_size < MAX_FILE_SIZE:
+        return None
     
     try:
-        # Rotate existing backups
-        for i in range(BACKUP_COUNT - 1, 0, -1):
-            old_file = filepath.with_suffix(f'{filepath.suffix}.{i}')
-            new_file = filepath.with_suffix(f'{filepath.suffix}.{i + 1}')
-            if old_file.exists():
-                if new_file.exists():
-                    new_file.unlink()
-                old_file.rename(new_file)
-        
-        # Move current file to .1
-        backup_file = filepath.with_suffix(f'{filepath.suffix}.1')
-        if backup_file.exists():
-            backup_file.unlink()
-        filepath.rename(backup_file)
+        segment = segment_path(filepath)
+        filepath.rename(segment)
+        return segment
     except Exception as e:
         log('WARN', 'File rotation failed', error=str(e))
+        return None
+
+class SegmentManager:
+    """Compresses closed segments and applies retention in a worker thread
+
+    Retention removes the oldest segments while their total size exceeds
+    RETENTION_MAX_BYTES or once they are older than RETENTION_MAX_AGE_HOURS.
+    With SEGMENT_INDEX_LINES set, every index block is compressed as its own
+    gzip member / zstd frame and the segment's .idx sidecar records where,
+    so segment_index.read_range() decompresses only the blocks it needs.
+    """
+
+    def __init__(self, filepath: Path):
+        self.filepath = filepath
+        self.compression = COMPRESSION
+        if self.compression == 'zstd' and zstd is None:
+            log('WARN', 'zstandard not installed, falling back to gzip compression')
+            self.compression = 'gzip'
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='segments')
+        self.stats = {
+            'compression': self.compression,
+            'segments': 0,
+            'segment_bytes': 0,
+            'compressed': 0,
+            'compress_bytes_in': 0,
+            'compress_bytes_out': 0,
+            'last_compress_ms': None,
+            'deleted': 0,
+            'errors': 0
+        }
+
+    def start(self):
+        """Compress segments left uncompressed by a previous run and apply retention"""
+        for segment in list_segments(self.filepath):
+            if segment.suffix == self.filepath.suffix:
+                self.submit(segment)
+        self._executor.submit(self._apply_retention)
+
+    def submit(self, segment: Path):
+        self._executor.submit(self._process, segment)
+
+    def _process(self, segment: Path):
+        try:
+            self._compress(segment)
+        except Exception as e:
+            self.stats['errors'] += 1
+            log('ERROR', 'Segment compression failed', segment=str(segment), error=str(e))
+        self._apply_retention()
+
+    def _compress(self, segment: Path):
+        if self.compression == 'none':
+            return
+        ext = '.zst' if self.compression == 'zstd' else '.gz'
+        target = segment.with_name(segment.name + ext)
+        tmp = target.with_name(target.name + '.tmp')
+        started = time.monotonic()
+        index = None
+        if SEGMENT_INDEX_LINES > 0:
+            index = segment_index.load_index(segment) or segment_index.scan_index(segment, SEGMENT_INDEX_LINES)
+
+        with segment.open('rb') as src, tmp.open('wb') as dst:
+            if index is not None:
+                compress = zstd.ZstdCompressor().compress if self.compression == 'zstd' else gzip.compress
+                segment_index.compress_blocks(src, dst, index, self.compression, compress)
+            elif self.compression == 'zstd':
+                zstd.ZstdCompressor().copy_stream(src, dst)
+            else:
+                with gzip.GzipFile(filename=segment.name, mode='wb', fileobj=dst) as gz:
+                    shutil.copyfileobj(src, gz, 1024 * 1024)
+
+        size_in = segment.stat().st_size
+        os.replace(tmp, target)
+        if index is not None:
+            index['file'] = target.name
+            segment_index.write_index(target, index)
+        segment.unlink()
+        self.stats['compressed'] += 1
+        self.stats['compress_bytes_in'] += size_in
+        self.stats['compress_bytes_out'] += target.stat().st_size
+        self.stats['last_compress_ms'] = round((time.monotonic() - started) * 1000, 2)
+
+    def _apply_retention(self):
+        segments = list_segments(self.filepath)
+        sizes = {}
+        for segment in segments:
+            try:
+                sizes[segment] = segment.stat()
+            except OSError:
+                continue
+
+        total = sum(st.st_size for st in sizes.values())
+        cutoff = time.time() - RETENTION_MAX_AGE_HOURS * 3600 if RETENTION_MAX_AGE_HOURS > 0 else None
+        for segment, st in sorted(sizes.items(), key=lambda item: item[1].st_mtime):
+            expired = cutoff is not None and st.st_mtime < cutoff
+            oversized = RETENTION_MAX_BYTES > 0 and total > RETENTION_MAX_BYTES
+            if not (expired or oversized):
+                break
+            try:
+                segment.unlink()
+                segment_index.index_path(segment).unlink(missing_ok=True)
+                total -= st.st_size
+                del sizes[segment]
+                self.stats['deleted'] += 1
+            except OSError as e:
+                self.stats['errors'] += 1
+                log('WARN', 'Failed to delete old segment', segment=str(segment), error=str(e))
+
+        self.stats['segments'] = len(sizes)
+        self.stats['segment_bytes'] = total
+
+    def close(self):
+        """Wait for queued compression work to finish"""
+        self._executor.shutdown(wait=True)
+
+class JsonlWriter:
+    """Long-lived JSONL writer with group commits and in-memory rotation tracking
+
+    Lines are buffered and committed in batches according to FLUSH_POLICY:
+    'event' commits every line, 'interval' commits once FLUSH_INTERVAL_MS has
+    elapsed or WRITE_BATCH_SIZE lines are pending. FSYNC_EVERY > 0 additionally
+    fsyncs after that many events have been committed. The file is rotated
+    into a timestamped segment at MAX_FILE_SIZE or every ROTATE_INTERVAL_SECONDS,
+    and closed segments are handed to the SegmentManager, if any. With
+    SEGMENT_INDEX_LINES set, a sparse time index of the file is kept as lines
+    are committed and written next to each segment as it is closed.
+    """
+
+    def __init__(self, filepath: Path, segments: Optional['SegmentManager'] = None):
+        self.filepath = filepath
+        self.segments = segments
+        self._fh = None
+        self._size = 0
+        self._opened_at = time.monotonic()
+        self._pending: List[bytes] = []
+        self._received: List[float] = []  # Receive times of pending lines, for the latency histogram
+        self._stamps: List[Optional[str]] = []  # Event timestamps of pending lines, for the segment index
+        self.index = segment_index.BlockIndexer(SEGMENT_INDEX_LINES) if SEGMENT_INDEX_LINES > 0 else None
+        self._last_commit = time.monotonic()
+        self._unsynced = 0
+        self.latency = metrics.Histogram(
+            'audiohook_receive_to_write_seconds',
+            'Time from WebSocket frame receipt to the event being written to the output file')
+        self.stats = {
+            'lines_written': 0,
+            'bytes_written': 0,
+            'commits': 0,
+            'fsyncs': 0,
+            'rotations': 0,
+            'last_rotation_ms': None,
+            'write_errors': 0,
+            'pending': 0,
+            'flush_policy': FLUSH_POLICY,
+            'fsync_every': FSYNC_EVERY
+        }
+
+    def _open(self):
+        self._fh = self.filepath.open('ab')
+        self._size = self._fh.tell()  # Single size lookup per open
+        self._opened_at = time.monotonic()
+        if self.index is not None:
+            self.index.reset()
+            if self._size:
+                # Appending to a file from a previous run (or after a write error): index what is there
+                with self.filepath.open('rb') as existing:
+                    self.index.scan(existing)
+
+    def _rotation_due(self) -> bool:
+        if self._size >= MAX_FILE_SIZE:
+            return True
+        return (ROTATE_INTERVAL_SECONDS > 0 and self._size > 0 and
+                time.monotonic() - self._opened_at >= ROTATE_INTERVAL_SECONDS)
+
+    def write(self, line: bytes, received_at: Optional[float] = None, timestamp: Optional[str] = None):
+        """Queue an encoded event line, committing if the policy says so
+
+        `received_at` is the time.monotonic() at which the source frame arrived;
+        `timestamp` is the event's ISO-8601 timestamp, for the segment index.
+        """
+        self._pending.append(line + b'\n')
+        self._stamps.append(timestamp)
+        if received_at is not None:
+            self._received.append(received_at)
+        self.stats['pending'] = len(self._pending)
+        if (FLUSH_POLICY == 'event' or len(self._pending) >= WRITE_BATCH_SIZE or
+                time.monotonic() - self._last_commit >= FLUSH_INTERVAL_MS / 1000.0):
+            self.commit()
+
+    def maybe_commit(self):
+        """Commit pending lines once the flush interval has elapsed"""
+        if self._pending and time.monotonic() - self._last_commit >= FLUSH_INTERVAL_MS / 1000.0:
+            self.commit()
+        elif self._fh is not None and self._rotation_due():
+            self.rotate()
+
+    def commit(self):
+        """Write all pending lines in a single write + flush"""
+        self._last_commit = time.monotonic()
+        if not self._pending:
+            return
+
+        pending, stamps = self._pending, self._stamps
+        count = len(pending)
+        data = b''.join(pending)
+        received = self._received
+        self._pending, self._stamps = [], []
+        self._received = []
+        self.stats['pending'] = 0
+
+        try:
+            if self._fh is None:
+                self._open()
+            offset = self._size
+            self._fh.write(data)
+            self._fh.flush()
+            self._size += len(data)
+            if self.index is not None:
+                for line, stamp in zip(pending, stamps):
+                    self.index.add(offset, len(line), stamp)
+                    offset += len(line)
+            self._unsynced += count
+            self.stats['lines_written'] += count
+            self.stats['bytes_written'] += len(data)
+            self.stats['commits'] += 1
+
+            written_at = time.monotonic()
+            for received_at in received:
+                self.latency.observe(written_at - received_at)
+
+            if FSYNC_EVERY > 0 and self._unsynced >= FSYNC_EVERY:
+                os.fsync(self._fh.fileno())
+                self._unsynced = 0
+                self.stats['fsyncs'] += 1
+        except Exception as e:
+            log('ERROR', 'Failed to write events to file', error=str(e), lines=count)
+            self.stats['write_errors'] += 1
+            self._close_handle()
+            return
+
+        if self._rotation_due():
+            self.rotate()
+
+    def rotate(self):
+        """Close the active file and move it to a timestamped segment"""
+        started = time.monotonic()
+        self._close_handle()
+        segment = rotate_file(self.filepath, force=True)
+        self._size = 0
+        self._opened_at = time.monotonic()
+        if segment is None:
+            return
+        if self.index is not None:
+            try:
+                segment_index.write_index(segment, self.index.to_index(segment.name))
+            except OSError as e:
+                log('WARN', 'Failed to write segment index', segment=str(segment), error=str(e))
+            self.index.reset()
+        self.stats['rotations'] += 1
+        self.stats['last_rotation_ms'] = round((time.monotonic() - started) * 1000, 2)
+        if self.segments is not None:
+            self.segments.submit(segment)
+
+    def _close_handle(self):
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            except Exception:
+                pass
+            self._fh = None
+
+    def close(self):
+        """Commit pending lines, fsync if configured and release the handle"""
+        self.commit()
+        if self._fh is not None and FSYNC_EVERY > 0 and self._unsynced:
+            try:
+                os.fsync(self._fh.fileno())
+                self.stats['fsyncs'] += 1
+            except Exception:
+                pass
+        self._close_handle()
+
+class PipelineQueue:
+    """Bounded stage queue with depth, high-water mark and backpressure stats
+
+    When the queue is full, QUEUE_FULL_POLICY decides whether producers wait
+    ('block') or the item is discarded and counted ('drop').
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.stats = {
+            'depth': 0,
+            'capacity': maxsize,
+            'high_water': 0,
+            'enqueued': 0,
+            'dequeued': 0,
+            'dropped': 0,
+            'blocked': 0,
+            'blocked_seconds': 0.0
+        }
+
+    async def put(self, item: Any, force: bool = False) -> bool:
+        """Enqueue an item; returns False if it was dropped"""
+        if self.queue.full():
+            if QUEUE_FULL_POLICY == 'drop' and not force:
+                self.stats['dropped'] += 1
+                return False
+            self.stats['blocked'] += 1
+            started = time.monotonic()
+            await self.queue.put(item)
+            self.stats['blocked_seconds'] += time.monotonic() - started
+        else:
+            self.queue.put_nowait(item)
+
+        self.stats['enqueued'] += 1
+        depth = self.queue.qsize()
+        if depth > self.stats['high_water']:
+            self.stats['high_water'] = depth
+        return True
+
+    async def get(self) -> Any:
+        item = await self.queue.get()
+        self.stats['dequeued'] += 1
+        return item
+
+    def get_batch(self, max_items: int) -> List[Any]:
+        """Drain up to max_items already-queued items without waiting"""
+        items = []
+        while len(items) < max_items and not self.queue.empty():
+            items.append(self.queue.get_nowait())
+        self.stats['dequeued'] += len(items)
+        return items
+
+    def snapshot(self) -> Dict[str, Any]:
+        self.stats['depth'] = self.queue.qsize()
+        return dict(self.stats, blocked_seconds=round(self.stats['blocked_seconds'], 3))
+
+def elastic_auth_headers() -> Dict[str, str]:
+    """Authorization header for ELASTIC_AUTH ('user:pass', 'ApiKey ...', 'Bearer ...' or raw token)"""
+    if not ELASTIC_AUTH:
+        return {}
+    if ELASTIC_AUTH.lower().startswith(('bearer ', 'apikey ')):
+        return {'Authorization': ELASTIC_AUTH}
+    if ':' in ELASTIC_AUTH:
+        import base64
+        encoded = base64.b64encode(ELASTIC_AUTH.encode()).decode()
+        return {'Authorization': f'Basic {encoded}'}
+    return {'Authorization': f'Bearer {ELASTIC_AUTH}'}
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(RETRY_MAX_SLEEP, RETRY_BASE_SLEEP * (2 ** attempt)))
+
+class ElasticShipper:
+    """Batches events into _bulk requests with bounded concurrency and retries
+
+    A batch is flushed when it reaches BULK_SIZE docs, BULK_MAX_BYTES of
+    payload, or BULK_MAX_SECONDS of age. Up to BULK_CONCURRENCY requests are in
+    flight at once; failed requests and rejected items are retried with
+    exponential backoff and jitter up to BULK_MAX_RETRIES times. Batches that
+    still fail go to the on-disk spool (SPOOL_DIR) and are replayed at
+    SPOOL_REPLAY_RATE. While the cluster is failing, new batches are spooled
+    without a request; as soon as any request (usually a replay) succeeds,
+    new batches go straight to the cluster again and the backlog drains
+    alongside them, so live throughput never waits on the replay rate.
+    """
+
+    def __init__(self):
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.spool: Optional[BulkSpool] = None
+        self._replay_task: Optional[asyncio.Task] = None
+        self._docs: List[bytes] = []
+        self._bytes = 0
+        self._first_at: Optional[float] = None
+        self._slots = asyncio.Semaphore(BULK_CONCURRENCY)
+        self._inflight: set = set()
+        self.request_seconds = metrics.Histogram(
+            'audiohook_bulk_request_seconds', 'Elasticsearch _bulk request latency', ('outcome',))
+        self.payload_bytes = metrics.Histogram(
+            'audiohook_bulk_payload_bytes', 'Elasticsearch _bulk payload size', buckets=metrics.SIZE_BUCKETS)
+        self.stats = {
+            'docs_sent': 0,
+            'docs_dropped': 0,
+            'doc_errors': 0,
+            'bulk_requests': 0,
+            'bulk_failures': 0,
+            'retries': 0,
+            'inflight': 0,
+            'buffered_docs': 0,
+            'buffered_bytes': 0,
+            'flushes': {'docs': 0, 'bytes': 0, 'age': 0, 'shutdown': 0},
+            'cluster_ok': True,  # False from a failed request until the next successful one
+            'spool': None
+        }
+
+    def start(self):
+        """Open the outage spool and start replaying anything left from earlier runs"""
+        if not SPOOL_DIR or self.spool is not None:
+            return
+        try:
+            self.spool = BulkSpool(SPOOL_DIR, SPOOL_SEGMENT_BYTES, SPOOL_MAX_BYTES)
+        except OSError as e:
+            log('ERROR', 'Failed to open Elasticsearch spool, spooling disabled', error=str(e))
+            return
+        if self.spool.pending_batches:
+            log('INFO', 'Replaying spooled Elasticsearch batches', batches=self.spool.pending_batches)
+        self._replay_task = asyncio.create_task(
+            replay_spool(self.spool, self._replay_payload, SPOOL_REPLAY_RATE))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(self.stats, spool=self.spool.snapshot() if self.spool else None)
+
+    def time_until_due(self) -> Optional[float]:
+        """Seconds until the buffered batch reaches BULK_MAX_SECONDS (None if empty)"""
+        if self._first_at is None:
+            return None
+        return max(0.0, BULK_MAX_SECONDS - (time.monotonic() - self._first_at))
+
+    async def add(self, doc: bytes, doc_id: Optional[str] = None):
+        """Buffer an encoded event, flushing when any batch limit is reached"""
+        if self._first_at is None:
+            self._first_at = time.monotonic()
+        item = self.bulk_item(doc, doc_id)
+        self._docs.append(item)
+        self._bytes += len(item) + 1
+        self.stats['buffered_docs'] = len(self._docs)
+        self.stats['buffered_bytes'] = self._bytes
+
+        if len(self._docs) >= BULK_SIZE:
+            await self.flush('docs')
+        elif self._bytes >= BULK_MAX_BYTES:
+            await self.flush('bytes')
+        elif self.time_until_due() == 0:
+            await self.flush('age')
+
+    async def flush(self, reason: str = 'age'):
+        """Hand the buffered batch to a bulk request, waiting for a free slot"""
+        if not self._docs:
+            return
+        docs = self._docs
+        self._docs = []
+        self._bytes = 0
+        self._first_at = None
+        self.stats['buffered_docs'] = 0
+        self.stats['buffered_bytes'] = 0
+        self.stats['flushes'][reason] += 1
+
+        await self._slots.acquire()
+        task = asyncio.create_task(self._send(docs))
+        self._inflight.add(task)
+        self.stats['inflight'] = len(self._inflight)
+        task.add_done_callback(self._request_done)
+
+    def _request_done(self, task: asyncio.Task):
+        self._inflight.discard(task)
+        self._slots.release()
+        self.stats['inflight'] = len(self._inflight)
+
+    async def close(self):
+        """Flush remaining docs, wait for in-flight requests and stop replay"""
+        await self.flush('shutdown')
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        if self._replay_task:
+            self._replay_task.cancel()
+            await asyncio.gather(self._replay_task, return_exceptions=True)
+            self._replay_task = None
+        if self.spool:
+            self.spool.close()
+
+    @staticmethod
+    def bulk_item(doc: bytes, doc_id: Optional[str] = None) -> bytes:
+        """Action line plus source for one document (a fixed _id makes re-sends idempotent)"""
+        action = {'_index': ELASTIC_INDEX}
+        if doc_id:
+            action['_id'] = doc_id
+        return codec.dumps({'index': action}) + b'\n' + doc
+
+    @staticmethod
+    def build_payload(items: List[bytes]) -> bytes:
+        """Assemble an NDJSON _bulk body from bulk_item() entries"""
+        return b'\n'.join(items) + b'\n'
+
+    def _retryable_items(self, result: Dict[str, Any], docs: List[bytes]) -> List[bytes]:
+        """Return docs whose bulk items were rejected with a retryable status"""
+        if not result.get('errors'):
+            self.stats['docs_sent'] += len(docs)
+            return []
+
+        retry = []
+        for doc, item in zip(docs, result.get('items', [])):
+            status = next(iter(item.values()), {}).get('status', 0)
+            if status in RETRYABLE_STATUSES:
+                retry.append(doc)
+            elif status >= 300:
+                self.stats['doc_errors'] += 1
+            else:
+                self.stats['docs_sent'] += 1
+        return retry
+
+    async def _post_once(self, docs: List[bytes]) -> Tuple[List[bytes], bool]:
+        """Send one _bulk request; returns (docs still to ship, whether a retry can help)"""
+        url = f'{ELASTIC_URL}/_bulk'
+        headers = {'Content-Type': 'application/x-ndjson', **elastic_auth_headers()}
+
+        payload = self.build_payload(docs)
+        self.stats['bulk_requests'] += 1
+        self.payload_bytes.observe(len(payload))
+        started = time.monotonic()
+        try:
+            async with self.session.post(url, data=payload, headers=headers) as resp:
+                if resp.status in (200, 201):
+                    result = await resp.json(content_type=None)
+                    self.request_seconds.observe(time.monotonic() - started, 'success')
+                    self.stats['cluster_ok'] = True
+                    return self._retryable_items(result, docs), True
+
+                self.request_seconds.observe(time.monotonic() - started, 'http_error')
+                self.stats['bulk_failures'] += 1
+                if resp.status not in RETRYABLE_STATUSES:
+                    text = await resp.text()
+                    log('ERROR', 'Elasticsearch bulk request failed (non-retryable)',
+                        status=resp.status, body=text[:300])
+                    return docs, False
+                self.stats['cluster_ok'] = False
+                log('WARN', 'Elasticsearch bulk request failed', status=resp.status)
+        except Exception as e:
+            self.request_seconds.observe(time.monotonic() - started, 'exception')
+            self.stats['bulk_failures'] += 1
+            self.stats['cluster_ok'] = False
+            log('WARN', 'Elasticsearch bulk request error', error=str(e))
+        return docs, True
+
+    async def _spool_docs(self, docs: List[bytes]) -> bool:
+        try:
+            await asyncio.to_thread(self.spool.append, self.build_payload(docs), len(docs))
+            return True
+        except Exception as e:
+            log('ERROR', 'Failed to spool Elasticsearch batch', error=str(e))
+            return False
+
+    async def _send(self, docs: List[bytes]):
+        # Spare a failing cluster; the replay of the backlog probes for its recovery
+        if (not self.stats['cluster_ok'] and self.spool and self.spool.pending_batches
+                and await self._spool_docs(docs)):
+            return
+
+        retryable = True
+        for attempt in range(BULK_MAX_RETRIES + 1):
+            if attempt:
+                self.stats['retries'] += 1
+                await asyncio.sleep(backoff_delay(attempt - 1))
+
+            docs, retryable = await self._post_once(docs)
+            if not docs or not retryable:
+                break
+            log('WARN', 'Retrying Elasticsearch bulk request', docs=len(docs), attempt=attempt + 1)
+
+        if not docs:
+            return
+        if retryable and self.spool and await self._spool_docs(docs):
+            log('WARN', 'Spooled events after Elasticsearch retries', count=len(docs))
+            return
+        self.stats['docs_dropped'] += len(docs)
+        log('ERROR', 'Dropping events after Elasticsearch retries', count=len(docs))
+
+    async def _replay_payload(self, payload: bytes) -> bool:
+        """Ship one spooled payload; False keeps it in the spool for a later attempt"""
+        lines = payload.split(b'\n')
+        docs = [action + b'\n' + source for action, source in zip(lines[0::2], lines[1::2])]
+        remaining, retryable = await self._post_once(docs)
+        if not remaining:
+            return True
+        if not retryable:
+            self.stats['docs_dropped'] += len(remaining)
+            return True
+        if len(remaining) == len(docs):
+            return False
+        # Partially accepted: re-spool only the rejected items
+        return await self._spool_docs(remaining)
+
+def parse_timestamp(value: str) -> float:
+    """Parse an ISO-8601 timestamp into epoch seconds (naive values are UTC)"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def tail_lines(filepath: Path, count: int, block_size: int = 65536) -> List[bytes]:
+    """Return the last `count` non-empty lines of a file by seeking backwards"""
+    if count <= 0 or not filepath.exists():
+        return []
+
+    with filepath.open('rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b''
+        while position > 0 and data.count(b'\n') <= count:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+
+    lines = [line for line in data.split(b'\n') if line.strip()]
+    if position > 0 and lines:
+        lines = lines[1:]  # First line may be partial
+    return lines[-count:]
+
+class RecentEvents:
+    """Bounded ring buffer of recent event lines with cached, pre-serialized responses"""
+
+    def __init__(self, maxlen: int):
+        self.events: deque = deque(maxlen=maxlen)  # (epoch seconds, encoded JSON line)
+        self.version = 0
+        self._epoch = f'{int(time.time()):x}'
+        self._cache: Dict[Any, Any] = {}
+        self._cache_version = -1
+
+    def add(self, timestamp: Optional[str], line: bytes):
+        try:
+            ts = parse_timestamp(timestamp) if timestamp else time.time()
+        except ValueError:
+            ts = time.time()
+        self.events.append((ts, line))
+        self.version += 1
+
+    def prime(self, lines: List[bytes]):
+        """Seed the buffer from lines already on disk (e.g. after restart)"""
+        for line in lines:
+            try:
+                timestamp = codec.loads(line).get('timestamp')
+            except (ValueError, AttributeError):
+                continue
+            self.add(timestamp, line)
+
+    def render(self, limit: int, since: Optional[float] = None):
+        """Return (etag, body) for the newest `limit` events after `since`"""
+        if self._cache_version != self.version:
+            self._cache.clear()
+            self._cache_version = self.version
+
+        key = (limit, since)
+        cached = self._cache.get(key)
+        if cached:
+            return cached
+
+        selected = []
+        for ts, line in reversed(self.events):
+            if len(selected) >= limit or (since is not None and ts <= since):
+                break
+            selected.append(line)
+        selected.reverse()
+
+        body = b'{"recent_events":[' + b','.join(selected) + b']}'
+        etag = f'W/"{self._epoch}-{self.version:x}-{limit}-{zlib.crc32(repr(since).encode()):x}"'
+        if len(self._cache) >= 64:
+            self._cache.clear()
+        self._cache[key] = (etag, body)
+        return etag, body
+
+_BODY_KEY_RE = re.compile(r'"eventBody"\s*:\s*')
+_JSON_DECODER = json.JSONDecoder()
+
+def locate_event_body(frame: str, message: Dict[str, Any]) -> Optional[str]:
+    """Return the verbatim eventBody JSON text of an already-decoded frame
+
+    The body start is the first "eventBody" key (unambiguous when the keys
+    before it hold scalars); the end is found by decoding only the small
+    trailing members (e.g. metadata) and checking they match the decoded
+    message. Returns None whenever the span cannot be established exactly,
+    and for pretty-printed bodies: raw line breaks would split the JSONL line
+    and the NDJSON bulk body, so those are re-encoded instead.
+    """
+    if not isinstance(message.get('eventBody'), dict):
+        return None
+    keys = list(message)
+    index = keys.index('eventBody')
+    if any(isinstance(message[key], (dict, list)) for key in keys[:index]):
+        return None
+
+    match = _BODY_KEY_RE.search(frame)
+    if not match or not frame.startswith('{', match.end()):
+        return None
+    start = match.end()
+
+    trailing = keys[index + 1:]
+    if not trailing:
+        return _body_span(frame[start:frame.rstrip().rfind('}')])
+
+    # Search right-to-left for the comma that ends eventBody: '{' + the rest of
+    # the frame must decode to exactly the trailing members
+    expected = {key: message[key] for key in trailing}
+    key_text = json.dumps(trailing[0])
+    search_end = len(frame)
+    for _ in range(8):
+        pos = frame.rfind(key_text, start, search_end)
+        if pos < 0:
+            return None
+        search_end = pos
+        comma = frame.rfind(',', start, pos)
+        if comma < 0 or frame[comma + 1:pos].strip():
+            continue
+        tail = '{' + frame[comma + 1:]
+        try:
+            value, end = _JSON_DECODER.raw_decode(tail)
+        except ValueError:
+            continue
+        if value == expected and not tail[end:].strip():
+            return _body_span(frame[start:comma])
+    return None
+
+def _body_span(text: str) -> Optional[str]:
+    text = text.rstrip()
+    if not text.endswith('}') or '\n' in text or '\r' in text:
+        return None
+    return text
+
+class EventEnvelope:
+    """A formatted event and its UTF-8 JSON encoding, shared by every sink
+
+    The event is serialized exactly once; the file sink, the bulk builder and
+    the /events ring buffer all reuse `data`.
+    """
+
+    __slots__ = ('fields', 'data', 'received_at', 'doc_id', 'severity')
+
+    def __init__(self, fields: Dict[str, Any], data: Optional[bytes] = None, received_at: Optional[float] = None,
+                 doc_id: Optional[str] = None, severity: Optional[str] = None):
+        self.fields = fields
+        self.data = codec.dumps(fields) if data is None else data
+        self.received_at = received_at
+        self.doc_id = doc_id
+        self.severity = severity  # Not part of the JSON line; kept for the Parquet sink
+
+# ----------------------- Event Processing -----------------------
+RULES = RuleEngine(RULES_FILE, RULES_RELOAD_SECONDS)
+
+# Validate if event is an AudioHook operational event: the generated 'audiohook_event'
+# predicate itself, recompiled in place when the rule file changes
+is_audiohook_event = RULES.predicate('audiohook_event')
+
+def format_audiohook_event(raw_event: Dict[str, Any], topic: str, channel_id: Optional[str]) -> Dict[str, Any]:
+    """Format AudioHook event for output"""
+    timestamp = now_iso()
+    
+    # Extract AudioHook-specific fields
+    event_entity = raw_event.get('eventEntity', {})
+    
+    formatted = {
+        'timestamp': timestamp,
+        'event_type': 'audiohook_operational',
+        'event_id': event_entity.get('id'),
+        'event_name': event_entity.get('name'),
+        'description': event_entity.get('description'),
+        'conversation_id': raw_event.get('conversationId'),
+        'entity_type': raw_event.get('entityType'),
+        'entity_id': raw_event.get('entityId'), 
+        'entity_name': raw_event.get('entityName'),
+        'version': raw_event.get('version'),
+        'topic': topic,
+        'channel': channel_id,
+        'raw_event': raw_event  # Preserve complete original event
+    }
+    
+    return formatted
+
+def event_severity(raw_event: Dict[str, Any]) -> Optional[str]:
+    """Upper-cased severity of an event body, if it carries one (as collector.py normalizes it)"""
+    for field in ('severity', 'level', 'logLevel'):
+        value = raw_event.get(field)
+        if value not in (None, '', [], {}):
+            return str(value).upper()
+    return None
+
+# Parquet columns (PARQUET_DIR), partitioned by hour and event code
+PARQUET_COLUMNS = (
+    ('timestamp', 'timestamp'),
+    ('event_id', 'string'),
+    ('event_name', 'string'),
+    ('conversation_id', 'string'),
+    ('entity_id', 'string'),
+    ('topic', 'string'),
+    ('severity', 'string')
+)
+PARQUET_PARTITIONING = ('hour', 'event_code')
+
+def parquet_row(envelope: 'EventEnvelope') -> Tuple[Tuple[str, str], Tuple]:
+    """(partition, row) of an event for the Parquet sink"""
+    fields = envelope.fields
+    timestamp = fields['timestamp']
+    return (timestamp[:13], fields['event_id']), (
+        timestamp, fields['event_id'], fields['event_name'], fields['conversation_id'],
+        fields['entity_id'], fields['topic'], envelope.severity)
+
+def store_row(envelope: 'EventEnvelope') -> Tuple:
+    """Row of an event for the SQLite event store"""
+    fields = envelope.fields
+    try:
+        ts = parse_timestamp(fields['timestamp'])
+    except (AttributeError, ValueError):
+        ts = time.time()
+    return (ts, fields['event_id'], fields['event_name'], fields['conversation_id'], fields['entity_id'],
+            fields['topic'], envelope.severity, envelope.doc_id, envelope.data)
+
+# Formatted fields the event loop still needs once a worker has encoded the event
+WORKER_FIELDS = ('timestamp', 'event_id', 'event_name', 'conversation_id', 'entity_id', 'topic')
+
+def process_frames(items: List[Tuple[float, str, str]], raw_passthrough: bool = False) -> List[Tuple]:
+    """Worker-process half of the processing stage (PROCESS_WORKERS > 0)
+
+    Decodes, classifies, formats and encodes (received_at, channel_id, frame)
+    items. One result per item: ('invalid',) for undecodable frames, ('skip',)
+    for non-object frames, ('message',) for other notifications and
+    ('event', topic, key, fields, data, received_at, severity) for AudioHook events,
+    then ('rule_hits', counts) with the batch's classification rule hits.
+    Duplicate suppression and the sinks stay on the event loop.
+    """
+    RULES.maybe_reload()
+    results = []
+    for received_at, channel_id, frame in items:
+        try:
+            message = codec.loads(frame)
+        except codec.DecodeError:
+            results.append(('invalid',))
+            continue
+        if not isinstance(message, dict):
+            results.append(('skip',))
+            continue
+        event_body = message.get('eventBody')
+        if not event_body or not isinstance(event_body, dict) or not is_audiohook_event(event_body):
+            results.append(('message',))
+            continue
+        topic = message.get('topicName', '')
+        formatted = format_audiohook_event(event_body, topic, channel_id)
+        body_text = locate_event_body(frame, message) if raw_passthrough else None
+        if body_text is None:
+            data = codec.dumps(formatted)
+        else:
+            del formatted['raw_event']
+            head = codec.dumps(formatted)
+            data = head[:-1] + b',"raw_event":' + body_text.encode('utf-8') + b'}'
+        results.append(('event', topic, event_key(event_body), {k: formatted[k] for k in WORKER_FIELDS},
+                        data, received_at, event_severity(event_body)))
+    hits = RULES.take_hits()
+    if hits:
+        results.append(('rule_hits', hits))
+    return results
 
 # ----------------------- AudioHook Event Collector -----------------------
 class AudioHookCollector:
@@ -115,11 +1069,15 @@ class AudioHookCollector:
     
     def __init__(self):
         self.session: Optional[aiohttp.ClientSession] = None
-        self.token: Optional[str] = None
-        self.token_expires: float = 0
-        self.channel_id: Optional[str] = None
-        self.ws_url: Optional[str] = None
+        self.tokens = TokenManager(
+            self.request_token, TOKEN_REFRESH_MARGIN_SECONDS, TOKEN_CACHE_FILE,
+            f'{GENESYS_LOGIN_URL or f"https://login.{GENESYS_ENV}"}|{CLIENT_ID}',
+            lambda seconds, outcome: self.token_refresh_seconds.observe(seconds, outcome))
+        self.channel_id: Optional[str] = None  # First pooled channel, for /health and formatting defaults
+        self.channel_pool: Optional[ChannelPool] = None
+        self._rebalance_lock = asyncio.Lock()
         self.topics: List[str] = []
+        self.topic_cache: Optional[TopicCache] = None  # Set when topics come from discovery
         self.running = False
         self.stats = {
             'events_total': 0,
@@ -133,15 +1091,151 @@ class AudioHookCollector:
         # Setup output file
         self.output_file = Path(OUTPUT_FILE)
         self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        self.segments = SegmentManager(self.output_file)
+        self.writer = JsonlWriter(self.output_file, self.segments)
+        self.recent_events = RecentEvents(RECENT_EVENTS_MAX)
+        self.dedup = DedupCache(DEDUP_WINDOW_SECONDS, DEDUP_MAX_ENTRIES, DEDUP_BLOOM_BITS)
+        self.event_log = EventLogSampler(log, EVENT_LOG_SAMPLE_EVERY, EVENT_LOG_ROLLUP_SECONDS, 'AudioHook events')
+        self.windows = EventStats(STATS_TOP_K, STATS_TOP_K_SECONDS)  # Sliding 1m/5m/1h counts for /stats
+
+        # Local alert rules on the live event stream (if the alert file exists)
+        self.alerts: Optional[AlertEngine] = None
+        self.alert_dispatcher: Optional[AlertDispatcher] = None
+        if ALERT_RULES_FILE and Path(ALERT_RULES_FILE).exists():
+            try:
+                rules, webhooks = load_alert_rules(ALERT_RULES_FILE)
+            except (OSError, ValueError) as e:
+                log('ERROR', 'Alert file rejected, alerting disabled', file=ALERT_RULES_FILE, error=str(e))
+            else:
+                if ALERT_WEBHOOK_URL:
+                    webhooks.setdefault('default', {'url': ALERT_WEBHOOK_URL})
+                self.alert_dispatcher = AlertDispatcher(
+                    webhooks, ALERT_QUEUE_SIZE, ALERT_CONCURRENCY, ALERT_MAX_RETRIES, ALERT_TIMEOUT_SECONDS,
+                    on_error=lambda name, e: log('ERROR', 'Alert delivery failed', webhook=name, error=repr(e)))
+                self.alerts = AlertEngine(rules, self.alert_dispatcher.submit, ALERT_MAX_GROUPS, 'audiohook_collector')
         
-        # Elasticsearch bulk buffer (if enabled)
-        self.elastic_buffer: List[Dict] = []
+        # Elasticsearch bulk shipper (if enabled)
+        self.shipper = ElasticShipper()
+
+        # Parquet export (if enabled and pyarrow is installed)
+        self.parquet: Optional[columnar.ParquetSink] = None
+        if PARQUET_DIR and not columnar.available():
+            log('WARN', 'pyarrow not installed, Parquet export disabled', parquet_dir=PARQUET_DIR)
+        elif PARQUET_DIR:
+            self.parquet = columnar.ParquetSink(
+                PARQUET_DIR, PARQUET_COLUMNS, PARQUET_PARTITIONING, PARQUET_COMPRESSION,
+                PARQUET_ROW_GROUP_ROWS, PARQUET_ROLL_SECONDS, PARQUET_MAX_FILE_BYTES)
+
+        # Indexed event store for /events queries (if enabled)
+        self.store = EventStore(EVENT_STORE_PATH, EVENT_STORE_RETENTION_HOURS) if EVENT_STORE_PATH else None
+
+        # Staged pipeline: socket reader -> processor -> file / Elasticsearch / Parquet / store sinks
+        self.ingest_queue = PipelineQueue('ingest', INGEST_QUEUE_SIZE)
+        self.file_queue = PipelineQueue('file', SINK_QUEUE_SIZE)
+        self.elastic_queue = PipelineQueue('elasticsearch', SINK_QUEUE_SIZE)
+        self.parquet_queue = PipelineQueue('parquet', SINK_QUEUE_SIZE)
+        self.store_queue = PipelineQueue('store', SINK_QUEUE_SIZE)
+        self.queues = (self.ingest_queue, self.file_queue, self.elastic_queue, self.parquet_queue, self.store_queue)
+        self.pipeline_tasks: List[asyncio.Task] = []
+        self.process_pool: Optional[PartitionedPool] = None  # Set by start_pipeline when PROCESS_WORKERS > 0
+        self.metrics = self._build_metrics()
+
+    def _build_metrics(self) -> metrics.Registry:
+        """Register the /metrics series; stats-backed ones are read at scrape time"""
+        registry = metrics.Registry()
+        queues = self.queues
+        registry.counter('audiohook_messages_received_total', 'WebSocket messages processed',
+                         callback=lambda: {(): self.stats['events_total']})
+        self.events_counter = registry.counter(
+            'audiohook_events_total', 'AudioHook events written, by topic and event code', ('topic', 'event_id'))
+        registry.counter('audiohook_errors_total', 'Processing, connection and write errors',
+                         callback=lambda: {(): self.stats['errors']})
+        registry.counter('audiohook_reconnects_total', 'WebSocket reconnects',
+                         callback=lambda: {(): self.stats['reconnects']})
+        registry.counter('audiohook_dedup_checks_total', 'AudioHook events checked against the duplicate cache',
+                         callback=lambda: {(): self.dedup.stats['checks']})
+        registry.counter('audiohook_dedup_hits_total', 'AudioHook events suppressed as duplicates',
+                         callback=lambda: {(): self.dedup.stats['hits']})
+        registry.gauge('audiohook_dedup_entries', 'Event keys held by the duplicate cache',
+                       callback=lambda: {(): len(self.dedup)})
+        registry.counter('audiohook_log_lines_dropped_total', 'Log lines dropped because the log queue was full',
+                         callback=lambda: {(): LOGS.stats['dropped']})
+        registry.register(self.writer.latency)
+        registry.counter('audiohook_file_bytes_written_total', 'Bytes committed to the output file',
+                         callback=lambda: {(): self.writer.stats['bytes_written']})
+        registry.counter('audiohook_file_rotations_total', 'Output file rotations',
+                         callback=lambda: {(): self.writer.stats['rotations']})
+        registry.gauge('audiohook_queue_depth', 'Items waiting in each pipeline queue', ('queue',),
+                       callback=lambda: {(q.name,): q.queue.qsize() for q in queues})
+        registry.gauge('audiohook_queue_high_water', 'Highest observed depth of each pipeline queue', ('queue',),
+                       callback=lambda: {(q.name,): q.stats['high_water'] for q in queues})
+        registry.counter('audiohook_queue_dropped_total', 'Items dropped by each pipeline queue', ('queue',),
+                         callback=lambda: {(q.name,): q.stats['dropped'] for q in queues})
+        registry.counter('audiohook_worker_frames_total', 'Frames handed to each worker process (PROCESS_WORKERS)',
+                         ('partition',), callback=lambda: {
+                             (str(i),): n for i, n in enumerate(self.process_pool.stats['partition_items'])
+                         } if self.process_pool else {})
+        registry.counter('audiohook_rule_hits_total', 'Events matched by each classification rule',
+                         ('classifier', 'rule'), callback=RULES.hits)
+        registry.counter('audiohook_parquet_rows_total', 'Events written to Parquet files',
+                         callback=lambda: {(): self.parquet.stats['rows'] if self.parquet else 0})
+        registry.counter('audiohook_parquet_files_total', 'Parquet files closed and published',
+                         callback=lambda: {(): self.parquet.stats['files'] if self.parquet else 0})
+        registry.counter('audiohook_store_rows_total', 'Events inserted into the event store',
+                         callback=lambda: {(): self.store.stats['rows_written'] if self.store else 0})
+        registry.gauge('audiohook_store_bytes', 'Size of the event store database and its WAL',
+                       callback=lambda: {(): self.store.size_bytes() if self.store else 0})
+        registry.counter('audiohook_alert_evaluations_total', 'Events evaluated against the alert rules',
+                         callback=lambda: {(): self.alerts.stats['events'] if self.alerts else 0})
+        registry.counter('audiohook_alert_evaluation_seconds_total',
+                         'Time spent evaluating alert rules (divide by evaluations for the cost per event)',
+                         callback=lambda: {(): self.alerts.stats['eval_ns'] / 1e9 if self.alerts else 0})
+        registry.counter('audiohook_alerts_fired_total', 'Alerts fired per rule', ('rule',),
+                         callback=lambda: {(rule,): n for rule, n in self.alerts.stats['fired'].items()}
+                         if self.alerts else {})
+        registry.counter('audiohook_alert_deliveries_total', 'Alerts by webhook delivery outcome', ('outcome',),
+                         callback=lambda: {(outcome,): self.alert_dispatcher.stats[outcome]
+                                           for outcome in ('sent', 'failed', 'dropped')}
+                         if self.alert_dispatcher else {})
+        registry.register(self.shipper.request_seconds)
+        registry.register(self.shipper.payload_bytes)
+        registry.counter('audiohook_bulk_docs_sent_total', 'Documents accepted by Elasticsearch',
+                         callback=lambda: {(): self.shipper.stats['docs_sent']})
+        registry.counter('audiohook_bulk_docs_dropped_total', 'Documents dropped after retries',
+                         callback=lambda: {(): self.shipper.stats['docs_dropped']})
+        registry.gauge('audiohook_channel_connected', 'Whether each pooled notification channel is connected',
+                       ('channel',), callback=lambda: {
+                           (str(c.index),): int(c.connected) for c in self._pooled_channels()})
+        registry.counter('audiohook_channel_messages_total', 'WebSocket messages received per pooled channel',
+                         ('channel',), callback=lambda: {
+                             (str(c.index),): c.stats['messages'] for c in self._pooled_channels()})
+        registry.counter('audiohook_channel_rotations_total', 'Make-before-break channel rotations per pooled channel',
+                         ('channel',), callback=lambda: {
+                             (str(c.index),): c.stats['rotations'] for c in self._pooled_channels()})
+        registry.counter('audiohook_channel_overlap_duplicates_total',
+                         'Frames dropped as duplicates while two sockets overlapped', ('channel',), callback=lambda: {
+                             (str(c.index),): c.stats['overlap_duplicates'] for c in self._pooled_channels()})
+        registry.counter('audiohook_channel_gap_seconds_total', 'Seconds a pooled channel spent without a socket',
+                         ('channel',), callback=lambda: {
+                             (str(c.index),): c.stats['gap_seconds_total'] for c in self._pooled_channels()})
+        registry.gauge('audiohook_spool_pending_batches', 'Bulk batches waiting in the outage spool',
+                       callback=lambda: {(): self.shipper.spool.pending_batches if self.shipper.spool else 0})
+        self.reconnect_seconds = registry.histogram(
+            'audiohook_reconnect_seconds', 'Time from WebSocket disconnect to the next successful connect',
+            buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+        self.token_refresh_seconds = registry.histogram(
+            'audiohook_token_refresh_seconds', 'OAuth token request latency', ('outcome',))
+        return registry
+
+    def _pooled_channels(self) -> List[ChannelState]:
+        return self.channel_pool.channels if self.channel_pool else []
 
     async def __aenter__(self):
         self.session = aiohttp.ClientSession(
             timeout=aiohttp.ClientTimeout(total=30),
             connector=aiohttp.TCPConnector(limit=10)
         )
+        self.shipper.session = self.session
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -149,24 +1243,26 @@ class AudioHookCollector:
             await self.session.close()
 
     async def get_access_token(self) -> str:
-        """Get OAuth2 token for Genesys Cloud"""
-        if self.token and time.time() < self.token_expires - 300:  # 5min buffer
-            return self.token
-            
-        url = f'https://login.{GENESYS_ENV}/oauth/token'
+        """Get OAuth2 token for Genesys Cloud (refreshed by the token manager)"""
+        return await self.tokens.get()
+
+    async def request_token(self) -> Tuple[str, float]:
+        """Client-credentials grant; returns (access_token, expires_in)"""
+        url = f'{GENESYS_LOGIN_URL or f"https://login.{GENESYS_ENV}"}/oauth/token'
         auth = aiohttp.BasicAuth(CLIENT_ID, CLIENT_SECRET)
         data = {'grant_type': 'client_credentials'}
         
-        async with self.session.post(url, data=data, auth=auth) as resp:
-            if resp.status != 200:
-                text = await resp.text()
-                raise Exception(f'Token request failed: {resp.status} {text}')
-            
-            result = await resp.json()
-            self.token = result['access_token']
-            self.token_expires = time.time() + result.get('expires_in', 3600)
-            log('INFO', 'Access token obtained')
-            return self.token
+        try:
+            async with self.session.post(url, data=data, auth=auth) as resp:
+                if resp.status != 200:
+                    text = await resp.text()
+                    raise Exception(f'Token request failed: {resp.status} {text}')
+                result = await resp.json()
+        except Exception as e:
+            log('WARN', 'Access token request failed', error=str(e))
+            raise
+        log('INFO', 'Access token obtained', expires_in=result.get('expires_in', 3600))
+        return result['access_token'], result.get('expires_in', 3600)
 
     async def api_request(self, method: str, path: str, **kwargs) -> Any:
         """Make authenticated API request to Genesys Cloud"""
@@ -177,7 +1273,7 @@ class AudioHookCollector:
         if method.upper() in ('POST', 'PUT', 'PATCH'):
             headers['Content-Type'] = 'application/json'
         
-        url = f'https://api.{GENESYS_ENV}{path}'
+        url = f'{GENESYS_API_URL or f"https://api.{GENESYS_ENV}"}{path}'
         
         async with self.session.request(method, url, headers=headers, **kwargs) as resp:
             if resp.status >= 400:
@@ -188,26 +1284,55 @@ class AudioHookCollector:
                 return await resp.json()
             return await resp.text()
 
-    async def setup_notification_channel(self):
-        """Create notification channel and subscribe to AudioHook topics"""
-        # Create channel
+    async def setup_notification_channel(self, channel: ChannelState):
+        """Create a notification channel and subscribe it to its share of the topics"""
         result = await self.api_request('POST', '/api/v2/notifications/channels', data='{}')
-        self.channel_id = result['id']
-        self.ws_url = result['connectUri']
-        log('INFO', 'Notification channel created', channel_id=self.channel_id)
-        
-        # Load topics
-        self.topics = await self.load_topics()
-        log('INFO', 'Topics to subscribe', topics=self.topics, count=len(self.topics))
-        
-        # Subscribe to topics
-        subscription_data = {'topics': [{'id': topic} for topic in self.topics]}
+        channel.channel_id = result['id']
+        channel.connect_uri = result['connectUri']
+        channel.stats['channels_created'] += 1
+        if channel.index == 0:
+            self.channel_id = channel.channel_id
+        log('INFO', 'Notification channel created', channel_id=channel.channel_id, index=channel.index)
+
+        if channel.topics:
+            await self.subscribe_channel(channel)
+
+    async def subscribe_channel(self, channel: ChannelState):
+        """Replace a channel's subscriptions with its current topic list"""
+        subscription_data = {'topics': [{'id': topic} for topic in channel.topics]}
         await self.api_request(
             'PUT',
-            f'/api/v2/notifications/channels/{self.channel_id}/subscriptions',
+            f'/api/v2/notifications/channels/{channel.channel_id}/subscriptions',
             data=json.dumps(subscription_data)
         )
-        log('INFO', 'Subscribed to topics', count=len(self.topics))
+        log('INFO', 'Subscribed to topics', channel_id=channel.channel_id, index=channel.index,
+            count=len(channel.topics))
+
+    async def _resubscribe(self, channels: List[ChannelState]):
+        for channel in channels:
+            try:
+                await self.subscribe_channel(channel)
+            except Exception as e:
+                log('ERROR', 'Failed to update channel subscriptions', index=channel.index, error=str(e))
+                channel.stats['errors'] += 1
+
+    async def failover_channel(self, channel: ChannelState):
+        """Move a dead channel's topics onto the connected channels while it is re-created"""
+        async with self._rebalance_lock:
+            changed = self.channel_pool.plan_failover(channel)
+            await self._resubscribe(changed)
+        if changed:
+            log('WARN', 'Moved topics off failed channel', index=channel.index,
+                targets=[c.index for c in changed])
+
+    async def rebalance_channels(self):
+        """Spread all topics evenly over the connected channels"""
+        async with self._rebalance_lock:
+            changed = self.channel_pool.plan_rebalance()
+            await self._resubscribe(changed)
+        if changed:
+            log('INFO', 'Rebalanced topics across channels',
+                shares={c.index: len(c.topics) for c in self.channel_pool.channels})
 
     async def load_topics(self) -> List[str]:
         """Load topics from file or use AudioHook defaults"""
@@ -224,17 +1349,16 @@ class AudioHookCollector:
             except Exception as e:
                 log('WARN', 'Failed to load topics file', error=str(e))
         
-        # Try to discover AudioHook topics
+        # Try to discover AudioHook topics (the filtered list is cached across restarts)
+        api_url = GENESYS_API_URL or f'https://api.{GENESYS_ENV}'
+        cache = TopicCache(TOPIC_CACHE_FILE, TOPIC_CACHE_TTL_SECONDS, f'{api_url}|{CLIENT_ID}|audiohook',
+                           self.select_audiohook_topics)
         try:
-            available = await self.api_request('GET', '/api/v2/notifications/availabletopics')
-            audiohook_topics = [
-                topic['id'] for topic in available 
-                if isinstance(topic, dict) and 
-                'audiohook' in topic.get('id', '').lower()
-            ]
-            
+            audiohook_topics = await cache.resolve(self.fetch_available_topics)
             if audiohook_topics:
-                log('INFO', 'Discovered AudioHook topics', topics=audiohook_topics)
+                self.topic_cache = cache
+                log('INFO', 'Discovered AudioHook topics', topics=audiohook_topics,
+                    cache_age_seconds=cache.snapshot()['age_seconds'])
                 return audiohook_topics
         except Exception as e:
             log('WARN', 'Failed to discover topics', error=str(e))
@@ -243,110 +1367,242 @@ class AudioHookCollector:
         log('INFO', 'Using predefined AudioHook topics')
         return AUDIOHOOK_TOPICS
 
-    def is_audiohook_event(self, event: Dict[str, Any]) -> bool:
-        """Validate if event is an AudioHook operational event"""
-        # Check for AudioHook event structure
-        event_entity = event.get('eventEntity', {})
-        event_id = event_entity.get('id', '')
-        
-        # AudioHook events have specific ID patterns like AUDIOHOOK-0001
-        if event_id.startswith('AUDIOHOOK-'):
-            return True
-            
-        # Check entity type and name
-        entity_type = event.get('entityType', '').lower()
-        entity_name = event_entity.get('name', '').lower()
-        
-        return 'audiohook' in entity_type or 'audiohook' in entity_name
+    async def fetch_available_topics(self) -> List[Dict[str, Any]]:
+        """Download the full notification topic catalog"""
+        available = await self.api_request('GET', '/api/v2/notifications/availabletopics')
+        # The endpoint returns {"entities": [...]}; a bare list is accepted too
+        return available.get('entities', []) if isinstance(available, dict) else available
 
-    def format_audiohook_event(self, raw_event: Dict[str, Any], topic: str) -> Dict[str, Any]:
+    @staticmethod
+    def select_audiohook_topics(catalog: List[Dict[str, Any]]) -> List[str]:
+        """Topic ids from the catalog that carry AudioHook events"""
+        return [
+            topic['id'] for topic in catalog
+            if isinstance(topic, dict) and
+            'audiohook' in topic.get('id', '').lower()
+        ]
+
+    async def refresh_topics(self):
+        """Rediscover topics whenever the cached list expires and resubscribe on change"""
+        async def fetch():
+            try:
+                return await self.fetch_available_topics()
+            except Exception as e:
+                log('WARN', 'Topic refresh failed; keeping cached topics', error=str(e))
+                raise
+
+        await self.topic_cache.refresh_loop(fetch, self.apply_topics, RECONNECT_DELAY * 60)
+
+    async def apply_topics(self, topics: List[str]):
+        """Switch to a new topic list and spread it over the connected channels"""
+        log('INFO', 'Topic list changed', added=sorted(set(topics) - set(self.topics)),
+            removed=sorted(set(self.topics) - set(topics)))
+        self.topics = topics
+        if self.channel_pool:
+            self.channel_pool.topics = list(topics)
+            await self.rebalance_channels()
+
+    # Module-level so PROCESS_WORKERS processes can run it too
+    is_audiohook_event = staticmethod(is_audiohook_event)
+
+    def format_audiohook_event(self, raw_event: Dict[str, Any], topic: str,
+                               channel_id: Optional[str] = None) -> Dict[str, Any]:
         """Format AudioHook event for output"""
-        timestamp = now_iso()
-        
-        # Extract AudioHook-specific fields
-        event_entity = raw_event.get('eventEntity', {})
-        
-        formatted = {
-            'timestamp': timestamp,
-            'event_type': 'audiohook_operational',
-            'event_id': event_entity.get('id'),
-            'event_name': event_entity.get('name'),
-            'description': event_entity.get('description'),
-            'conversation_id': raw_event.get('conversationId'),
-            'entity_type': raw_event.get('entityType'),
-            'entity_id': raw_event.get('entityId'), 
-            'entity_name': raw_event.get('entityName'),
-            'version': raw_event.get('version'),
-            'topic': topic,
-            'channel': self.channel_id,
-            'raw_event': raw_event  # Preserve complete original event
-        }
-        
-        return formatted
+        return format_audiohook_event(raw_event, topic, channel_id or self.channel_id)
 
-    async def write_event(self, event: Dict[str, Any]):
-        """Write event to output file and optionally to Elasticsearch"""
-        # Rotate file if needed
-        rotate_file(self.output_file)
+    async def write_event(self, envelope: EventEnvelope):
+        """Hand the encoded event to the file sink and optionally to the Elasticsearch sink"""
+        self.recent_events.add(envelope.fields.get('timestamp'), envelope.data)
+        await self.file_queue.put(envelope)
         
-        # Write to file
-        try:
-            with self.output_file.open('a', encoding='utf-8') as f:
-                f.write(json.dumps(event, ensure_ascii=False) + '\n')
-                f.flush()
-        except Exception as e:
-            log('ERROR', 'Failed to write event to file', error=str(e))
-            self.stats['errors'] += 1
-        
-        # Add to Elasticsearch buffer if configured
+        # Add to Elasticsearch queue if configured
         if ELASTIC_URL:
-            self.elastic_buffer.append(event)
-            if len(self.elastic_buffer) >= BULK_SIZE:
-                await self.flush_to_elasticsearch()
+            await self.elastic_queue.put(envelope)
+        if self.parquet is not None:
+            await self.parquet_queue.put(envelope)
+        if self.store is not None:
+            await self.store_queue.put(envelope)
 
-    async def flush_to_elasticsearch(self):
-        """Flush events to Elasticsearch"""
-        if not ELASTIC_URL or not self.elastic_buffer:
-            return
-            
-        try:
-            # Prepare bulk request
-            bulk_data = []
-            for event in self.elastic_buffer:
-                index_action = {'index': {'_index': ELASTIC_INDEX}}
-                bulk_data.append(json.dumps(index_action))
-                bulk_data.append(json.dumps(event))
-            
-            ndjson_data = '\n'.join(bulk_data) + '\n'
-            headers = {'Content-Type': 'application/x-ndjson'}
-            
-            # Add auth if configured
-            if ELASTIC_AUTH:
-                if ':' in ELASTIC_AUTH:
-                    import base64
-                    encoded = base64.b64encode(ELASTIC_AUTH.encode()).decode()
-                    headers['Authorization'] = f'Basic {encoded}'
-                else:
-                    headers['Authorization'] = f'Bearer {ELASTIC_AUTH}'
-            
-            async with self.session.post(
-                f'{ELASTIC_URL}/_bulk',
-                data=ndjson_data.encode('utf-8'),
-                headers=headers
-            ) as resp:
-                if resp.status in (200, 201):
-                    log('INFO', 'Flushed events to Elasticsearch', count=len(self.elastic_buffer))
+    def _write_lines(self, envelopes: List[Optional[EventEnvelope]]):
+        """Write a batch of events to the output file (runs in a worker thread)"""
+        for envelope in envelopes:
+            if envelope is not None:
+                self.writer.write(envelope.data, envelope.received_at, envelope.fields.get('timestamp'))
+        self.writer.maybe_commit()
+
+    async def file_sink_loop(self):
+        """Drain the file queue into the JSONL writer off the event loop"""
+        interval = FLUSH_INTERVAL_MS / 1000.0
+        while True:
+            try:
+                first = await asyncio.wait_for(self.file_queue.get(), timeout=interval)
+                lines = [first] + self.file_queue.get_batch(WRITE_BATCH_SIZE - 1)
+            except asyncio.TimeoutError:
+                lines = []
+
+            write_errors = self.writer.stats['write_errors']
+            await asyncio.to_thread(self._write_lines, lines)
+            if self.writer.stats['write_errors'] != write_errors:
+                self.stats['errors'] += 1
+
+            if None in lines:
+                await asyncio.to_thread(self.writer.commit)
+                return
+
+    def _write_columns(self, envelopes: List[EventEnvelope]):
+        """Buffer a batch of events in the Parquet sink (runs in a worker thread)"""
+        for envelope in envelopes:
+            self.parquet.add(*parquet_row(envelope))
+        self.parquet.maybe_roll()
+
+    def _write_store(self, envelopes: List[EventEnvelope]):
+        """Insert a batch of events into the event store in one transaction (runs in a worker thread)"""
+        self.store.add_many([store_row(envelope) for envelope in envelopes])
+
+    async def thread_sink_loop(self, name: str, queue: PipelineQueue, write, close, sink_stats: Dict[str, Any]):
+        """Drain a sink queue in batches into a blocking sink off the event loop
+
+        write() also runs on an idle second, so time-based work (file rolls,
+        retention) happens without traffic. close() runs once the stream ends.
+        """
+        while True:
+            try:
+                first = await asyncio.wait_for(queue.get(), timeout=1.0)
+                envelopes = [first] + queue.get_batch(WRITE_BATCH_SIZE - 1)
+            except asyncio.TimeoutError:
+                envelopes = []
+
+            errors = sink_stats['errors']
+            await asyncio.to_thread(write, [envelope for envelope in envelopes if envelope is not None])
+            if None in envelopes and close is not None:
+                await asyncio.to_thread(close)
+            if sink_stats['errors'] != errors:
+                self.stats['errors'] += 1
+                log('ERROR', f'{name} write failed', error=sink_stats['last_error'])
+            if None in envelopes:
+                return
+
+    async def end_sinks(self):
+        """Tell every sink loop that no more events are coming"""
+        for queue in self.queues[1:]:
+            await queue.put(None, force=True)
+
+    async def elastic_sink_loop(self):
+        """Drain the Elasticsearch queue into the bulk shipper"""
+        while True:
+            try:
+                envelope = await asyncio.wait_for(self.elastic_queue.get(), timeout=self.shipper.time_until_due())
+            except asyncio.TimeoutError:
+                await self.shipper.flush('age')
+                continue
+            if envelope is None:
+                await self.shipper.close()
+                return
+            await self.shipper.add(envelope.data, envelope.doc_id)
+
+    async def process_loop(self):
+        """Classify and format decoded messages, fanning out to the sinks"""
+        while True:
+            item = await self.ingest_queue.get()
+            if item is None:
+                await self.end_sinks()
+                return
+            received_at, channel_id, message = item
+            try:
+                if isinstance(message, str):
+                    await self.handle_raw_frame(message, received_at, channel_id)
                 else:
-                    log('WARN', 'Elasticsearch bulk request failed', status=resp.status)
-                    self.stats['errors'] += 1
-            
-            self.elastic_buffer.clear()
-        except Exception as e:
-            log('ERROR', 'Failed to send events to Elasticsearch', error=str(e))
+                    await self.handle_websocket_message(message, received_at, channel_id)
+            except Exception as e:
+                log('ERROR', 'Failed to process message', error=str(e))
+                self.stats['errors'] += 1
+
+    async def partitioned_process_loop(self):
+        """process_loop for PROCESS_WORKERS > 0: workers decode and format, this loop fans out
+
+        Frames are partitioned by conversationId/entityId, so each conversation's
+        events still reach the sinks in arrival order.
+        """
+        done = False
+
+        async def next_batch():
+            nonlocal done
+            if done:
+                return None
+            items = [await self.ingest_queue.get()] + self.ingest_queue.get_batch(WORKER_BATCH_SIZE - 1)
+            if None in items:
+                done = True
+                items = items[:items.index(None)]
+            return items
+
+        def failed(e: Exception):
+            log('ERROR', 'Worker process failed a batch', error=repr(e))
             self.stats['errors'] += 1
-            self.elastic_buffer.clear()
 
-    async def handle_websocket_message(self, message: Dict[str, Any]):
+        await self.process_pool.start()
+        log('INFO', 'Worker processes started', workers=self.process_pool.workers)
+        await self.process_pool.pump(partial(process_frames, raw_passthrough=RAW_PASSTHROUGH), next_batch,
+                                     itemgetter(2), self.accept_processed, failed)
+        await self.end_sinks()
+
+    async def accept_processed(self, result: Tuple):
+        """Event-loop half of PROCESS_WORKERS mode: count, deduplicate and write one worker result"""
+        kind = result[0]
+        if kind == 'invalid':
+            log('WARN', 'Failed to decode WebSocket message')
+            return
+        if kind == 'skip':
+            return
+        if kind == 'rule_hits':
+            RULES.add_hits(result[1])
+            return
+        self.stats['events_total'] += 1
+        if kind == 'event':
+            _, topic, key, fields, data, received_at, severity = result
+            if self.dedup.seen(key):
+                return
+            await self.accept_event(EventEnvelope(fields, data, received_at, key, severity), topic)
+
+    def start_pipeline(self):
+        """Start the processor and sink tasks"""
+        if PROCESS_WORKERS > 0:
+            self.process_pool = PartitionedPool(PROCESS_WORKERS)
+        self.pipeline_tasks = [
+            asyncio.create_task(self.partitioned_process_loop() if self.process_pool else self.process_loop()),
+            asyncio.create_task(self.file_sink_loop()),
+            asyncio.create_task(self.elastic_sink_loop())
+        ]
+        if self.parquet is not None:
+            self.pipeline_tasks.append(asyncio.create_task(self.thread_sink_loop(
+                'Parquet', self.parquet_queue, self._write_columns, self.parquet.close, self.parquet.stats)))
+        if self.store is not None:
+            # The store stays open after the stream ends so /events keeps answering; main() closes it
+            self.pipeline_tasks.append(asyncio.create_task(self.thread_sink_loop(
+                'Event store', self.store_queue, self._write_store, None, self.store.stats)))
+        if ELASTIC_URL:
+            self.shipper.start()
+        if self.alert_dispatcher is not None:
+            self.alert_dispatcher.start()
+
+    async def stop_pipeline(self):
+        """Drain queued events through the sinks and wait for them to finish"""
+        if not self.pipeline_tasks:
+            return
+        await self.ingest_queue.put(None, force=True)
+        await asyncio.gather(*self.pipeline_tasks, return_exceptions=True)
+        self.pipeline_tasks = []
+        if self.process_pool is not None:
+            await asyncio.to_thread(self.process_pool.shutdown)
+        if self.alert_dispatcher is not None:
+            await self.alert_dispatcher.close()
+
+    async def flush_to_elasticsearch(self):
+        """Ship buffered events to Elasticsearch and wait for in-flight requests"""
+        if ELASTIC_URL:
+            await self.shipper.close()
+
+    async def handle_websocket_message(self, message: Dict[str, Any], received_at: Optional[float] = None,
+                                       channel_id: Optional[str] = None):
         """Process WebSocket message"""
         self.stats['events_total'] += 1
         
@@ -356,64 +1612,235 @@ class AudioHookCollector:
         if not event_body or not isinstance(event_body, dict):
             return
         
+        await self.process_event(event_body, topic, received_at=received_at, channel_id=channel_id)
+
+    async def handle_raw_frame(self, frame: str, received_at: Optional[float] = None,
+                               channel_id: Optional[str] = None):
+        """Process an undecoded WebSocket frame (RAW_PASSTHROUGH mode)"""
+        try:
+            message = codec.loads(frame)
+        except codec.DecodeError:
+            log('WARN', 'Failed to decode WebSocket message')
+            return
+        if not isinstance(message, dict):
+            return
+
+        body_text = locate_event_body(frame, message)
+        if body_text is None:
+            await self.handle_websocket_message(message, received_at, channel_id)
+            return
+
+        self.stats['events_total'] += 1
+        await self.process_event(message['eventBody'], message.get('topicName', ''), body_text.encode('utf-8'),
+                                 received_at, channel_id)
+
+    async def process_event(self, event_body: Dict[str, Any], topic: str, raw_body: Optional[bytes] = None,
+                            received_at: Optional[float] = None, channel_id: Optional[str] = None):
+        """Classify an event body and, if it is an AudioHook event, write it
+
+        With `raw_body`, the original eventBody JSON is spliced verbatim into
+        the output line as raw_event instead of re-encoding the parsed body.
+        """
         # Check if this is an AudioHook event
         if self.is_audiohook_event(event_body):
-            self.stats['audiohook_events'] += 1
-            self.stats['last_event'] = now_iso()
+            key = event_key(event_body)
+            if self.dedup.seen(key):
+                return
             
             # Format and write the event
-            formatted_event = self.format_audiohook_event(event_body, topic)
-            await self.write_event(formatted_event)
-            
-            log('INFO', 'AudioHook event processed',
-                event_id=formatted_event['event_id'],
-                event_name=formatted_event['event_name'],
-                conversation_id=formatted_event['conversation_id'])
+            formatted_event = self.format_audiohook_event(event_body, topic, channel_id)
+            severity = event_severity(event_body)
+            if raw_body is None:
+                envelope = EventEnvelope(formatted_event, received_at=received_at, doc_id=key, severity=severity)
+            else:
+                del formatted_event['raw_event']
+                head = codec.dumps(formatted_event)
+                envelope = EventEnvelope(formatted_event, head[:-1] + b',"raw_event":' + raw_body + b'}',
+                                         received_at, key, severity)
+            await self.accept_event(envelope, topic)
+
+    async def accept_event(self, envelope: EventEnvelope, topic: str):
+        """Count, write and log a formatted, non-duplicate AudioHook event"""
+        fields = envelope.fields
+        self.stats['audiohook_events'] += 1
+        self.stats['last_event'] = now_iso()
+        self.events_counter.inc(topic, fields['event_id'] or '')
+        # AudioHook events are reported on the integration entity
+        self.windows.record(fields['event_id'], envelope.severity, fields['entity_id'], topic,
+                            fields['conversation_id'])
+        if self.alerts is not None:
+            self.alerts.observe(fields['event_id'], fields['entity_id'], topic, envelope.severity,
+                                fields['conversation_id'])
+        await self.write_event(envelope)
+        
+        self.event_log.record(
+            fields['event_id'] or 'unknown', 'AudioHook event processed',
+            event_id=fields['event_id'],
+            event_name=fields['event_name'],
+            conversation_id=fields['conversation_id'])
 
     async def websocket_loop(self):
-        """Main WebSocket connection loop with auto-reconnect"""
+        """Run one auto-reconnecting WebSocket reader per pooled notification channel"""
+        if not self.topics:
+            self.topics = await self.load_topics()
+        log('INFO', 'Topics to subscribe', topics=self.topics, count=len(self.topics))
+
+        self.channel_pool = ChannelPool(self.topics, CHANNEL_COUNT, MAX_TOPICS_PER_CHANNEL)
+        log('INFO', 'Notification channel pool', channels=len(self.channel_pool.channels),
+            max_topics_per_channel=MAX_TOPICS_PER_CHANNEL)
+        refresher = None
+        if self.topic_cache is not None and TOPIC_CACHE_TTL_SECONDS > 0:
+            refresher = asyncio.create_task(self.refresh_topics())
+        try:
+            await asyncio.gather(*(self.channel_loop(channel) for channel in self.channel_pool.channels))
+        finally:
+            if refresher is not None:
+                refresher.cancel()
+
+    async def channel_loop(self, channel: ChannelState):
+        """Connect one pooled channel and feed its frames into the shared pipeline
+
+        After an unexpected disconnect the same connectUri is retried once
+        right away (the channel and its subscriptions outlive the socket);
+        only if that fails are the topics failed over and the channel
+        re-created after the backoff delay. With CHANNEL_ROTATE_SECONDS set,
+        the channel is replaced make-before-break before it expires.
+        """
         reconnect_delay = RECONNECT_DELAY
+        disconnected_at: Optional[float] = None
+        retry_same_uri = False
         
         while self.running:
+            ws = None
             try:
                 # Setup channel if needed
-                if not self.ws_url:
-                    await self.setup_notification_channel()
+                if not channel.connect_uri:
+                    await self.setup_notification_channel(channel)
                 
-                log('INFO', 'Connecting to WebSocket', url=self.ws_url)
-                async with self.session.ws_connect(self.ws_url, heartbeat=30) as ws:
-                    log('INFO', 'WebSocket connected')
-                    reconnect_delay = RECONNECT_DELAY  # Reset delay on successful connection
-                    
-                    async for msg in ws:
-                        if msg.type == aiohttp.WSMsgType.TEXT:
-                            try:
-                                data = json.loads(msg.data)
-                                await self.handle_websocket_message(data)
-                            except json.JSONDecodeError:
-                                log('WARN', 'Failed to decode WebSocket message')
-                        elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
-                            log('WARN', 'WebSocket closed, will reconnect')
-                            break
+                log('INFO', 'Connecting to WebSocket', url=channel.connect_uri, index=channel.index)
+                ws = await self.session.ws_connect(channel.connect_uri, heartbeat=30)
+                channel.mark_connected()
+                log('INFO', 'WebSocket connected', index=channel.index)
+                reconnect_delay = RECONNECT_DELAY  # Reset delay on successful connection
+                if disconnected_at is not None:
+                    gap = time.monotonic() - disconnected_at
+                    self.reconnect_seconds.observe(gap)
+                    channel.record_gap(gap)
+                    disconnected_at = None
+                if retry_same_uri:
+                    channel.stats['fast_reconnects'] += 1
+                retry_same_uri = True
+                if not channel.topics:
+                    await self.rebalance_channels()  # Reclaim a share after a failover
+
+                reader = asyncio.create_task(self._read_frames(channel, ws, channel.channel_id))
+                rotate_in = CHANNEL_ROTATE_SECONDS if CHANNEL_ROTATE_SECONDS > 0 else None
+                while True:
+                    done, _ = await asyncio.wait({reader}, timeout=rotate_in)
+                    if reader in done:
+                        reader.result()  # Surface reader errors
+                        break
+                    ws, reader, rotated = await self.rotate_channel(channel, ws, reader)
+                    rotate_in = CHANNEL_ROTATE_SECONDS if rotated else min(CHANNEL_ROTATE_SECONDS, RECONNECT_DELAY)
                             
             except Exception as e:
-                log('ERROR', 'WebSocket connection failed', error=str(e))
+                log('ERROR', 'WebSocket connection failed', index=channel.index, error=str(e))
                 self.stats['errors'] += 1
+                channel.stats['errors'] += 1
+            finally:
+                if ws is not None and not ws.closed:
+                    await ws.close()
             
+            was_connected = channel.connected
+            channel.mark_disconnected()
             if self.running:
+                if disconnected_at is None:
+                    disconnected_at = time.monotonic()
                 self.stats['reconnects'] += 1
-                log('INFO', f'Reconnecting in {reconnect_delay} seconds')
+                if was_connected and retry_same_uri:
+                    continue  # Try the same channel again before re-creating it
+                retry_same_uri = False
+                await self.failover_channel(channel)
+                log('INFO', f'Reconnecting in {reconnect_delay} seconds', index=channel.index)
                 await asyncio.sleep(reconnect_delay)
                 
                 # Exponential backoff
                 reconnect_delay = min(reconnect_delay * 1.5, MAX_RECONNECT_DELAY)
                 
                 # Reset channel info to force recreation
-                self.channel_id = None
-                self.ws_url = None
+                channel.reset()
 
-    async def start_http_server(self):
-        """Start HTTP status server"""
+    async def _read_frames(self, channel: ChannelState, ws, channel_id: str):
+        """Feed one socket's frames into the ingest queue until it closes"""
+        stats = channel.stats
+        async for msg in ws:
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                received_at = time.monotonic()
+                stats['messages'] += 1
+                overlap = channel.overlap
+                if overlap is not None and overlap.is_duplicate(msg.data):
+                    stats['overlap_duplicates'] += 1
+                    continue
+                try:
+                    if RAW_PASSTHROUGH or self.process_pool is not None:
+                        await self.ingest_queue.put((received_at, channel_id, msg.data))
+                    else:
+                        await self.ingest_queue.put((received_at, channel_id, codec.loads(msg.data)))
+                except codec.DecodeError:
+                    log('WARN', 'Failed to decode WebSocket message')
+            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                log('WARN', 'WebSocket closed, will reconnect', index=channel.index)
+                break
+
+    async def rotate_channel(self, channel: ChannelState, ws, reader: asyncio.Task):
+        """Replace a channel make-before-break; returns (socket, reader task, rotated)
+
+        A replacement channel is created, subscribed and connected while the
+        current socket keeps reading; both run for CHANNEL_OVERLAP_SECONDS with
+        duplicate frames suppressed, then the old socket is closed.
+        """
+        async with self._rebalance_lock:
+            try:
+                replacement = ChannelState(channel.index)
+                replacement.topics = channel.topics
+                result = await self.api_request('POST', '/api/v2/notifications/channels', data='{}')
+                replacement.channel_id = result['id']
+                replacement.connect_uri = result['connectUri']
+                if replacement.topics:
+                    await self.subscribe_channel(replacement)
+                new_ws = await self.session.ws_connect(replacement.connect_uri, heartbeat=30)
+            except Exception as e:
+                channel.stats['rotation_failures'] += 1
+                log('WARN', 'Channel rotation failed; keeping current channel', index=channel.index, error=str(e))
+                return ws, reader, False
+
+            overlap_started = time.monotonic()
+            overlap = channel.overlap = OverlapFilter()
+            new_reader = asyncio.create_task(self._read_frames(channel, new_ws, replacement.channel_id))
+            await asyncio.sleep(CHANNEL_OVERLAP_SECONDS)
+            await ws.close()
+            await asyncio.gather(reader, return_exceptions=True)
+
+            old_channel = channel.channel_id
+            channel.channel_id = replacement.channel_id
+            channel.connect_uri = replacement.connect_uri
+            channel.stats['channels_created'] += 1
+            channel.stats['rotations'] += 1
+            channel.stats['last_overlap_seconds'] = round(time.monotonic() - overlap_started, 3)
+            if channel.index == 0:
+                self.channel_id = channel.channel_id
+
+        # Late copies from the new socket may still match frames the old one delivered
+        def end_overlap():
+            if channel.overlap is overlap:
+                channel.overlap = None
+        asyncio.get_running_loop().call_later(CHANNEL_OVERLAP_SECONDS, end_overlap)
+        log('INFO', 'Channel rotated', index=channel.index, old_channel=old_channel,
+            new_channel=channel.channel_id, overlap_seconds=channel.stats['last_overlap_seconds'])
+        return new_ws, new_reader, True
+
+    def http_app(self) -> web.Application:
+        """Status server routes: /health, /stats, /events and /metrics"""
         app = web.Application()
         
         async def health(request):
@@ -422,27 +1849,84 @@ class AudioHookCollector:
                 'timestamp': now_iso(),
                 'channel_id': self.channel_id,
                 'topics': self.topics,
-                'stats': self.stats
+                'topic_cache': self.topic_cache.snapshot() if self.topic_cache else None,
+                'token': self.tokens.snapshot(),
+                'channels': self.channel_pool.snapshot() if self.channel_pool else None,
+                'stats': self.stats,
+                'writer': self.writer.stats,
+                'segments': self.segments.stats,
+                'elasticsearch': self.shipper.snapshot() if ELASTIC_URL else None,
+                'parquet': self.parquet.snapshot() if self.parquet else None,
+                'event_store': self.store.snapshot() if self.store else None,
+                'dedup': self.dedup.snapshot(),
+                'workers': self.process_pool.snapshot() if self.process_pool else None,
+                'rules': RULES.snapshot(),
+                'logging': dict(LOGS.snapshot(), events=self.event_log.snapshot()),
+                'alerts': dict(self.alerts.snapshot(), delivery=self.alert_dispatcher.snapshot())
+                if self.alerts else None,
+                'pipeline': {
+                    q.name: q.snapshot()
+                    for q in self.queues
+                }
             })
         
-        async def events(request):
-            """Stream recent events"""
-            lines = []
-            if self.output_file.exists():
-                try:
-                    with self.output_file.open('r', encoding='utf-8') as f:
-                        lines = f.readlines()[-50:]  # Last 50 events
-                except Exception:
-                    pass
-            
+        async def stats(request):
+            """Sliding-window counts and top-K conversations/integrations, O(buckets) per request"""
             return web.json_response({
-                'recent_events': [json.loads(line.strip()) for line in lines if line.strip()]
+                'timestamp': now_iso(),
+                'counters': self.stats,
+                **self.windows.snapshot()
             })
+
+        async def events(request):
+            """Return recent events from the in-memory ring buffer, or query the event store"""
+            if any(param in request.query for param in STORE_QUERY_PARAMS):
+                return await query_store(request)
+            try:
+                limit = int(request.query.get('limit', RECENT_EVENTS_DEFAULT))
+                since = request.query.get('since')
+                since = parse_timestamp(since) if since else None
+            except ValueError:
+                return web.json_response({'error': 'invalid limit or since parameter'}, status=400)
+            limit = max(1, min(limit, RECENT_EVENTS_MAX))
+
+            etag, body = self.recent_events.render(limit, since)
+            headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+            if request.headers.get('If-None-Match') == etag:
+                return web.Response(status=304, headers=headers)
+            return web.Response(body=body, content_type='application/json', headers=headers)
+
+        async def query_store(request):
+            """/events?conversation_id=&code=&entity_id=&from=&to=&limit=&cursor= against the event store"""
+            if self.store is None:
+                return web.json_response({'error': 'event store disabled, set EVENT_STORE_PATH'}, status=400)
+            query = request.query
+            try:
+                limit = max(1, min(int(query.get('limit', RECENT_EVENTS_DEFAULT)), EVENT_QUERY_MAX))
+                start = parse_timestamp(query['from']) if query.get('from') else None
+                end = parse_timestamp(query['to']) if query.get('to') else None
+                lines, cursor = await asyncio.to_thread(
+                    self.store.query, query.get('conversation_id'), query.get('code', query.get('event_id')),
+                    query.get('entity_id'), start, end, limit, query.get('cursor'))
+            except ValueError:
+                return web.json_response({'error': 'invalid limit, from, to or cursor parameter'}, status=400)
+            body = b'{"events":[' + b','.join(lines) + b'],"next_cursor":' + codec.dumps(cursor) + b'}'
+            return web.Response(body=body, content_type='application/json', headers={'Cache-Control': 'no-cache'})
+
+        async def prometheus(request):
+            """Prometheus text exposition of counters, gauges and latency histograms"""
+            return web.Response(body=self.metrics.render().encode('utf-8'),
+                                headers={'Content-Type': metrics.CONTENT_TYPE})
         
         app.router.add_get('/health', health)
+        app.router.add_get('/stats', stats)
         app.router.add_get('/events', events)
-        
-        runner = web.AppRunner(app)
+        app.router.add_get('/metrics', prometheus)
+        return app
+
+    async def start_http_server(self):
+        """Start HTTP status server"""
+        runner = web.AppRunner(self.http_app())
         await runner.setup()
         site = web.TCPSite(runner, HTTP_HOST, HTTP_PORT)
         await site.start()
@@ -460,12 +1944,41 @@ class AudioHookCollector:
             raise ValueError('Missing required Genesys Cloud credentials')
         
         self.running = True
+        self.segments.start()
+
+        # Seed /events from the tail of the existing output file
+        try:
+            lines = await asyncio.to_thread(tail_lines, self.output_file, RECENT_EVENTS_MAX)
+            self.recent_events.prime(lines)
+        except Exception as e:
+            log('WARN', 'Failed to read recent events from output file', error=str(e))
         
         # Start HTTP server
         await self.start_http_server()
         
+        # Start processor and sink stages
+        self.start_pipeline()
+
+        # Renew the OAuth token in the background, ahead of expiry
+        token_task = asyncio.create_task(self.tokens.run())
+        event_log_task = asyncio.create_task(self.event_log.run())
+        rules_task = asyncio.create_task(RULES.watch(self.rules_reloaded))
+
         # Start WebSocket loop
-        await self.websocket_loop()
+        try:
+            await self.websocket_loop()
+        finally:
+            token_task.cancel()
+            event_log_task.cancel()
+            rules_task.cancel()
+            await self.stop_pipeline()
+
+    @staticmethod
+    def rules_reloaded(rules: RuleEngine):
+        if rules.stats['last_error']:
+            log('WARN', 'Rule file rejected; keeping current rules', file=rules.path, error=rules.stats['last_error'])
+        else:
+            log('INFO', 'Classification rules reloaded', source=rules.stats['source'])
 
     def stop(self):
         """Stop the collector"""
@@ -491,10 +2004,15 @@ async def main():
             await collector.run()
         finally:
             # Flush any remaining events
-            if collector.elastic_buffer:
-                await collector.flush_to_elasticsearch()
+            await collector.flush_to_elasticsearch()
+            collector.writer.close()
+            collector.segments.close()
+            if collector.store is not None:
+                collector.store.close()
 
 if __name__ == '__main__':
+    # Spawned worker processes of a frozen (PyInstaller) build re-run this entry point
+    multiprocessing.freeze_support()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
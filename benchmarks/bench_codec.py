@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-event JSON CPU cost with the stdlib and orjson backends
+
+Replays the per-event hot path (frame decode, JSONL line, bulk doc and log
+line encoding) over frames built from example_audiohook_events.jsonl.
+
+Usage: python benchmarks/bench_codec.py [--events 20000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import codec
+from audiohook_collector import AudioHookCollector
+
+
+def build_frames(count: int):
+    """Genesys-style WebSocket frames derived from the example events"""
+    examples = [codec.loads(line) for line in (ROOT / 'example_audiohook_events.jsonl').read_bytes().splitlines() if line.strip()]
+    frames = []
+    for i in range(count):
+        raw_event = dict(examples[i % len(examples)]['raw_event'])
+        raw_event['conversationId'] = f'{i:08x}-0000-4000-8000-000000000000'
+        frames.append(codec.dumps({'topicName': 'platform.integration.audiohook', 'eventBody': raw_event}).decode())
+    return frames
+
+
+def run(backend: str, frames, collector) -> float:
+    """CPU microseconds per event for the JSON work on the hot path"""
+    codec.use_backend(backend)
+    action = {'index': {'_index': 'genesys-audiohook'}}
+    started = time.process_time()
+    for frame in frames:
+        message = codec.loads(frame)
+        event = collector.format_audiohook_event(message['eventBody'], message['topicName'])
+        codec.dumps(event)                       # JSONL line
+        codec.dumps(action), codec.dumps(event)  # bulk action + doc
+        codec.dumps_str({'level': 'INFO', 'message': 'AudioHook event processed',
+                         'event_id': event['event_id'], 'conversation_id': event['conversation_id']})
+    return (time.process_time() - started) / len(frames) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--events', type=int, default=20000)
+    args = parser.parse_args()
+
+    collector = AudioHookCollector()
+    collector.channel_id = 'bench-channel'
+    frames = build_frames(args.events)
+
+    results = {'json': run('json', frames, collector)}
+    if codec.orjson is not None:
+        results['orjson'] = run('orjson', frames, collector)
+
+    for backend, micros in results.items():
+        print(f'{backend:>7}: {micros:8.2f} us/event CPU')
+    if 'orjson' in results:
+        print(f'speedup: {results["json"] / results["orjson"]:.2f}x')
+    else:
+        print('orjson not installed; only the stdlib backend was measured')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark: a collector driven by the local Genesys mock
+
+Starts benchmarks/mock_genesys.py in a subprocess (so its CPU is not counted),
+points a collector at it via GENESYS_LOGIN_URL / GENESYS_API_URL and runs
+until every emitted event has been handled:
+
+- audiohook: AudioHookCollector; latency is event emission to output-file
+  commit (optionally also shipping to the mock _bulk stub with --elastic)
+- runner:    collector.Runner; latency is event emission to receipt by the
+  mock _bulk stub (includes BULK_MAX_SECONDS batching)
+
+Reports sustained events/sec, p50/p99 latency, collector CPU seconds and
+peak RSS. Collector log output is discarded while the run is timed.
+
+--workers sets PROCESS_WORKERS; a comma-separated list (e.g. 0,1,4) runs the
+target once per value in separate processes, for comparing in-loop
+processing with 1 and N worker processes (use --rate 0 to find the ceiling).
+CPU then includes the worker processes.
+
+Usage: python benchmarks/bench_e2e.py [--target audiohook|runner|both] [--rate 2000]
+                                      [--events 20000] [--size 0] [--elastic] [--workers 0]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import aiohttp
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+@contextlib.contextmanager
+def mock_server(args):
+    """Run the mock in a subprocess and yield its base URL"""
+    cmd = [sys.executable, str(Path(__file__).with_name('mock_genesys.py')), '--port', '0',
+           '--rate', str(args.rate), '--events', str(args.events), '--size', str(args.size),
+           '--sockets', os.environ.get('CHANNEL_COUNT', '1')]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    try:
+        line = proc.stdout.readline().strip()
+        if not line.startswith('READY '):
+            raise RuntimeError(f'mock server failed to start: {line!r}')
+        yield line.split(' ', 1)[1]
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+async def mock_stats(session: aiohttp.ClientSession, base_url: str) -> dict:
+    async with session.get(f'{base_url}/_mock/stats') as resp:
+        return await resp.json()
+
+
+async def wait_until(predicate, timeout: float, interval: float = 0.05):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if await predicate():
+            return True
+        await asyncio.sleep(interval)
+    return False
+
+
+async def bench_audiohook(args, base_url: str, work_dir: Path) -> dict:
+    import audiohook_collector as ac
+
+    ac.GENESYS_LOGIN_URL = ac.GENESYS_API_URL = base_url
+    ac.CLIENT_ID, ac.CLIENT_SECRET = 'bench', 'bench'
+    ac.CUSTOM_TOPICS_FILE = str(work_dir / 'no-topics.json')
+    ac.TOPIC_CACHE_FILE = str(work_dir / 'topic_cache.json')
+    ac.OUTPUT_FILE = str(work_dir / 'events.jsonl')
+    ac.HTTP_HOST, ac.HTTP_PORT = '127.0.0.1', 0
+    ac.SPOOL_DIR = str(work_dir / 'spool')
+    ac.ELASTIC_URL = base_url if args.elastic else ''
+    ac.PROCESS_WORKERS = args.workers
+
+    # Record (cumulative lines, wall time) after every commit to date each line's write
+    commits = []
+    collector = ac.AudioHookCollector()
+    commit = collector.writer.commit
+
+    def timed_commit():
+        commit()
+        commits.append((collector.writer.stats['lines_written'], time.time()))
+    collector.writer.commit = timed_commit
+
+    async with collector, aiohttp.ClientSession() as probe:
+        task = asyncio.create_task(collector.run())
+
+        async def done():
+            if collector.writer.stats['lines_written'] < args.events:
+                return False
+            return not args.elastic or (await mock_stats(probe, base_url))['bulk_docs'] >= args.events
+
+        finished = await wait_until(done, args.timeout)
+        finished_at = time.time()
+        stats = await mock_stats(probe, base_url)
+        collector.stop()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await collector.flush_to_elasticsearch()
+        collector.writer.close()
+        collector.segments.close()
+
+    # Lines are committed in arrival order: line i was written by the first commit covering it
+    latencies = []
+    emitted = []
+    if os.path.exists(ac.OUTPUT_FILE):
+        with open(ac.OUTPUT_FILE, 'rb') as f:
+            for line in f:
+                emitted.append(json.loads(line)['raw_event']['emittedAt'])
+    position = 0
+    for index, emitted_at in enumerate(emitted):
+        while position < len(commits) and commits[position][0] < index + 1:
+            position += 1
+        if position < len(commits):
+            latencies.append(commits[position][1] - emitted_at)
+
+    result = {'handled': collector.writer.stats['lines_written'], 'latencies': latencies,
+              'latency_label': 'emit -> file commit'}
+    if args.elastic:
+        result['bulk_latencies'] = stats['bulk_latencies']
+    return dict(result, finished=finished, first_emit=stats['first_emit'], finished_at=finished_at)
+
+
+async def bench_runner(args, base_url: str, work_dir: Path) -> dict:
+    import collector as rc
+
+    rc.GENESYS_LOGIN_URL = rc.GENESYS_API_URL = base_url
+    rc.CLIENT_ID, rc.CLIENT_SECRET = 'bench', 'bench'
+    rc.TOPICS_FILE = str(work_dir / 'no-topics.json')
+    rc.TOPIC_CACHE_FILE = str(work_dir / 'topic_cache.json')
+    rc.ELASTIC_URL = base_url
+    rc.SPOOL_DIR = str(work_dir / 'spool')
+    rc.PROCESS_WORKERS = args.workers
+
+    runner = rc.Runner()
+    async with aiohttp.ClientSession() as probe:
+        # Same start-up sequence as Runner.start(), minus the status server and signal handlers
+        await runner.select_topics()
+        sink_task = asyncio.create_task(runner.sink.start())
+        ws_task = asyncio.create_task(runner._ws_loop())
+
+        async def done():
+            return (await mock_stats(probe, base_url))['bulk_docs'] >= args.events
+
+        finished = await wait_until(done, args.timeout, interval=0.2)
+        finished_at = time.time()
+        stats = await mock_stats(probe, base_url)
+        ws_task.cancel()
+        runner.sink.stop_evt.set()
+        await asyncio.gather(ws_task, sink_task, return_exceptions=True)
+        await runner.session.close()
+
+    return {'handled': stats['bulk_docs'], 'latencies': stats['bulk_latencies'],
+            'latency_label': 'emit -> _bulk receipt', 'finished': finished,
+            'first_emit': stats['first_emit'], 'finished_at': finished_at}
+
+
+def report(target: str, args, result: dict, cpu: float):
+    elapsed = (result['finished_at'] - result['first_emit']) if result['first_emit'] else 0.0
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    ms = lambda v: f'{v * 1000:8.1f} ms' if v is not None else '       n/a'
+    print(f'{target}: {args.events} events @ {args.rate or "max"}/s, frame size {args.size or "natural"}, '
+          f'{args.workers} worker processes'
+          + ('' if result['finished'] else '  [TIMED OUT]'))
+    print(f'  handled        {result["handled"]:>10}')
+    print(f'  events/sec     {result["handled"] / elapsed if elapsed else 0:10.0f}')
+    print(f'  latency p50    {ms(percentile(result["latencies"], 50))}   ({result["latency_label"]})')
+    print(f'  latency p99    {ms(percentile(result["latencies"], 99))}')
+    if 'bulk_latencies' in result:
+        print(f'  bulk p50/p99   {ms(percentile(result["bulk_latencies"], 50))} / '
+              f'{ms(percentile(result["bulk_latencies"], 99)).strip()}   (emit -> _bulk receipt)')
+    print(f'  CPU            {cpu:8.2f} s  ({cpu / max(result["handled"], 1) * 1e6:.1f} us/event)')
+    print(f'  peak RSS       {rss_mb:8.1f} MB')
+
+
+def children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_target(target: str, args):
+    bench = bench_audiohook if target == 'audiohook' else bench_runner
+    with tempfile.TemporaryDirectory() as temp_dir, mock_server(args) as base_url:
+        cpu_start = time.process_time() + children_cpu()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+                contextlib.redirect_stderr(devnull):
+            result = asyncio.run(bench(args, base_url, Path(temp_dir)))
+        # Worker processes are joined at shutdown, so their CPU is in RUSAGE_CHILDREN by now
+        cpu = time.process_time() + children_cpu() - cpu_start
+    report(target, args, result, cpu)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--target', choices=('audiohook', 'runner', 'both'), default='audiohook')
+    parser.add_argument('--rate', type=float, default=2000, help='events per second (0 = as fast as possible)')
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--size', type=int, default=0, help='approximate frame size in bytes')
+    parser.add_argument('--elastic', action='store_true', help='audiohook: also ship to the mock _bulk stub')
+    parser.add_argument('--timeout', type=float, default=300)
+    parser.add_argument('--workers', default='0', help='PROCESS_WORKERS, or a comma-separated list to compare')
+    args = parser.parse_args()
+
+    workers = [int(value) for value in args.workers.split(',')]
+    if args.target == 'both' or len(workers) > 1:
+        # Separate processes so CPU and peak RSS are not shared between runs
+        argv = ['--rate', str(args.rate), '--events', str(args.events), '--size', str(args.size),
+                '--timeout', str(args.timeout)] + (['--elastic'] if args.elastic else [])
+        targets = ('audiohook', 'runner') if args.target == 'both' else (args.target,)
+        for target in targets:
+            for count in workers:
+                subprocess.run([sys.executable, __file__, '--target', target, '--workers', str(count)] + argv,
+                               check=True)
+        return 0
+
+    args.workers = workers[0]
+    run_target(args.target, args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the per-event hot paths, with a regression check
+
+Times the functions every event goes through in both collectors over a
+corpus derived from example_audiohook_events.jsonl (AudioHook events,
+non-AudioHook notifications and channel heartbeats):
+
+- audiohook_collector: is_audiohook_event, format_audiohook_event,
+  handle_websocket_message (incl. duplicate check), write_event,
+  ElasticShipper.build_payload
+  (the _bulk NDJSON assembly behind flush_to_elasticsearch)
+- collector.py: Runner._extract_first_nonempty, Runner.handle_event
+
+Each result is also expressed relative to a fixed pure-Python calibration
+loop, so baselines recorded on one machine remain meaningful on another.
+--check compares the relative costs against benchmarks/baselines.json and
+exits non-zero when any benchmark is slower than baseline * (1 + tolerance).
+
+Usage: python benchmarks/bench_hot_paths.py [--check] [--update] [--tolerance 0.3]
+                                            [--events 2000] [--repeat 7]
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+BASELINES = Path(__file__).with_name('baselines.json')
+
+
+# ---------- Corpus ----------
+def build_corpus(count: int) -> List[Dict[str, Any]]:
+    """Notification messages: 70% AudioHook events, 20% other topics, 10% heartbeats"""
+    lines = (ROOT / 'example_audiohook_events.jsonl').read_text(encoding='utf-8').splitlines()
+    examples = [json.loads(line) for line in lines if line.strip()]
+    corpus = []
+    for i in range(count):
+        kind = i % 10
+        if kind < 7:
+            example = examples[i % len(examples)]
+            body = dict(example['raw_event'], conversationId=f'{i:08x}-0000-4000-8000-000000000000')
+            corpus.append({'topicName': example['topic'], 'version': '2', 'eventBody': body})
+        elif kind < 9:
+            corpus.append({'topicName': 'v2.users.me.presence', 'version': '2', 'eventBody': {
+                'id': f'{i:08x}', 'presenceDefinition': {'id': 'available', 'systemPresence': 'Available'},
+                'modifiedDate': '2024-01-15T10:30:45.123Z', 'source': 'PURECLOUD'}})
+        else:
+            corpus.append({'topicName': 'channel.metadata', 'eventBody': {'message': 'WebSocket Heartbeat'}})
+    return corpus
+
+
+# ---------- Timing ----------
+def best_ns_per_op(run: Callable[[], None], ops: int, repeat: int, setup: Callable[[], None] = None) -> float:
+    """Fastest of `repeat` runs after one warm-up, in nanoseconds per operation (GC paused, as timeit does)"""
+    best = float('inf')
+    for attempt in range(repeat + 1):
+        if setup is not None:
+            setup()
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter_ns()
+            run()
+            elapsed = time.perf_counter_ns() - started
+        finally:
+            gc.enable()
+        if attempt:
+            best = min(best, elapsed)
+    return best / ops
+
+
+def calibration(count: int) -> Callable[[], None]:
+    """Fixed interpreter workload (dict/str/attribute churn) used to normalize results"""
+    keys = [f'key-{i}' for i in range(16)]
+
+    def run():
+        for i in range(count):
+            d = {k: i for k in keys}
+            s = '-'.join(keys[:4]).lower()
+            if 'key' in s and d.get('key-3') == i:
+                d['x'] = s.upper()
+    return run
+
+
+def benchmarks(corpus: List[Dict[str, Any]], loop: asyncio.AbstractEventLoop):
+    """Return ({name: (run, ops, setup)}, cleanup)"""
+    import audiohook_collector as ac
+    import collector as rc
+
+    collector = ac.AudioHookCollector()
+    collector.channel_id = 'bench-channel'
+    bodies = [m['eventBody'] for m in corpus]
+    audiohook = [m for m in corpus if collector.is_audiohook_event(m['eventBody'])]
+    formatted = [collector.format_audiohook_event(m['eventBody'], m['topicName']) for m in audiohook]
+    envelopes = [ac.EventEnvelope(event, doc_id=ac.event_key(event['raw_event'])) for event in formatted]
+    items = [ac.ElasticShipper.bulk_item(envelope.data, envelope.doc_id) for envelope in envelopes]
+
+    def reset_queues():
+        for name in ('file_queue', 'elastic_queue'):
+            queue = getattr(collector, name)
+            setattr(collector, name, ac.PipelineQueue(queue.name, max(len(corpus), 1)))
+        collector.recent_events = ac.RecentEvents(ac.RECENT_EVENTS_MAX)
+        collector.dedup = ac.DedupCache(ac.DEDUP_WINDOW_SECONDS, ac.DEDUP_MAX_ENTRIES, ac.DEDUP_BLOOM_BITS)
+
+    async def handle_all():
+        for message in corpus:
+            await collector.handle_websocket_message(message)
+
+    async def write_all():
+        for envelope in envelopes:
+            await collector.write_event(envelope)
+
+    def build_payloads():
+        for i in range(0, len(items), ac.BULK_SIZE):
+            ac.ElasticShipper.build_payload(items[i:i + ac.BULK_SIZE])
+
+    async def make_runner():
+        return rc.Runner()
+    runner = loop.run_until_complete(make_runner())
+    extract_keys = ['eventDefinitionId', 'code', 'eventId']
+    runner_bodies = [b if isinstance(b, dict) else {} for b in bodies]
+
+    def reset_runner():
+        runner.sink.queue = asyncio.Queue()
+        runner.dedup = rc.DedupCache(rc.DEDUP_WINDOW_SECONDS, rc.DEDUP_MAX_ENTRIES, rc.DEDUP_BLOOM_BITS)
+
+    async def runner_all():
+        for message in corpus:
+            await runner.handle_event(message)
+
+    def classify_all():
+        for body in bodies:
+            collector.is_audiohook_event(body)
+
+    def format_all():
+        for message in audiohook:
+            collector.format_audiohook_event(message['eventBody'], message['topicName'])
+
+    def extract_all():
+        for body in runner_bodies:
+            rc.Runner._extract_first_nonempty(body, extract_keys)
+
+    suite = {
+        'is_audiohook_event': (classify_all, len(bodies), None),
+        'format_audiohook_event': (format_all, len(audiohook), None),
+        'handle_websocket_message': (lambda: loop.run_until_complete(handle_all()), len(corpus), reset_queues),
+        'write_event': (lambda: loop.run_until_complete(write_all()), len(envelopes), reset_queues),
+        'bulk_build_payload': (build_payloads, len(items), None),
+        'runner_extract_first_nonempty': (extract_all, len(runner_bodies), None),
+        'runner_handle_event': (lambda: loop.run_until_complete(runner_all()), len(corpus), reset_runner),
+    }
+    return suite, lambda: loop.run_until_complete(runner.session.close())
+
+
+def measure(args) -> Dict[str, Any]:
+    corpus = build_corpus(args.events)
+    loop = asyncio.new_event_loop()
+    try:
+        calib_ns = best_ns_per_op(calibration(args.events), args.events, args.repeat)
+        results = {}
+        # Collector log lines are part of the real per-event cost but not of the report
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            suite, cleanup = benchmarks(corpus, loop)
+            for name, (run, ops, setup) in suite.items():
+                ns = best_ns_per_op(run, ops, args.repeat, setup)
+                results[name] = {'ns_per_op': round(ns, 1), 'relative': round(ns / calib_ns, 4)}
+            cleanup()
+    finally:
+        loop.close()
+    return {'calibration_ns_per_op': round(calib_ns, 1), 'events': args.events, 'benchmarks': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--events', type=int, default=2000, help='corpus size')
+    parser.add_argument('--repeat', type=int, default=7, help='runs per benchmark (fastest is kept)')
+    parser.add_argument('--check', action='store_true', help='fail on regressions against the baselines')
+    parser.add_argument('--update', action='store_true', help='write the results as the new baselines')
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help='allowed slowdown as a fraction (default: value stored in baselines, else 0.3)')
+    parser.add_argument('--baselines', default=str(BASELINES))
+    args = parser.parse_args()
+
+    current = measure(args)
+    baseline_path = Path(args.baselines)
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8')) if baseline_path.exists() else None
+    tolerance = args.tolerance if args.tolerance is not None else (baseline or {}).get('tolerance', 0.3)
+
+    regressions = []
+    print(f'calibration: {current["calibration_ns_per_op"]:.0f} ns/op')
+    print(f'{"benchmark":<32}{"ns/op":>10}{"relative":>10}{"baseline":>10}{"change":>9}')
+    for name, result in current['benchmarks'].items():
+        base = (baseline or {}).get('benchmarks', {}).get(name)
+        line = f'{name:<32}{result["ns_per_op"]:>10.0f}{result["relative"]:>10.3f}'
+        if base:
+            change = result['relative'] / base['relative'] - 1
+            line += f'{base["relative"]:>10.3f}{change:>+9.1%}'
+            if change > tolerance:
+                regressions.append(name)
+                line += '  REGRESSION'
+        print(line)
+
+    if args.update:
+        baseline_path.write_text(json.dumps(dict(current, tolerance=tolerance), indent=2) + '\n', encoding='utf-8')
+        print(f'baselines written to {baseline_path}')
+    if args.check:
+        if baseline is None:
+            print(f'no baselines at {baseline_path}; run with --update first')
+            return 2
+        if regressions:
+            print(f'{len(regressions)} regression(s) beyond {tolerance:.0%}: {", ".join(regressions)}')
+            return 1
+        print(f'no regressions beyond {tolerance:.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Local Genesys Cloud stand-in for load-testing the collectors
+
+Serves the endpoints both collectors use, on one port:
+- POST /oauth/token                                       client-credentials token
+- POST /api/v2/notifications/channels                     channel create (connectUri -> /channels/<id>)
+- PUT  /api/v2/notifications/channels/<id>/subscriptions  subscription echo
+- GET  /api/v2/notifications/availabletopics              a few AudioHook topics plus noise
+- GET  /channels/<id>                                     WebSocket emitting AudioHook events
+- POST /_bulk                                             Elasticsearch _bulk stub
+- GET  /_mock/stats                                       emitted/received counts and bulk latencies
+
+Events are built from example_audiohook_events.jsonl. Each eventBody carries
+`seq` and `emittedAt` (epoch seconds at send time) so a benchmark can compute
+end-to-end latency; `--size` pads eventBody to roughly that many bytes.
+
+Like Genesys, one emitter publishes each event on an AudioHook topic and the
+identical frame goes to every open socket whose channel subscribes to that
+topic: events published while no socket carries the topic are lost (counted
+as `missed`), and overlapping channels receive duplicates. Emission starts
+once `--sockets` sockets are open (or two seconds after the first one).
+
+Point a collector at it with GENESYS_LOGIN_URL / GENESYS_API_URL (and
+ELASTIC_URL for the _bulk stub).
+
+Usage: python benchmarks/mock_genesys.py [--port 9100] [--rate 1000] [--events 10000] [--size 0]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TOPICS = [
+    'platform.integration.audiohook',
+    'platform.operations.audiohook',
+    'v2.auditing.integration.audiohook',
+    'v2.users.me.presence',
+    'channel.metadata'
+]
+
+
+def load_templates() -> List[Dict[str, Any]]:
+    """Raw AudioHook event bodies from the example output file"""
+    lines = (ROOT / 'example_audiohook_events.jsonl').read_text(encoding='utf-8').splitlines()
+    return [json.loads(line)['raw_event'] for line in lines if line.strip()]
+
+
+class MockGenesys:
+    """aiohttp app standing in for the Genesys OAuth/API/notification hosts and Elasticsearch"""
+
+    def __init__(self, rate: float = 1000, events: int = 10000, size: int = 0,
+                 host: str = '127.0.0.1', port: int = 0, sockets: int = 1):
+        self.rate = rate
+        self.events = events
+        self.size = size
+        self.sockets = sockets
+        self.host = host
+        self.port = port
+        self.base_url: Optional[str] = None
+        self.templates = load_templates()
+        self.emitted = 0
+        self.delivered = 0
+        self.missed = 0
+        self.first_emit: Optional[float] = None
+        self.last_emit: Optional[float] = None
+        self.channels: Dict[str, List[str]] = {}
+        self.open_sockets: Dict[web.WebSocketResponse, str] = {}  # socket -> channel id
+        self._emitter: Optional[asyncio.Task] = None
+        self._first_socket_at: Optional[float] = None
+        self.tokens_issued = 0
+        self.topic_requests = 0
+        self.bulk_requests = 0
+        self.bulk_docs = 0
+        self.bulk_latencies: List[float] = []
+        self._runner: Optional[web.AppRunner] = None
+
+    # ---------- Genesys API ----------
+    async def token(self, request):
+        self.tokens_issued += 1
+        return web.json_response({'access_token': uuid.uuid4().hex, 'token_type': 'bearer', 'expires_in': 86400})
+
+    async def create_channel(self, request):
+        channel_id = uuid.uuid4().hex
+        self.channels[channel_id] = []
+        ws_base = self.base_url.replace('http://', 'ws://', 1)
+        return web.json_response({'id': channel_id, 'connectUri': f'{ws_base}/channels/{channel_id}'})
+
+    async def subscribe(self, request):
+        body = json.loads(await request.read() or b'{}')
+        topics = [t['id'] for t in body.get('topics', [])]
+        self.channels[request.match_info['channel_id']] = topics
+        return web.json_response({'entities': [{'id': t} for t in topics]})
+
+    async def available_topics(self, request):
+        self.topic_requests += 1
+        return web.json_response([{'id': t, 'description': t} for t in TOPICS])
+
+    # ---------- Notifications WebSocket ----------
+    def build_frame(self, seq: int, topic: str) -> str:
+        body = dict(self.templates[seq % len(self.templates)])
+        body['conversationId'] = f'{seq:08x}-0000-4000-8000-000000000000'
+        body['seq'] = seq
+        body['emittedAt'] = time.time()
+        frame = {'topicName': topic, 'version': '2', 'eventBody': body}
+        if self.size:
+            pad = self.size - len(json.dumps(frame))
+            if pad > 0:
+                body['detail'] = 'x' * pad
+        return json.dumps(frame)
+
+    async def publish(self, frame: str, topic: str):
+        """Send a frame to every open socket subscribed to its topic"""
+        targets = [ws for ws, channel_id in list(self.open_sockets.items())
+                   if topic in self.channels.get(channel_id, ()) and not ws.closed]
+        if not targets:
+            self.missed += 1
+        for ws in targets:
+            try:
+                await ws.send_str(frame)
+                self.delivered += 1
+            except ConnectionError:
+                pass
+
+    async def emit(self):
+        """Publish the event budget at the configured rate"""
+        topics = [t for t in TOPICS if 'audiohook' in t]
+        while len(self.open_sockets) < self.sockets and time.monotonic() - self._first_socket_at < 2.0:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)  # Let the last subscriptions land
+
+        started = time.monotonic()
+        self.first_emit = time.time()
+        while self.emitted < self.events:
+            due = self.events if self.rate <= 0 else int((time.monotonic() - started) * self.rate) + 1
+            while self.emitted < min(due, self.events):
+                topic = topics[self.emitted % len(topics)]
+                await self.publish(self.build_frame(self.emitted, topic), topic)
+                self.emitted += 1
+            self.last_emit = time.time()
+            await asyncio.sleep(0.005 if self.rate > 0 else 0)
+
+    async def channel_ws(self, request):
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        self.open_sockets[ws] = request.match_info['channel_id']
+        if self._emitter is None:
+            self._first_socket_at = time.monotonic()
+            self._emitter = asyncio.create_task(self.emit())
+        try:
+            async for _ in ws:  # Answer heartbeats until the client goes away
+                pass
+        finally:
+            self.open_sockets.pop(ws, None)
+        return ws
+
+    # ---------- Elasticsearch ----------
+    async def bulk(self, request):
+        received = time.time()
+        lines = (await request.read()).splitlines()
+        docs = lines[1::2]
+        self.bulk_requests += 1
+        self.bulk_docs += len(docs)
+        for doc in docs:
+            try:
+                source = json.loads(doc)
+            except ValueError:
+                continue
+            # audiohook_collector keeps the body under raw_event, collector.py under event
+            body = source.get('raw_event') or source.get('event') or {}
+            if 'emittedAt' in body:
+                self.bulk_latencies.append(received - body['emittedAt'])
+        return web.json_response({'took': 1, 'errors': False,
+                                  'items': [{'index': {'status': 201}} for _ in docs]})
+
+    async def stats(self, request):
+        return web.json_response({
+            'emitted': self.emitted,
+            'delivered': self.delivered,
+            'missed': self.missed,
+            'open_sockets': len(self.open_sockets),
+            'first_emit': self.first_emit,
+            'last_emit': self.last_emit,
+            'channels': len(self.channels),
+            'tokens_issued': self.tokens_issued,
+            'topic_requests': self.topic_requests,
+            'bulk_requests': self.bulk_requests,
+            'bulk_docs': self.bulk_docs,
+            'bulk_latencies': self.bulk_latencies
+        })
+
+    # ---------- Lifecycle ----------
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/oauth/token', self.token)
+        app.router.add_post('/api/v2/notifications/channels', self.create_channel)
+        app.router.add_put('/api/v2/notifications/channels/{channel_id}/subscriptions', self.subscribe)
+        app.router.add_get('/api/v2/notifications/availabletopics', self.available_topics)
+        app.router.add_get('/channels/{channel_id}', self.channel_ws)
+        app.router.add_post('/_bulk', self.bulk)
+        app.router.add_get('/_mock/stats', self.stats)
+        return app
+
+    async def start(self) -> str:
+        """Start serving and return the base URL"""
+        self._runner = web.AppRunner(self.app(), handle_signals=False)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.base_url = f'http://{self.host}:{port}'
+        return self.base_url
+
+    async def stop(self):
+        if self._emitter is not None:
+            self._emitter.cancel()
+            await asyncio.gather(self._emitter, return_exceptions=True)
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def serve(args):
+    mock = MockGenesys(args.rate, args.events, args.size, args.host, args.port, args.sockets)
+    base_url = await mock.start()
+    print(f'READY {base_url}', flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await mock.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100, help='0 picks a free port')
+    parser.add_argument('--rate', type=float, default=1000, help='events per second (0 = as fast as possible)')
+    parser.add_argument('--events', type=int, default=10000, help='total events to emit')
+    parser.add_argument('--size', type=int, default=0, help='approximate frame size in bytes')
+    parser.add_argument('--sockets', type=int, default=1, help='open sockets to wait for before emitting')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
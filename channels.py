@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Notification channel pool shared by both collectors
+
+Partitions the subscribed topics across several Genesys notification
+channels so that each WebSocket carries a share of the traffic and a
+reconnect only affects that share. The pool only decides which topics each
+channel should carry; the collectors own the HTTP/WebSocket calls and
+re-PUT a channel's subscriptions whenever its topic list changes.
+
+Rebalancing:
+- When a channel goes down, its topics are moved onto the connected
+  channels (fewest topics first, up to max_topics each) so they keep
+  flowing while it is re-created.
+- When a drained channel comes back, all topics are re-partitioned evenly
+  across the connected channels.
+
+Rotation: a channel can be replaced make-before-break. While the old and new
+sockets overlap, an OverlapFilter drops the second copy of each frame.
+"""
+
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+
+def partition_topics(topics: List[str], count: int) -> List[List[str]]:
+    """Deal topics round-robin into `count` lists (stable for the same input)"""
+    shares: List[List[str]] = [[] for _ in range(max(1, count))]
+    for i, topic in enumerate(topics):
+        shares[i % len(shares)].append(topic)
+    return shares
+
+
+class ChannelState:
+    """One notification channel: identity, assigned topics and health counters"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.channel_id: Optional[str] = None
+        self.connect_uri: Optional[str] = None
+        self.topics: List[str] = []
+        self.connected = False
+        self.connected_since: Optional[float] = None
+        self.overlap: Optional['OverlapFilter'] = None  # Set while a rotation overlaps two sockets
+        self.stats = {
+            'connects': 0,
+            'disconnects': 0,
+            'fast_reconnects': 0,
+            'channels_created': 0,
+            'messages': 0,
+            'errors': 0,
+            'gaps': 0,
+            'gap_seconds_total': 0.0,
+            'last_gap_seconds': None,
+            'max_gap_seconds': 0.0,
+            'rotations': 0,
+            'rotation_failures': 0,
+            'last_overlap_seconds': None,
+            'overlap_duplicates': 0
+        }
+
+    def mark_connected(self):
+        self.connected = True
+        self.connected_since = time.time()
+        self.stats['connects'] += 1
+
+    def mark_disconnected(self):
+        if self.connected:
+            self.stats['disconnects'] += 1
+        self.connected = False
+        self.connected_since = None
+
+    def record_gap(self, seconds: float):
+        """Account for a period in which this channel's topics had no socket"""
+        self.stats['gaps'] += 1
+        self.stats['gap_seconds_total'] = round(self.stats['gap_seconds_total'] + seconds, 3)
+        self.stats['last_gap_seconds'] = round(seconds, 3)
+        self.stats['max_gap_seconds'] = round(max(self.stats['max_gap_seconds'], seconds), 3)
+
+    def reset(self):
+        """Forget the channel so the next connect creates a new one"""
+        self.channel_id = None
+        self.connect_uri = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            index=self.index,
+            channel_id=self.channel_id,
+            connected=self.connected,
+            uptime_seconds=round(time.time() - self.connected_since, 1) if self.connected_since else 0.0,
+            topics=len(self.topics)
+        )
+
+
+class OverlapFilter:
+    """Recognizes frames delivered by both sockets while a channel is rotated
+
+    Genesys sends the same frame to every channel subscribed to its topic, so
+    during an overlap each frame arrives at most twice: the first copy is
+    remembered (by hash) and the second one is reported as a duplicate.
+    """
+
+    def __init__(self, window: float = 60.0):
+        self.window = window
+        self._seen: Dict[int, float] = {}
+
+    def is_duplicate(self, frame: str) -> bool:
+        key = hash(frame)
+        now = time.monotonic()
+        expires = self._seen.pop(key, None)
+        if expires is not None and expires > now:
+            return True
+        self._seen[key] = now + self.window
+        return False
+
+
+class ChannelPool:
+    """Topic-to-channel assignment with failover and rebalancing"""
+
+    def __init__(self, topics: List[str], count: int = 1, max_topics: int = 1000):
+        self.max_topics = max(1, max_topics)
+        self.topics = list(topics)
+        needed = max(1, count, math.ceil(len(self.topics) / self.max_topics))
+        needed = min(needed, max(1, len(self.topics)))  # No point in channels without topics
+        self.channels = [ChannelState(i) for i in range(needed)]
+        for channel, share in zip(self.channels, partition_topics(self.topics, needed)):
+            channel.topics = share
+        self.rebalances = 0
+        self.unassigned: List[str] = []
+
+    def plan_failover(self, failed: ChannelState) -> List[ChannelState]:
+        """Move a failed channel's topics onto connected channels; returns the channels that changed"""
+        targets = [c for c in self.channels if c is not failed and c.connected]
+        if not targets or not failed.topics:
+            return []
+
+        changed = []
+        leftover = []
+        for topic in failed.topics:
+            target = min(targets, key=lambda c: len(c.topics))
+            if len(target.topics) >= self.max_topics:
+                leftover.append(topic)
+                continue
+            target.topics.append(topic)
+            if target not in changed:
+                changed.append(target)
+        failed.topics = leftover
+        if changed:
+            self.rebalances += 1
+        return changed
+
+    def plan_rebalance(self) -> List[ChannelState]:
+        """Spread all topics evenly over the connected channels; returns the channels that changed"""
+        connected = [c for c in self.channels if c.connected]
+        if not connected:
+            return []
+
+        shares = partition_topics(self.topics, len(connected))
+        self.unassigned = [t for share in shares for t in share[self.max_topics:]]
+        changed = []
+        for channel, share in zip(connected, shares):
+            share = share[:self.max_topics]
+            if share != channel.topics:
+                channel.topics = share
+                changed.append(channel)
+        for channel in self.channels:
+            if not channel.connected:
+                channel.topics = []
+        if changed:
+            self.rebalances += 1
+        return changed
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'channels': [c.snapshot() for c in self.channels],
+            'connected': sum(1 for c in self.channels if c.connected),
+            'rebalances': self.rebalances,
+            'unassigned_topics': len(self.unassigned)
+        }
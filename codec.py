@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON codec shared by both collectors
+
+Uses orjson (bytes in / bytes out) when it is installed and falls back to the
+stdlib json module otherwise. Both backends produce compact UTF-8 output, so
+files and bulk payloads look the same whichever one is active.
+
+Set JSON_CODEC=json to force the stdlib backend (JSON_CODEC=auto is the default).
+"""
+
+import json
+import os
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # Optional dependency
+    orjson = None
+
+JSON_CODEC = os.environ.get('JSON_CODEC', 'auto').strip().lower()
+
+# Raised by loads() for malformed input (orjson.JSONDecodeError subclasses it too)
+DecodeError = ValueError
+
+
+def _json_loads(data: Union[bytes, str]) -> Any:
+    return json.loads(data)
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def use_backend(name: str) -> str:
+    """Select 'orjson' or 'json' ('auto' picks orjson when available); returns the active backend"""
+    global BACKEND, loads, dumps
+    if name in ('auto', 'orjson') and orjson is not None:
+        BACKEND, loads, dumps = 'orjson', orjson.loads, orjson.dumps
+    else:
+        BACKEND, loads, dumps = 'json', _json_loads, _json_dumps
+    return BACKEND
+
+def dumps_str(obj: Any) -> str:
+    """Serialize to a str (for text outputs such as console logs)"""
+    return dumps(obj).decode('utf-8')
+
+
+BACKEND = 'json'
+loads = _json_loads
+dumps = _json_dumps
+use_backend(JSON_CODEC)
@@ -10,16 +10,25 @@ WHAT IT DOES
 - Normalizes operational events (code, severity, entityId, integrationId) for alerting & KPIs.
 - Batches and ships JSON docs to Elastic via _bulk with backoff.
 - Emits in-memory counters for quick success/error trending (and optional /stats endpoint).
+- Keeps sliding 1m/5m/1h counts per code, severity, integration and topic, plus the noisiest
+  conversations and integrations (approximate top-K), on /stats (see window_stats.py).
+- Evaluates local alert rules (thresholds / rate of change per code or integration) on the
+  live stream and posts alerts to webhooks, without waiting for Elastic (see alerts.py).
+- Exposes Prometheus counters and bulk latency histograms on the optional /metrics endpoint.
 
 RUNTIME REQUIREMENTS
 - Python 3.9+ recommended.
-- pip install aiohttp
+- pip install aiohttp (optional: orjson for faster JSON, see codec.py)
 
 CONFIG (environment variables)
   # Genesys
   GENESYS_ENV=usw2.pure.cloud
   GENESYS_CLIENT_ID=...
   GENESYS_CLIENT_SECRET=...
+  GENESYS_LOGIN_URL=                   # optional override of https://login.<GENESYS_ENV> (e.g. a local mock)
+  GENESYS_API_URL=                     # optional override of https://api.<GENESYS_ENV>
+  TOKEN_REFRESH_MARGIN_SECONDS=300     # the OAuth token is renewed in the background this long before expiry
+  TOKEN_CACHE_FILE=                    # optional 0600 file caching the token across restarts
 
   # Topic selection
   AUTO_DISCOVER_AUDIOHOOK=true         # if true and topics.json not provided/non-empty, query available topics
@@ -27,6 +36,20 @@ CONFIG (environment variables)
   TOPIC_INCLUDE_REGEX=audiohook        # optional regex to further filter discovered topics (default 'audiohook')
   TOPIC_EXCLUDE_REGEX=                 # optional regex to exclude noisy topics
   FALLBACK_TOPICS=channel.metadata,v2.users.me.presence  # used if discovery yields nothing
+  TOPIC_CACHE_FILE=./topic_cache.json  # discovered (filtered) topics persisted across restarts; empty = memory only
+  TOPIC_CACHE_TTL_SECONDS=86400        # rediscover in the background after this; 0 = rediscover on every start
+
+  # Classification rules (AudioHook heuristics + severity buckets, see rules.py)
+  RULES_FILE=./rules.json              # missing file = built-in rules; edits are picked up while running
+  RULES_RELOAD_SECONDS=5               # how often the file is checked; 0 disables hot reload
+
+  # Channel pool (topics are split across channels, each with its own WebSocket)
+  CHANNEL_COUNT=1
+  MAX_TOPICS_PER_CHANNEL=1000          # Genesys per-channel topic limit; more channels are added if needed
+
+  # Worker processes (decode + normalization off the event loop, partitioned by conversationId/entityId)
+  PROCESS_WORKERS=0                    # 0 = normalize on the event loop
+  WORKER_BATCH_SIZE=200                # frames per hand-off to a worker
 
   # Elastic sink
   ELASTIC_URL=https://elastic.example:9200
@@ -41,18 +64,58 @@ CONFIG (environment variables)
   RETRY_BASE_SLEEP=1.5
   RETRY_MAX_SLEEP=30
 
+  # Duplicate suppression (event identity key also becomes the Elastic _id)
+  DEDUP_WINDOW_SECONDS=300             # 0 disables suppression (docs still get deterministic _ids)
+  DEDUP_MAX_ENTRIES=100000
+  DEDUP_BLOOM_BITS=0                   # >0 adds a rotating Bloom filter for windows beyond DEDUP_MAX_ENTRIES
+
+  # Outage spool (bulk payloads that still fail are kept on disk and replayed)
+  SPOOL_DIR=./elastic_spool            # empty disables spooling
+  SPOOL_SEGMENT_BYTES=16777216
+  SPOOL_MAX_BYTES=1073741824
+  SPOOL_REPLAY_RATE=5                  # bulk payloads per second while draining
+
   # Optional mini HTTP status server
   HTTP_STATUS_ENABLED=true
   HTTP_STATUS_HOST=0.0.0.0
   HTTP_STATUS_PORT=8077
+  STATS_TOP_K=10                       # noisiest conversations/integrations listed on /stats; 0 disables
+  STATS_TOP_K_SECONDS=300              # the top-K ranking covers the last one to two of these periods
+
+  # Local alerts (rules and webhooks in a JSON file, see alerts.py)
+  ALERT_RULES_FILE=./alerts.json       # missing file = alerting disabled
+  ALERT_WEBHOOK_URL=                   # the 'default' webhook, for rules that name none
+  ALERT_QUEUE_SIZE=1000                # alerts waiting for a webhook; more are dropped (and counted)
+  ALERT_CONCURRENCY=2
+  ALERT_MAX_RETRIES=3
+  ALERT_TIMEOUT_SECONDS=5
+  ALERT_MAX_GROUPS=10000               # group windows kept per rule
+
+  # Logging (lines are formatted and written by a background thread)
+  LOG_LEVEL=INFO                       # DEBUG | INFO | WARN | ERROR; filtered before any formatting
+  LOG_ASYNC=true                       # false writes each line synchronously (debugging)
+  LOG_QUEUE_SIZE=10000                 # lines beyond this are dropped (and counted), never waited on
 """
 
-import asyncio, json, os, re, signal, sys, time
+import asyncio, json, multiprocessing, os, re, signal, sys, time
 from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional
 import aiohttp
 from aiohttp import web
 
+import codec
+import metrics
+from alerts import AlertDispatcher, AlertEngine, load_alert_rules
+from channels import ChannelPool, ChannelState
+from dedup import DedupCache, event_key
+from logpipe import LogPipeline
+from partition import PartitionedPool
+from rules import RuleEngine
+from spool import BulkSpool, replay_spool
+from token_manager import TokenManager
+from topic_cache import TopicCache
+from window_stats import EventStats
+
 # ----------------------- Config -----------------------
 def getenv_bool(name: str, default: bool) -> bool:
     val = os.environ.get(name, str(default)).strip().lower()
@@ -61,11 +124,23 @@ def getenv_bool(name: str, default: bool) -> bool:
 GENESYS_ENV        = os.environ.get("GENESYS_ENV", "usw2.pure.cloud")
 CLIENT_ID          = os.environ.get("GENESYS_CLIENT_ID", "")
 CLIENT_SECRET      = os.environ.get("GENESYS_CLIENT_SECRET", "")
+GENESYS_LOGIN_URL  = os.environ.get("GENESYS_LOGIN_URL", "").rstrip("/")
+GENESYS_API_URL    = os.environ.get("GENESYS_API_URL", "").rstrip("/")
+TOKEN_REFRESH_MARGIN_SECONDS = float(os.environ.get("TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+TOKEN_CACHE_FILE   = os.environ.get("TOKEN_CACHE_FILE", "")
 
 AUTO_DISCOVER      = getenv_bool("AUTO_DISCOVER_AUDIOHOOK", True)
 TOPICS_FILE        = os.environ.get("TOPICS_FILE", "./topics.json")
 TOPIC_INCLUDE_RGX  = os.environ.get("TOPIC_INCLUDE_REGEX", "audiohook").strip()
 TOPIC_EXCLUDE_RGX  = os.environ.get("TOPIC_EXCLUDE_REGEX", "").strip()
+CHANNEL_COUNT      = int(os.environ.get("CHANNEL_COUNT", "1"))
+MAX_TOPICS_PER_CHANNEL = int(os.environ.get("MAX_TOPICS_PER_CHANNEL", "1000"))
+PROCESS_WORKERS    = int(os.environ.get("PROCESS_WORKERS", "0"))
+WORKER_BATCH_SIZE  = int(os.environ.get("WORKER_BATCH_SIZE", "200"))
+TOPIC_CACHE_FILE   = os.environ.get("TOPIC_CACHE_FILE", "./topic_cache.json")
+TOPIC_CACHE_TTL_SECONDS = float(os.environ.get("TOPIC_CACHE_TTL_SECONDS", "86400"))
+RULES_FILE         = os.environ.get("RULES_FILE", "./rules.json")
+RULES_RELOAD_SECONDS = float(os.environ.get("RULES_RELOAD_SECONDS", "5"))
 FALLBACK_TOPICS    = [t for t in os.environ.get("FALLBACK_TOPICS", "channel.metadata,v2.users.me.presence").split(",") if t]
 
 ELASTIC_URL        = os.environ.get("ELASTIC_URL", "")
@@ -79,25 +154,54 @@ BULK_CONCURRENCY   = int(os.environ.get("BULK_CONCURRENCY", "2"))
 RETRY_BASE_SLEEP   = float(os.environ.get("RETRY_BASE_SLEEP", "1.5"))
 RETRY_MAX_SLEEP    = float(os.environ.get("RETRY_MAX_SLEEP", "30"))
 
+DEDUP_WINDOW_SECONDS = float(os.environ.get("DEDUP_WINDOW_SECONDS", "300"))
+DEDUP_MAX_ENTRIES  = int(os.environ.get("DEDUP_MAX_ENTRIES", "100000"))
+DEDUP_BLOOM_BITS   = int(os.environ.get("DEDUP_BLOOM_BITS", "0"))
+
+SPOOL_DIR          = os.environ.get("SPOOL_DIR", "./elastic_spool")
+SPOOL_SEGMENT_BYTES= int(os.environ.get("SPOOL_SEGMENT_BYTES", "16777216"))
+SPOOL_MAX_BYTES    = int(os.environ.get("SPOOL_MAX_BYTES", "1073741824"))
+SPOOL_REPLAY_RATE  = float(os.environ.get("SPOOL_REPLAY_RATE", "5"))
+
 HTTP_STATUS_ENABLED= getenv_bool("HTTP_STATUS_ENABLED", True)
 HTTP_STATUS_HOST   = os.environ.get("HTTP_STATUS_HOST", "0.0.0.0")
 HTTP_STATUS_PORT   = int(os.environ.get("HTTP_STATUS_PORT", "8077"))
+STATS_TOP_K        = int(os.environ.get("STATS_TOP_K", "10"))
+STATS_TOP_K_SECONDS= float(os.environ.get("STATS_TOP_K_SECONDS", "300"))
+
+ALERT_RULES_FILE   = os.environ.get("ALERT_RULES_FILE", "./alerts.json")
+ALERT_WEBHOOK_URL  = os.environ.get("ALERT_WEBHOOK_URL", "")
+ALERT_QUEUE_SIZE   = int(os.environ.get("ALERT_QUEUE_SIZE", "1000"))
+ALERT_CONCURRENCY  = int(os.environ.get("ALERT_CONCURRENCY", "2"))
+ALERT_MAX_RETRIES  = int(os.environ.get("ALERT_MAX_RETRIES", "3"))
+ALERT_TIMEOUT_SECONDS = float(os.environ.get("ALERT_TIMEOUT_SECONDS", "5"))
+ALERT_MAX_GROUPS   = int(os.environ.get("ALERT_MAX_GROUPS", "10000"))
+
+LOG_LEVEL          = os.environ.get("LOG_LEVEL", "INFO").strip().upper()
+LOG_ASYNC          = getenv_bool("LOG_ASYNC", True)
+LOG_QUEUE_SIZE     = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+
+RULES = RuleEngine(RULES_FILE, RULES_RELOAD_SECONDS)
+SEVERITY_COUNTERS = {"error": "op_errors", "warn": "op_warns"}  # Other buckets count as op_infos
+is_audiohook_signal = RULES.predicate("audiohook_signal")  # Recompiled in place on reload
 
 # ----------------------- Logging -----------------------
 def now_utc_iso():
     return datetime.now(timezone.utc).isoformat()
 
+LOGS = LogPipeline(("ts", "lvl", "msg"), LOG_LEVEL, LOG_QUEUE_SIZE, LOG_ASYNC)
+
 def log(msg, **kv):
-    line = {"ts": now_utc_iso(), "lvl": "INFO", "msg": msg, **kv}
-    print(json.dumps(line, ensure_ascii=False), flush=True)
+    if LOGS.enabled_for("INFO"):
+        LOGS.emit("INFO", msg, kv)
 
 def wlog(msg, **kv):
-    line = {"ts": now_utc_iso(), "lvl": "WARN", "msg": msg, **kv}
-    print(json.dumps(line, ensure_ascii=False), flush=True, file=sys.stderr)
+    if LOGS.enabled_for("WARN"):
+        LOGS.emit("WARN", msg, kv, err=True)
 
 def elog(msg, **kv):
-    line = {"ts": now_utc_iso(), "lvl": "ERROR", "msg": msg, **kv}
-    print(json.dumps(line, ensure_ascii=False), flush=True, file=sys.stderr)
+    if LOGS.enabled_for("ERROR"):
+        LOGS.emit("ERROR", msg, kv, err=True)
 
 # ----------------------- Auth helpers -----------------------
 def elastic_auth_headers() -> Dict[str, str]:
@@ -111,27 +215,39 @@ def elastic_auth_headers() -> Dict[str, str]:
     return {"Authorization": ELASTIC_AUTH if ELASTIC_AUTH.lower().startswith(("bearer ", "apikey ")) else f"Bearer {ELASTIC_AUTH}"}
 
 # ----------------------- Genesys API -----------------------
+def login_base() -> str:
+    return GENESYS_LOGIN_URL or f"https://login.{GENESYS_ENV}"
+
+def api_base() -> str:
+    return GENESYS_API_URL or f"https://api.{GENESYS_ENV}"
+
 class GenesysClient:
     def __init__(self, session: aiohttp.ClientSession):
         self.session = session
-        self.token: Optional[str] = None
-        self.expires_at: float = 0.0
-
-    async def _get_token(self) -> str:
-        # Reuse token until near expiry
-        if self.token and time.time() < self.expires_at - 30:
-            return self.token
-        url = f"https://login.{GENESYS_ENV}/oauth/token"
+        self.token_seconds = metrics.Histogram("genesys_collector_token_refresh_seconds",
+                                               "OAuth token request latency", ("outcome",))
+        # Single-flight, proactively renewed token (see token_manager.py)
+        self.tokens = TokenManager(self._request_token, TOKEN_REFRESH_MARGIN_SECONDS, TOKEN_CACHE_FILE,
+                                   f"{login_base()}|{CLIENT_ID}", self.token_seconds.observe)
+
+    async def _request_token(self):
+        url = f"{login_base()}/oauth/token"
         data = {"grant_type": "client_credentials"}
         auth = aiohttp.BasicAuth(CLIENT_ID, CLIENT_SECRET)
-        async with self.session.post(url, data=data, auth=auth) as r:
-            txt = await r.text()
-            if r.status != 200:
-                raise RuntimeError(f"TokenFailed {r.status} {txt[:400]}")
-            js = json.loads(txt)
-            self.token = js["access_token"]
-            self.expires_at = time.time() + int(js.get("expires_in", 3600))
-            return self.token
+        try:
+            async with self.session.post(url, data=data, auth=auth) as r:
+                txt = await r.text()
+                if r.status != 200:
+                    raise RuntimeError(f"TokenFailed {r.status} {txt[:400]}")
+        except Exception as e:
+            wlog("OAuth token request failed", err=str(e))
+            raise
+        js = json.loads(txt)
+        log("OAuth token obtained", expires_in=js.get("expires_in", 3600))
+        return js["access_token"], int(js.get("expires_in", 3600))
+
+    async def _get_token(self) -> str:
+        return await self.tokens.get()
 
     async def _authed(self, method: str, url: str, **kw):
         token = await self._get_token()
@@ -148,17 +264,17 @@ class GenesysClient:
             return await r.text()
 
     async def create_channel(self):
-        url = f"https://api.{GENESYS_ENV}/api/v2/notifications/channels"
+        url = f"{api_base()}/api/v2/notifications/channels"
         js = await self._authed("POST", url, data=json.dumps({}))
         return js["id"], js["connectUri"]
 
     async def subscribe_topics(self, channel_id: str, topic_ids: List[str]):
-        url = f"https://api.{GENESYS_ENV}/api/v2/notifications/channels/{channel_id}/subscriptions"
+        url = f"{api_base()}/api/v2/notifications/channels/{channel_id}/subscriptions"
         body = {"topics": [{"id": t} for t in topic_ids]}
         return await self._authed("PUT", url, data=json.dumps(body))
 
     async def list_available_topics(self) -> List[Dict[str, Any]]:
-        url = f"https://api.{GENESYS_ENV}/api/v2/notifications/availabletopics"
+        url = f"{api_base()}/api/v2/notifications/availabletopics"
         js = await self._authed("GET", url)
         # API returns a list of {id, description, schema, ...}
         return js if isinstance(js, list) else []
@@ -171,9 +287,50 @@ class ElasticSink:
         self.stop_evt = asyncio.Event()
         self.sent_docs = 0
         self.errors = 0
+        self.spool: Optional[BulkSpool] = None
+        self.cluster_ok = True  # False from a failed request until the next successful one
+        self.bulk_seconds = metrics.Histogram("genesys_collector_bulk_request_seconds",
+                                              "Elastic _bulk request latency (first attempt)")
+        self.bulk_bytes = metrics.Histogram("genesys_collector_bulk_payload_bytes",
+                                            "Elastic _bulk payload size", buckets=metrics.SIZE_BUCKETS)
+
+    async def _post_payload(self, payload: bytes) -> bool:
+        # Replay hook: True once handled (shipped or non-retryable), False keeps it spooled
+        headers = {"Content-Type": "application/x-ndjson", **elastic_auth_headers()}
+        async with self.session.post(f"{ELASTIC_URL}/_bulk", data=payload, headers=headers) as r:
+            await r.read()
+            if r.status < 300:
+                self.cluster_ok = True
+                self.sent_docs += payload.count(b"\n") // 2
+                log("Elastic spool replay ok", items=payload.count(b"\n") // 2)
+                return True
+            if r.status in (429, 500, 502, 503, 504):
+                self.cluster_ok = False
+                return False
+            self.errors += 1
+            elog("Elastic spool replay failed (non-retryable)", status=r.status)
+            return True
+
+    def _spool(self, ndjson: bytes, wid: int) -> bool:
+        if not self.spool:
+            return False
+        try:
+            self.spool.append(ndjson, ndjson.count(b"\n") // 2)
+            wlog("Elastic batch spooled", worker=wid, items=ndjson.count(b"\n") // 2)
+            return True
+        except Exception as e:
+            elog("Elastic spool write failed", worker=wid, err=str(e))
+            return False
 
     async def start(self):
+        if SPOOL_DIR:
+            try:
+                self.spool = BulkSpool(SPOOL_DIR, SPOOL_SEGMENT_BYTES, SPOOL_MAX_BYTES)
+            except OSError as e:
+                elog("Spool unavailable; failed batches will be dropped", err=str(e))
         workers = [asyncio.create_task(self._worker(i)) for i in range(BULK_CONCURRENCY)]
+        if self.spool:
+            workers.append(asyncio.create_task(replay_spool(self.spool, self._post_payload, SPOOL_REPLAY_RATE)))
         await self.stop_evt.wait()
         for w in workers:
             w.cancel()
@@ -182,24 +339,36 @@ class ElasticSink:
                 await w
             except asyncio.CancelledError:
                 pass
+        if self.spool:
+            self.spool.close()
 
     async def _worker(self, wid: int):
         headers = {"Content-Type": "application/x-ndjson", **elastic_auth_headers()}
-        pending: List[str] = []
+        pending: List[bytes] = []
         last_flush = time.time()
 
         async def flush():
             nonlocal pending, last_flush
             if not pending:
                 return
-            ndjson = "\n".join(pending) + "\n"
+            ndjson = b"\n".join(pending) + b"\n"
             url = f"{ELASTIC_URL}/_bulk"
+            # Spare a failing cluster; the spool replay probes for its recovery and,
+            # once any request succeeds, live batches are sent directly again
+            if not self.cluster_ok and self.spool and self.spool.pending_batches and self._spool(ndjson, wid):
+                pending = []
+                last_flush = time.time()
+                return
+            self.bulk_bytes.observe(len(ndjson))
+            started = time.monotonic()
             try:
-                async with self.session.post(url, data=ndjson.encode("utf-8"), headers=headers) as r:
+                async with self.session.post(url, data=ndjson, headers=headers) as r:
                     txt = await r.text()
+                    self.bulk_seconds.observe(time.monotonic() - started)
                     if r.status in (200, 201):
+                        self.cluster_ok = True
                         try:
-                            js = json.loads(txt)
+                            js = codec.loads(txt)
                             if js.get("errors"):
                                 self.errors += 1
                                 wlog("Elastic bulk partial errors", worker=wid)
@@ -210,13 +379,16 @@ class ElasticSink:
                             # If body can't parse, still count it as success but warn
                             wlog("Elastic bulk response parse warn", worker=wid)
                     elif r.status in (429, 500, 502, 503, 504):
+                        self.cluster_ok = False
                         # brief backoff then single retry
                         wlog("Elastic backoff", status=r.status, worker=wid)
                         await asyncio.sleep(RETRY_BASE_SLEEP)
-                        async with self.session.post(url, data=ndjson.encode("utf-8"), headers=headers) as r2:
+                        async with self.session.post(url, data=ndjson, headers=headers) as r2:
+                            self.cluster_ok = r2.status < 300
                             if r2.status >= 300:
-                                self.errors += 1
-                                elog("Elastic bulk failed after retry", status=r2.status, worker=wid)
+                                if not self._spool(ndjson, wid):
+                                    self.errors += 1
+                                    elog("Elastic bulk failed after retry", status=r2.status, worker=wid)
                             else:
                                 self.sent_docs += len(pending)//2
                                 log("Elastic bulk ok after retry", worker=wid, items=len(pending)//2)
@@ -224,8 +396,10 @@ class ElasticSink:
                         self.errors += 1
                         elog("Elastic bulk failed (non-retryable)", status=r.status, worker=wid, body=txt[:300])
             except Exception as e:
-                self.errors += 1
-                elog("Elastic bulk exception", worker=wid, err=str(e))
+                self.cluster_ok = False
+                if not self._spool(ndjson, wid):
+                    self.errors += 1
+                    elog("Elastic bulk exception", worker=wid, err=str(e))
             pending = []
             last_flush = time.time()
 
@@ -243,10 +417,13 @@ class ElasticSink:
         except asyncio.CancelledError:
             await flush()
 
-    async def enqueue(self, doc: Dict[str, Any]):
+    async def enqueue(self, doc: Any, doc_id: Optional[str] = None):
+        # doc is a dict, or its JSON bytes when a worker process already encoded it
         index_name = ELASTIC_INDEX if ELASTIC_DATASTREAM else f"{ELASTIC_INDEX}-{datetime.utcnow():%Y.%m.%d}"
-        action = json.dumps({"index": {"_index": index_name}}, ensure_ascii=False)
-        source = json.dumps(doc, ensure_ascii=False)
+        # A deterministic _id turns re-sent and replayed items into overwrites, not copies
+        meta = {"_index": index_name, "_id": doc_id} if doc_id else {"_index": index_name}
+        action = codec.dumps({"index": meta})
+        source = doc if isinstance(doc, bytes) else codec.dumps(doc)
         await self.queue.put((action, source))
 
 # ----------------------- Runner -----------------------
@@ -257,8 +434,10 @@ class Runner:
         self.sink = ElasticSink(self.session)
         self.stop_evt = asyncio.Event()
         self.channel_id: Optional[str] = None
-        self.connect_uri: Optional[str] = None
         self.topic_ids: List[str] = []
+        self.topic_cache: Optional[TopicCache] = None
+        self.pool: Optional[ChannelPool] = None
+        self._pool_lock = asyncio.Lock()
         self.include_rgx = re.compile(TOPIC_INCLUDE_RGX, re.I) if TOPIC_INCLUDE_RGX else None
         self.exclude_rgx = re.compile(TOPIC_EXCLUDE_RGX, re.I) if TOPIC_EXCLUDE_RGX else None
         # In-memory counters (best-effort)
@@ -269,6 +448,69 @@ class Runner:
             "op_infos": 0,
             "audiohook_evts": 0
         }
+        self.windows = EventStats(STATS_TOP_K, STATS_TOP_K_SECONDS)
+        self.alerts: Optional[AlertEngine] = None
+        self.alert_dispatcher: Optional[AlertDispatcher] = None
+        if ALERT_RULES_FILE and os.path.exists(ALERT_RULES_FILE):
+            try:
+                rules, webhooks = load_alert_rules(ALERT_RULES_FILE)
+            except (OSError, ValueError) as e:
+                elog("Alert file rejected, alerting disabled", file=ALERT_RULES_FILE, err=str(e))
+            else:
+                if ALERT_WEBHOOK_URL:
+                    webhooks.setdefault("default", {"url": ALERT_WEBHOOK_URL})
+                self.alert_dispatcher = AlertDispatcher(
+                    webhooks, ALERT_QUEUE_SIZE, ALERT_CONCURRENCY, ALERT_MAX_RETRIES, ALERT_TIMEOUT_SECONDS,
+                    on_error=lambda name, e: elog("Alert delivery failed", webhook=name, err=repr(e)))
+                self.alerts = AlertEngine(rules, self.alert_dispatcher.submit, ALERT_MAX_GROUPS, "collector")
+        self.dedup = DedupCache(DEDUP_WINDOW_SECONDS, DEDUP_MAX_ENTRIES, DEDUP_BLOOM_BITS)
+        # PROCESS_WORKERS mode: readers queue raw frames for the worker pool
+        self.workers: Optional[PartitionedPool] = None
+        self.ingest: asyncio.Queue = asyncio.Queue(max(1, WORKER_BATCH_SIZE) * 8)
+        self.metrics = metrics.Registry()
+        self.metrics.counter("genesys_collector_counter_total", "In-memory counters from /stats", ("counter",),
+                             callback=lambda: {(k,): v for k, v in self.counters.items()})
+        self.events_by_code = self.metrics.counter("genesys_collector_events_total",
+                                                   "Normalized events by topic, code and severity",
+                                                   ("topic", "code", "severity"))
+        self.metrics.counter("genesys_collector_elastic_sent_docs_total", "Docs accepted by Elastic",
+                             callback=lambda: {(): self.sink.sent_docs})
+        self.metrics.counter("genesys_collector_elastic_errors_total", "Elastic bulk errors",
+                             callback=lambda: {(): self.sink.errors})
+        self.metrics.gauge("genesys_collector_elastic_queue_depth", "Docs waiting for a bulk worker",
+                           callback=lambda: {(): self.sink.queue.qsize()})
+        self.metrics.counter("genesys_collector_dedup_checks_total", "Events checked against the duplicate cache",
+                             callback=lambda: {(): self.dedup.stats["checks"]})
+        self.metrics.counter("genesys_collector_dedup_hits_total", "Events suppressed as duplicates",
+                             callback=lambda: {(): self.dedup.stats["hits"]})
+        self.metrics.gauge("genesys_collector_dedup_entries", "Event keys held by the duplicate cache",
+                           callback=lambda: {(): len(self.dedup)})
+        self.metrics.counter("genesys_collector_worker_frames_total", "Frames handed to each worker process",
+                             ("partition",), callback=lambda: {
+                                 (str(i),): n for i, n in enumerate(self.workers.stats["partition_items"])
+                             } if self.workers else {})
+        self.metrics.counter("genesys_collector_rule_hits_total", "Events matched by each classification rule",
+                             ("classifier", "rule"), callback=RULES.hits)
+        self.metrics.counter("genesys_collector_log_lines_dropped_total", "Log lines dropped because the log queue was full",
+                             callback=lambda: {(): LOGS.stats["dropped"]})
+        self.metrics.counter("genesys_collector_alert_evaluations_total", "Events evaluated against the alert rules",
+                             callback=lambda: {(): self.alerts.stats["events"] if self.alerts else 0})
+        self.metrics.counter("genesys_collector_alert_evaluation_seconds_total",
+                             "Time spent evaluating alert rules (divide by evaluations for the cost per event)",
+                             callback=lambda: {(): self.alerts.stats["eval_ns"] / 1e9 if self.alerts else 0})
+        self.metrics.counter("genesys_collector_alerts_fired_total", "Alerts fired per rule", ("rule",),
+                             callback=lambda: {(rule,): n for rule, n in self.alerts.stats["fired"].items()}
+                             if self.alerts else {})
+        self.metrics.counter("genesys_collector_alert_deliveries_total", "Alerts by webhook delivery outcome",
+                             ("outcome",), callback=lambda: {
+                                 (outcome,): self.alert_dispatcher.stats[outcome] for outcome in ("sent", "failed", "dropped")
+                             } if self.alert_dispatcher else {})
+        self.metrics.register(self.gc.token_seconds)
+        self.metrics.register(self.sink.bulk_seconds)
+        self.metrics.register(self.sink.bulk_bytes)
+        self.metrics.gauge("genesys_collector_channel_connected", "Pooled notification channel connected",
+                           ("channel",), callback=lambda: {
+                               (str(ch.index),): int(ch.connected) for ch in (self.pool.channels if self.pool else [])})
 
     async def _load_topics_from_file(self) -> List[str]:
         if not os.path.exists(TOPICS_FILE):
@@ -283,12 +525,25 @@ class Runner:
             return []
 
     async def _discover_audiohook_topics(self) -> List[str]:
+        # The catalog is filtered once per fetch; the result is cached with a TTL across restarts
+        selector = f"{api_base()}|{CLIENT_ID}|include={TOPIC_INCLUDE_RGX}|exclude={TOPIC_EXCLUDE_RGX}"
+        self.topic_cache = TopicCache(TOPIC_CACHE_FILE, TOPIC_CACHE_TTL_SECONDS, selector, self._select_topics)
         try:
-            all_topics = await self.gc.list_available_topics()
+            selected = await self.topic_cache.resolve(self.gc.list_available_topics)
         except Exception as e:
             wlog("AvailableTopics fetch failed", err=str(e))
+            self.topic_cache = None
             return []
+        if self.topic_cache.stats["cache_hits"] or self.topic_cache.stats["stale_hits"]:
+            log("Using cached topic discovery", age_s=self.topic_cache.snapshot()["age_seconds"])
 
+        if not selected:
+            self.topic_cache = None
+            wlog("No AudioHook topics discovered; using FALLBACK_TOPICS")
+            selected = FALLBACK_TOPICS[:]
+        return selected
+
+    def _select_topics(self, all_topics: List[Dict[str, Any]]) -> List[str]:
         selected = []
         for t in all_topics:
             tid = (t.get("id") or t.get("topicName") or "").strip()
@@ -303,12 +558,26 @@ class Runner:
                 include = False
             if include:
                 selected.append(tid)
-
-        if not selected:
-            wlog("No AudioHook topics discovered; using FALLBACK_TOPICS")
-            selected = FALLBACK_TOPICS[:]
         return selected
 
+    async def _refresh_topics(self):
+        async def fetch():
+            try:
+                return await self.gc.list_available_topics()
+            except Exception as e:
+                wlog("Topic refresh failed; keeping cached topics", err=str(e))
+                raise
+
+        async def apply(topics: List[str]):
+            log("Topic list changed", added=sorted(set(topics) - set(self.topic_ids)),
+                removed=sorted(set(self.topic_ids) - set(topics)))
+            self.topic_ids = topics
+            self.pool.topics = list(topics)
+            async with self._pool_lock:
+                await self._apply_subscriptions(self.pool.plan_rebalance())
+
+        await self.topic_cache.refresh_loop(fetch, apply, RETRY_MAX_SLEEP * 10)
+
     async def select_topics(self):
         # Priority: topics.json (if non-empty) else discovery (if enabled) else fallback
         topics = await self._load_topics_from_file()
@@ -323,43 +592,110 @@ class Runner:
         self.topic_ids = topics or FALLBACK_TOPICS[:]
 
     async def _ws_loop(self):
-        # Create channel + subscribe
-        ch_id, ws_url = await self.gc.create_channel()
-        self.channel_id = ch_id
-        self.connect_uri = ws_url
-        await self.gc.subscribe_topics(ch_id, self.topic_ids)
-        log("Subscribed topics", count=len(self.topic_ids))
+        # One reader per pooled channel; topics are split across channels
+        self.pool = ChannelPool(self.topic_ids, CHANNEL_COUNT, MAX_TOPICS_PER_CHANNEL)
+        log("Channel pool", channels=len(self.pool.channels), max_topics=MAX_TOPICS_PER_CHANNEL)
+        refresher = None
+        if self.topic_cache and TOPIC_CACHE_TTL_SECONDS > 0:
+            refresher = asyncio.create_task(self._refresh_topics())
+        worker_task = None
+        if PROCESS_WORKERS > 0:
+            self.workers = PartitionedPool(PROCESS_WORKERS)
+            worker_task = asyncio.create_task(self._worker_loop())
+        try:
+            await asyncio.gather(*(self._channel_loop(ch) for ch in self.pool.channels))
+        finally:
+            if refresher:
+                refresher.cancel()
+            if worker_task:
+                # Normalize what the readers already queued, then stop the workers
+                await self.ingest.put(None)
+                await asyncio.gather(worker_task, return_exceptions=True)
+                await asyncio.to_thread(self.workers.shutdown)
+
+    async def _worker_loop(self):
+        done = False
+
+        async def next_batch():
+            nonlocal done
+            if done:
+                return None
+            items = [await self.ingest.get()]
+            while len(items) < WORKER_BATCH_SIZE and not self.ingest.empty():
+                items.append(self.ingest.get_nowait())
+            if None in items:
+                done = True
+                items = items[:items.index(None)]
+            return items
+
+        def failed(e: Exception):
+            elog("Worker process failed a batch", err=repr(e))
+
+        await self.workers.start()
+        log("Worker processes started", workers=self.workers.workers)
+        await self.workers.pump(normalize_frames, next_batch, lambda item: item[0], self.accept_normalized, failed)
+
+    async def _open_channel(self, ch: ChannelState):
+        # Create channel + subscribe its share of the topics
+        ch.channel_id, ch.connect_uri = await self.gc.create_channel()
+        ch.stats["channels_created"] += 1
+        if ch.index == 0:
+            self.channel_id = ch.channel_id
+        if ch.topics:
+            await self.gc.subscribe_topics(ch.channel_id, ch.topics)
+        log("Subscribed topics", channel=ch.channel_id, index=ch.index, count=len(ch.topics))
+
+    async def _apply_subscriptions(self, changed: List[ChannelState]):
+        for ch in changed:
+            try:
+                await self.gc.subscribe_topics(ch.channel_id, ch.topics)
+                log("Channel topics updated", index=ch.index, count=len(ch.topics))
+            except Exception as e:
+                ch.stats["errors"] += 1
+                wlog("Channel resubscribe failed", index=ch.index, err=str(e))
 
+    async def _channel_loop(self, ch: ChannelState):
         backoff = RETRY_BASE_SLEEP
         while not self.stop_evt.is_set():
             try:
-                async with self.session.ws_connect(self.connect_uri, heartbeat=30) as ws:
-                    log("WS connected", channel=self.channel_id)
+                if not ch.connect_uri:
+                    await self._open_channel(ch)
+                async with self.session.ws_connect(ch.connect_uri, heartbeat=30) as ws:
+                    ch.mark_connected()
+                    log("WS connected", channel=ch.channel_id, index=ch.index)
                     backoff = RETRY_BASE_SLEEP
+                    if not ch.topics:
+                        # Drained by an earlier failover: take back an even share
+                        async with self._pool_lock:
+                            await self._apply_subscriptions(self.pool.plan_rebalance())
                     async for msg in ws:
                         if msg.type == aiohttp.WSMsgType.TEXT:
+                            ch.stats["messages"] += 1
+                            if self.workers is not None:
+                                await self.ingest.put((msg.data, ch.channel_id))
+                                continue
                             try:
-                                payload = msg.json(loads=json.loads)
+                                payload = codec.loads(msg.data)
                             except Exception:
                                 payload = {"raw": msg.data}
-                            await self.handle_event(payload)
+                            await self.handle_event(payload, ch.channel_id)
                         elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.ERROR):
-                            wlog("WS closed or error; reconnecting")
+                            wlog("WS closed or error; reconnecting", index=ch.index)
                             break
             except Exception as e:
-                wlog("WS connect failed", err=str(e))
-
+                ch.stats["errors"] += 1
+                wlog("WS connect failed", index=ch.index, err=str(e))
+
+            ch.mark_disconnected()
+            if self.stop_evt.is_set():
+                break
+            # Keep this channel's topics flowing on the live channels meanwhile
+            async with self._pool_lock:
+                await self._apply_subscriptions(self.pool.plan_failover(ch))
             await asyncio.sleep(backoff)
             backoff = min(backoff * 1.7, RETRY_MAX_SLEEP)
             # Recreate channel + resubscribe (channels expire)
-            try:
-                ch_id, ws_url = await self.gc.create_channel()
-                self.channel_id = ch_id
-                self.connect_uri = ws_url
-                await self.gc.subscribe_topics(ch_id, self.topic_ids)
-                log("Resubscribed after reconnect", channel=self.channel_id)
-            except Exception as e:
-                wlog("Resubscribe failed; retrying", err=str(e))
+            ch.reset()
 
     # ---------- Event normalization ----------
     @staticmethod
@@ -370,9 +706,8 @@ class Runner:
                 return v
         return None
 
-    async def handle_event(self, payload: Dict[str, Any]):
-        self.counters["events_total"] += 1
-
+    @staticmethod
+    def split_payload(payload: Dict[str, Any]):
         topic = payload.get("topicName") or payload.get("topic")
         body = payload.get("eventBody") or payload.get("body") or payload
 
@@ -381,33 +716,25 @@ class Runner:
         else:
             # Sometimes heartbeat or unknown payloads
             ev = {"_raw": body}
+        return topic, ev
 
+    @staticmethod
+    def normalize_event(ev: Dict[str, Any], topic: Optional[str], channel_id: Optional[str]) -> Dict[str, Any]:
         # Try to map operational-event fields that matter for AudioHook alerting
-        code = self._extract_first_nonempty(ev, ["eventDefinitionId", "code", "eventId"])
-        sev  = (self._extract_first_nonempty(ev, ["severity", "level", "logLevel"]) or "").upper()
-        ent  = self._extract_first_nonempty(ev, ["entityId", "conversationId", "deploymentId", "sessionId"])
-        intg = self._extract_first_nonempty(ev, ["integrationId", "integration", "integrationName"])
-        comp = self._extract_first_nonempty(ev, ["component", "source", "service"])  # sometimes present
+        code = Runner._extract_first_nonempty(ev, ["eventDefinitionId", "code", "eventId"])
+        sev  = (Runner._extract_first_nonempty(ev, ["severity", "level", "logLevel"]) or "").upper()
+        ent  = Runner._extract_first_nonempty(ev, ["entityId", "conversationId", "deploymentId", "sessionId"])
+        intg = Runner._extract_first_nonempty(ev, ["integrationId", "integration", "integrationName"])
+        comp = Runner._extract_first_nonempty(ev, ["component", "source", "service"])  # sometimes present
 
-        # Heuristic for AudioHook classification
-        is_audiohook = ("audiohook" in (str(code or "") + " " + str(comp or "")).lower()) or \
-                       ("audiohook" in (topic or "").lower())
+        # AudioHook classification: the 'audiohook_signal' rules
+        is_audiohook = is_audiohook_signal({"code": code, "component": comp, "topic": topic})
 
-        if is_audiohook:
-            self.counters["audiohook_evts"] += 1
-
-        if sev in ("ERROR", "CRITICAL", "SEVERE"):
-            self.counters["op_errors"] += 1
-        elif sev in ("WARN", "WARNING"):
-            self.counters["op_warns"] += 1
-        else:
-            self.counters["op_infos"] += 1
-
-        doc = {
+        return {
             "@timestamp": now_utc_iso(),
             "genesys": {
                 "topic": topic,
-                "channel": self.channel_id
+                "channel": channel_id
             },
             "op": {
                 "code": code,                 # e.g., "AUDIOHOOK-0001"
@@ -419,7 +746,52 @@ class Runner:
             },
             "event": ev                      # Preserve full original payload for deep dive
         }
-        await self.sink.enqueue(doc)
+
+    def _count(self, topic: Optional[str], code: Any, sev: str, is_audiohook: bool,
+               intg: Any = None, conversation: Any = None):
+        if is_audiohook:
+            self.counters["audiohook_evts"] += 1
+
+        self.counters[SEVERITY_COUNTERS.get(RULES.severity(sev), "op_infos")] += 1
+        self.events_by_code.inc(topic or "", str(code or ""), sev)
+        code, intg = str(code) if code else None, str(intg) if intg else None
+        conversation = str(conversation) if conversation else None
+        self.windows.record(code, sev, intg, topic, conversation)
+        if self.alerts is not None:
+            self.alerts.observe(code, intg, topic, sev or None, conversation)
+
+    async def handle_event(self, payload: Dict[str, Any], channel_id: Optional[str] = None):
+        self.counters["events_total"] += 1
+
+        topic, ev = self.split_payload(payload)
+        key = event_key(ev)
+        if self.dedup.seen(key):
+            return
+
+        doc = self.normalize_event(ev, topic, channel_id or self.channel_id)
+        op = doc["op"]
+        self._count(topic, op["code"], op["severity"], op["isAudioHook"], op["integrationId"],
+                    ev.get("conversationId"))
+        await self.sink.enqueue(doc, key)
+
+    async def accept_normalized(self, result):
+        # Event-loop half of PROCESS_WORKERS mode (see normalize_frames)
+        if result[0] == "rule_hits":
+            RULES.add_hits(result[1])
+            return
+        key, topic, code, sev, is_audiohook, intg, conversation, source = result
+        self.counters["events_total"] += 1
+        if self.dedup.seen(key):
+            return
+        self._count(topic, code, sev, is_audiohook, intg, conversation)
+        await self.sink.enqueue(source, key)
+
+    @staticmethod
+    def _rules_reloaded(rules: RuleEngine):
+        if rules.stats["last_error"]:
+            wlog("Rule file rejected; keeping current rules", file=rules.path, err=rules.stats["last_error"])
+        else:
+            log("Classification rules reloaded", source=rules.stats["source"])
 
     # ---------- Mini HTTP status server (optional) ----------
     async def _http_app(self):
@@ -430,19 +802,34 @@ class Runner:
                 "ok": True,
                 "ts": now_utc_iso(),
                 "channel": self.channel_id,
+                "channels": self.pool.snapshot() if self.pool else None,
                 "topics": self.topic_ids,
+                "topic_cache": self.topic_cache.snapshot() if self.topic_cache else None,
+                "token": self.gc.tokens.snapshot(),
                 "elastic_sent_docs": self.sink.sent_docs,
-                "elastic_errors": self.sink.errors
+                "elastic_errors": self.sink.errors,
+                "elastic_spool": self.sink.spool.snapshot() if self.sink.spool else None,
+                "dedup": self.dedup.snapshot(),
+                "workers": self.workers.snapshot() if self.workers else None,
+                "rules": RULES.snapshot(),
+                "logging": LOGS.snapshot(),
+                "alerts": dict(self.alerts.snapshot(), delivery=self.alert_dispatcher.snapshot()) if self.alerts else None
             })
 
         async def stats(_req):
             return web.json_response({
                 "ts": now_utc_iso(),
-                "counters": self.counters
+                "counters": self.counters,
+                **self.windows.snapshot()
             })
 
+        async def prometheus(_req):
+            return web.Response(body=self.metrics.render().encode("utf-8"),
+                                headers={"Content-Type": metrics.CONTENT_TYPE})
+
         app.router.add_get("/health", health)
         app.router.add_get("/stats", stats)
+        app.router.add_get("/metrics", prometheus)
         return app
 
     async def start(self):
@@ -454,6 +841,8 @@ class Runner:
 
         # Start sink workers
         sink_task = asyncio.create_task(self.sink.start())
+        if self.alert_dispatcher:
+            self.alert_dispatcher.start()
 
         # Optional status server
         if HTTP_STATUS_ENABLED:
@@ -464,7 +853,9 @@ class Runner:
             await site.start()
             log("HTTP status server started", host=HTTP_STATUS_HOST, port=HTTP_STATUS_PORT)
 
-        # WS loop
+        # Token renewal ahead of expiry + WS loop
+        token_task = asyncio.create_task(self.gc.tokens.run())
+        rules_task = asyncio.create_task(RULES.watch(self._rules_reloaded))
         ws_task = asyncio.create_task(self._ws_loop())
 
         def _stop():
@@ -479,12 +870,45 @@ class Runner:
                 pass
 
         await asyncio.wait([ws_task], return_when=asyncio.FIRST_COMPLETED)
+        token_task.cancel()
+        rules_task.cancel()
         self.sink.stop_evt.set()
         await sink_task
+        if self.alert_dispatcher:
+            await self.alert_dispatcher.close()
         await self.session.close()
 
+# ----------------------- Worker processes -----------------------
+def normalize_frames(items):
+    """Decode + normalize (frame, channel_id) items in a worker process (PROCESS_WORKERS > 0)
+
+    Returns (key, topic, code, severity, isAudioHook, integrationId, conversationId, doc_bytes) per frame,
+    then ("rule_hits", counts) with the batch's classification rule hits; duplicate suppression,
+    counters and the sink stay on the event loop.
+    """
+    RULES.maybe_reload()
+    results = []
+    for frame, channel_id in items:
+        try:
+            payload = codec.loads(frame)
+        except Exception:
+            payload = {"raw": frame}
+        if not isinstance(payload, dict):
+            payload = {"raw": frame}
+        topic, ev = Runner.split_payload(payload)
+        doc = Runner.normalize_event(ev, topic, channel_id)
+        op = doc["op"]
+        results.append((event_key(ev), topic, op["code"], op["severity"], op["isAudioHook"],
+                        op["integrationId"], ev.get("conversationId"), codec.dumps(doc)))
+    hits = RULES.take_hits()
+    if hits:
+        results.append(("rule_hits", hits))
+    return results
+
 # ----------------------- Entrypoint -----------------------
 if __name__ == "__main__":
+    # Spawned worker processes of a frozen (PyInstaller) build re-run this entry point
+    multiprocessing.freeze_support()
     try:
         asyncio.run(Runner().start())
     except KeyboardInterrupt:
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Columnar Parquet export of normalized events
+
+ParquetSink buffers selected event fields as rows, converts them to Arrow
+record batches and writes compressed Parquet files in a Hive-style layout
+that pyarrow.dataset, DuckDB, Spark and Athena read as partition columns:
+
+  <directory>/hour=2024-01-15T10/event_code=AUDIOHOOK-0001/part-20240115T103045Z-0001.parquet
+
+- Each partition has at most one open file. Buffered rows become one row
+  group once `row_group_rows` are pending, or when the file is closed.
+- A file is closed after `roll_seconds` or once it reaches `max_file_bytes`,
+  so a finished hour stops receiving writes within `roll_seconds`.
+- Open files are named `.part-*.parquet.tmp` (readers skip dot-files) and
+  renamed when closed: a Parquet file is only readable once its footer is
+  written.
+
+pyarrow is optional; check available() before creating a sink. All methods
+are blocking and meant to run in a worker thread, one call at a time.
+"""
+
+import os
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional dependency for the Parquet sink
+    pa = pq = None
+
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'  # Hive's name for a null partition value
+_UNSAFE = re.compile(r'[^A-Za-z0-9._-]')
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def partition_value(value: Optional[str]) -> str:
+    """Directory-safe partition value; empty and None map to the Hive null partition"""
+    return _UNSAFE.sub('_', str(value)) if value else NULL_PARTITION
+
+
+def _arrow_type(name: str):
+    return {
+        'string': pa.string(),
+        'int64': pa.int64(),
+        'float64': pa.float64(),
+        'bool': pa.bool_(),
+        'timestamp': pa.timestamp('us', tz='UTC')  # From ISO-8601 strings
+    }[name]
+
+
+def _timestamps(values: Sequence[Optional[str]], arrow_type) -> 'pa.Array':
+    try:
+        return pa.array(values, pa.string()).cast(arrow_type)
+    except pa.ArrowInvalid:
+        # One bad value must not cost the whole batch: parse row by row, nulls for the rest
+        parsed = []
+        for value in values:
+            try:
+                parsed.append(datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(timezone.utc))
+            except (AttributeError, ValueError):
+                parsed.append(None)
+        return pa.array(parsed, arrow_type)
+
+
+class _PartitionFile:
+    """The open file and pending rows of one partition"""
+
+    __slots__ = ('path', 'tmp', 'fh', 'writer', 'opened_at', 'rows')
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp = path.with_name(f'.{path.name}.tmp')
+        self.fh = None
+        self.writer = None
+        self.opened_at = time.monotonic()
+        self.rows: List[Tuple] = []
+
+
+class ParquetSink:
+    """Partitioned Parquet writer fed with row tuples in `columns` order"""
+
+    def __init__(self, directory: str, columns: Sequence[Tuple[str, str]], partitioning: Sequence[str],
+                 compression: str = 'zstd', row_group_rows: int = 50000, roll_seconds: float = 300.0,
+                 max_file_bytes: int = 134217728):
+        if pa is None:
+            raise RuntimeError('pyarrow is not installed')
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.columns = list(columns)
+        self.schema = pa.schema([(name, _arrow_type(kind)) for name, kind in self.columns])
+        self.partitioning = list(partitioning)
+        self.compression = compression
+        self.row_group_rows = max(1, row_group_rows)
+        self.roll_seconds = roll_seconds
+        self.max_file_bytes = max_file_bytes
+        self._open: Dict[Tuple[str, ...], _PartitionFile] = {}
+        self._seq = 0
+        self.stats = {
+            'rows': 0,
+            'row_groups': 0,
+            'files': 0,
+            'bytes': 0,
+            'errors': 0,
+            'rows_dropped': 0,
+            'last_error': None
+        }
+
+    def _new_file(self, values: Tuple[str, ...]) -> _PartitionFile:
+        directory = self.directory.joinpath(*(
+            f'{name}={partition_value(value)}' for name, value in zip(self.partitioning, values)))
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        while True:
+            # Never reuse a name, not even one published by an earlier run in the same second
+            self._seq += 1
+            part = _PartitionFile(directory / f'part-{stamp}-{self._seq:04d}.parquet')
+            if not part.path.exists() and not part.tmp.exists():
+                return part
+
+    def add(self, partition: Tuple[str, ...], row: Tuple):
+        """Buffer one row for a partition, writing a row group when enough are pending"""
+        part = self._open.get(partition)
+        if part is None:
+            part = self._open[partition] = self._new_file(partition)
+        part.rows.append(row)
+        if len(part.rows) >= self.row_group_rows and self._write(partition, part):
+            if part.fh.tell() >= self.max_file_bytes:
+                self._close(partition, part)
+
+    def _batch(self, rows: List[Tuple]) -> 'pa.RecordBatch':
+        arrays = []
+        for (name, kind), values in zip(self.columns, zip(*rows)):
+            arrow_type = self.schema.field(name).type
+            arrays.append(_timestamps(values, arrow_type) if kind == 'timestamp' else pa.array(values, arrow_type))
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def _write(self, partition: Tuple[str, ...], part: _PartitionFile) -> bool:
+        """Write the pending rows as one row group; a failing partition is abandoned"""
+        if not part.rows:
+            return True
+        rows, part.rows = part.rows, []
+        try:
+            batch = self._batch(rows)
+            if part.writer is None:
+                part.fh = open(part.tmp, 'wb')
+                part.writer = pq.ParquetWriter(part.fh, self.schema, compression=self.compression)
+            part.writer.write_batch(batch)
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.stats['rows_dropped'] += len(rows)
+            self.stats['last_error'] = f'{part.path}: {e}'[:200]
+            self._discard(partition, part)
+            return False
+        self.stats['rows'] += len(rows)
+        self.stats['row_groups'] += 1
+        return True
+
+    def _close(self, partition: Tuple[str, ...], part: _PartitionFile):
+        """Flush pending rows, write the footer and publish the file under its final name"""
+        if not self._write(partition, part):
+            return
+        self._open.pop(partition, None)
+        if part.writer is None:
+            return
+        try:
+            part.writer.close()
+            part.fh.close()
+            os.replace(part.tmp, part.path)
+        except Exception as e:
+            self.stats['errors'] += 1
+            self.stats['last_error'] = f'{part.path}: {e}'[:200]
+            self._discard(partition, part)
+            return
+        self.stats['files'] += 1
+        self.stats['bytes'] += part.path.stat().st_size
+
+    def _discard(self, partition: Tuple[str, ...], part: _PartitionFile):
+        self._open.pop(partition, None)
+        for closeable in (part.writer, part.fh):
+            try:
+                if closeable is not None:
+                    closeable.close()
+            except Exception:
+                pass
+        try:
+            part.tmp.unlink()
+        except OSError:
+            pass
+
+    def maybe_roll(self):
+        """Close files that have been open for roll_seconds"""
+        now = time.monotonic()
+        for partition, part in list(self._open.items()):
+            if now - part.opened_at >= self.roll_seconds:
+                self._close(partition, part)
+
+    def close(self):
+        """Write and publish every open file"""
+        for partition, part in list(self._open.items()):
+            self._close(partition, part)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            directory=str(self.directory),
+            compression=self.compression,
+            open_files=len(self._open),
+            buffered_rows=sum(len(part.rows) for part in self._open.values())
+        )
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Duplicate-event suppression shared by both collectors
+
+The same operational event can be delivered more than once (after a channel
+reconnect, during a make-before-break rotation, or when Genesys retries), so
+each event body is reduced to a stable identity key and checked against a
+bounded cache before it reaches the sinks. The key doubles as the
+Elasticsearch `_id`, which makes re-sent and replayed bulk items idempotent.
+
+Key: BLAKE2b-128 over eventEntity.id, entityId, conversationId and the event
+timestamp (eventTime / timestamp / dateCreated). Bodies without both an event
+code and a timestamp (heartbeats, generic entity updates, AudioHook events that
+carry no time) get no key and are never suppressed: without a timestamp two
+distinct occurrences of a code on one conversation cannot be told apart.
+
+Cache:
+- An insertion-ordered dict of key -> expiry holds the last `window` seconds,
+  capped at `max_entries` (oldest evicted first).
+- With `bloom_bits`, keys also go into a pair of rotating Bloom filters that
+  cover the window with a fixed memory budget, catching duplicates of keys the
+  exact cache already evicted. A Bloom hit can be a false positive; size the
+  filter so that is rare (about 10 bits per key in the window keeps it <1%).
+"""
+
+import time
+from hashlib import blake2b
+from typing import Any, Dict, Optional
+
+BLOOM_HASHES = 7
+SWEEP_INTERVAL = 1.0  # Seconds between expiry sweeps of the exact cache
+
+
+def event_key(body: Dict[str, Any]) -> Optional[str]:
+    """Stable identity key for an event body, or None if it cannot be identified"""
+    entity = body.get('eventEntity')
+    code = entity.get('id') if isinstance(entity, dict) else None
+    stamp = body.get('eventTime') or body.get('timestamp') or body.get('dateCreated')
+    if not code or not stamp:
+        return None
+    text = f"{code}\x1f{body.get('entityId') or ''}\x1f{body.get('conversationId') or ''}\x1f{stamp}"
+    return blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class BloomWindow:
+    """Two Bloom filter generations; the older one is cleared every `window` seconds"""
+
+    def __init__(self, bits: int, window: float):
+        self.bits = max(8, bits)
+        self.window = window
+        self._current = bytearray((self.bits + 7) // 8)
+        self._previous = bytearray(len(self._current))
+        self._rotated_at = time.monotonic()
+        self.rotations = 0
+
+    def _positions(self, key: str):
+        # Double hashing over the two 64-bit halves of the (already uniform) key
+        digest = int(key, 16)
+        h1, h2 = digest >> 64, (digest & 0xFFFFFFFFFFFFFFFF) | 1
+        return [(h1 + i * h2) % self.bits for i in range(BLOOM_HASHES)]
+
+    def _maybe_rotate(self):
+        now = time.monotonic()
+        if now - self._rotated_at >= self.window:
+            self._previous = self._current
+            self._current = bytearray(len(self._previous))
+            self._rotated_at = now
+            self.rotations += 1
+
+    def check_and_add(self, key: str) -> bool:
+        """Add a key; True if it was (probably) already present"""
+        self._maybe_rotate()
+        positions = self._positions(key)
+        current, previous = self._current, self._previous
+        present = all(current[p >> 3] & (1 << (p & 7)) for p in positions) or \
+            all(previous[p >> 3] & (1 << (p & 7)) for p in positions)
+        for p in positions:
+            current[p >> 3] |= 1 << (p & 7)
+        return present
+
+
+class DedupCache:
+    """Time-windowed, size-bounded set of recently seen event keys"""
+
+    def __init__(self, window: float = 300.0, max_entries: int = 100000, bloom_bits: int = 0):
+        self.window = window
+        self.max_entries = max(1, max_entries)
+        self._expiry: Dict[str, float] = {}  # Insertion order == expiry order
+        self._next_sweep = 0.0
+        self.bloom = BloomWindow(bloom_bits, window) if bloom_bits > 0 else None
+        self.stats = {
+            'checks': 0,
+            'hits': 0,
+            'bloom_hits': 0,
+            'unkeyed': 0,
+            'evictions': 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def _expire(self, now: float):
+        expiry = self._expiry
+        while expiry:
+            key = next(iter(expiry))
+            if expiry[key] > now and len(expiry) <= self.max_entries:
+                break
+            if expiry[key] > now:
+                self.stats['evictions'] += 1
+            del expiry[key]
+
+    def seen(self, key: Optional[str]) -> bool:
+        """Record a key; True if it was already seen within the window"""
+        if key is None:
+            self.stats['unkeyed'] += 1
+            return False
+        if not self.enabled:
+            return False
+        self.stats['checks'] += 1
+        now = time.monotonic()
+        expires = self._expiry.get(key)
+        if expires is not None and expires > now:
+            self.stats['hits'] += 1
+            return True
+        if expires is not None:
+            del self._expiry[key]
+        self._expiry[key] = now + self.window
+        if len(self._expiry) > self.max_entries or now >= self._next_sweep:
+            self._expire(now)
+            self._next_sweep = now + SWEEP_INTERVAL
+        if self.bloom is not None and self.bloom.check_and_add(key) and expires is None:
+            self.stats['bloom_hits'] += 1
+            self.stats['hits'] += 1
+            return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def snapshot(self) -> Dict[str, Any]:
+        checks = self.stats['checks']
+        return dict(
+            self.stats,
+            enabled=self.enabled,
+            entries=len(self._expiry),
+            window_seconds=self.window,
+            max_entries=self.max_entries,
+            bloom_bits=self.bloom.bits if self.bloom else 0,
+            hit_rate=round(self.stats['hits'] / checks, 4) if checks else 0.0
+        )
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Embedded SQLite event store with indexed lookups
+
+Keeps every written event queryable by conversation, event code, entity and
+time without grepping the JSONL output:
+
+- WAL journal with synchronous=NORMAL: one writer and concurrent readers,
+  and a batch of events costs one transaction (one WAL append) instead of
+  one fsync per event.
+- Indexes (conversation_id, ts), (event_id, ts), (entity_id, ts) and (ts).
+  SQLite appends the rowid to every index entry, so each of them also
+  yields rows in (ts, id) order and keyset pagination never sorts.
+- doc_id (the dedup key, when the event has one) is indexed but not
+  unique: duplicates are suppressed upstream by the pipeline's DedupCache,
+  and a key collision must never drop a row from the store.
+- Retention deletes rows older than `retention_hours` in small chunks, so
+  readers are never blocked behind one huge delete.
+
+Writes (add_many, prune) are meant for a single worker thread; query() may
+run concurrently from other threads on its own connection.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY,
+        ts REAL NOT NULL,
+        event_id TEXT,
+        event_name TEXT,
+        conversation_id TEXT,
+        entity_id TEXT,
+        topic TEXT,
+        severity TEXT,
+        doc_id TEXT,
+        data BLOB NOT NULL
+    )''',
+    'CREATE INDEX IF NOT EXISTS events_conversation ON events (conversation_id, ts)',
+    'CREATE INDEX IF NOT EXISTS events_event_id ON events (event_id, ts)',
+    'CREATE INDEX IF NOT EXISTS events_entity ON events (entity_id, ts)',
+    'CREATE INDEX IF NOT EXISTS events_ts ON events (ts)',
+    'DROP INDEX IF EXISTS events_doc_id',  # Unique in earlier versions
+    'CREATE INDEX IF NOT EXISTS events_doc ON events (doc_id)'
+)
+# (ts, event_id, event_name, conversation_id, entity_id, topic, severity, doc_id, data)
+INSERT = ('INSERT INTO events (ts, event_id, event_name, conversation_id, entity_id, topic, severity, '
+          'doc_id, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)')
+PRUNE_CHUNK = 5000
+
+
+def parse_cursor(cursor: str) -> Tuple[float, int]:
+    """(ts, id) of the last row of the previous page; raises ValueError if malformed"""
+    ts, _, row_id = cursor.partition(':')
+    return float(ts), int(row_id)
+
+
+class EventStore:
+    """Batched SQLite sink and query API for formatted events"""
+
+    def __init__(self, path: str, retention_hours: float = 168.0, prune_interval: float = 60.0):
+        self.path = path
+        self.retention_hours = retention_hours
+        self.prune_interval = prune_interval
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = self._connect()
+        for statement in SCHEMA:
+            self._db.execute(statement)
+        self._reader = self._connect()
+        self._read_lock = threading.Lock()
+        self._next_prune = 0.0
+        self.stats = {
+            'rows_written': 0,
+            'batches': 0,
+            'pruned': 0,
+            'queries': 0,
+            'errors': 0,
+            'last_batch_ms': None,
+            'last_error': None
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.execute('PRAGMA busy_timeout=5000')
+        return db
+
+    def add_many(self, rows: Iterable[Tuple]):
+        """Insert a batch of rows in one transaction, then prune if it is due"""
+        rows = list(rows)
+        if rows:
+            started = time.monotonic()
+            try:
+                self._db.execute('BEGIN')
+                self._db.executemany(INSERT, rows)
+                self._db.execute('COMMIT')
+            except sqlite3.Error as e:
+                if self._db.in_transaction:
+                    self._db.execute('ROLLBACK')
+                self.stats['errors'] += 1
+                self.stats['last_error'] = str(e)[:200]
+                return
+            self.stats['rows_written'] += len(rows)
+            self.stats['batches'] += 1
+            self.stats['last_batch_ms'] = round((time.monotonic() - started) * 1000, 2)
+        if time.monotonic() >= self._next_prune:
+            self._next_prune = time.monotonic() + self.prune_interval
+            self.prune()
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Delete rows older than retention_hours; returns how many were removed"""
+        if self.retention_hours <= 0:
+            return 0
+        cutoff = (now or time.time()) - self.retention_hours * 3600
+        removed = 0
+        try:
+            while True:
+                cursor = self._db.execute(
+                    'DELETE FROM events WHERE id IN (SELECT id FROM events WHERE ts < ? ORDER BY ts LIMIT ?)',
+                    (cutoff, PRUNE_CHUNK))
+                removed += cursor.rowcount
+                if cursor.rowcount < PRUNE_CHUNK:
+                    break
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            self.stats['last_error'] = str(e)[:200]
+        self.stats['pruned'] += removed
+        return removed
+
+    def query(self, conversation_id: Optional[str] = None, event_id: Optional[str] = None,
+              entity_id: Optional[str] = None, start: Optional[float] = None, end: Optional[float] = None,
+              limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[bytes], Optional[str]]:
+        """Matching event lines oldest first, and the cursor of the next page (None on the last page)
+
+        `start` is inclusive and `end` exclusive (epoch seconds); `cursor` comes
+        from the previous page.
+        """
+        clauses, params = [], []
+        for column, value in (('conversation_id', conversation_id), ('event_id', event_id), ('entity_id', entity_id)):
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if start is not None:
+            clauses.append('ts >= ?')
+            params.append(start)
+        if end is not None:
+            clauses.append('ts < ?')
+            params.append(end)
+        if cursor:
+            clauses.append('(ts, id) > (?, ?)')
+            params.extend(parse_cursor(cursor))
+        where = f'WHERE {" AND ".join(clauses)} ' if clauses else ''
+        sql = f'SELECT id, ts, data FROM events {where}ORDER BY ts, id LIMIT ?'
+        with self._read_lock:
+            rows = self._reader.execute(sql, params + [limit + 1]).fetchall()
+        self.stats['queries'] += 1
+
+        next_cursor = None
+        if len(rows) > limit:
+            row_id, ts, _ = rows[limit - 1]
+            next_cursor = f'{ts!r}:{row_id}'
+            rows = rows[:limit]
+        return [bytes(data) for _, _, data in rows], next_cursor
+
+    def size_bytes(self) -> int:
+        total = 0
+        for suffix in ('', '-wal'):
+            try:
+                total += os.path.getsize(self.path + suffix)
+            except OSError:
+                pass
+        return total
+
+    def close(self):
+        for db in (self._reader, self._db):
+            try:
+                db.close()
+            except sqlite3.Error:
+                pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(self.stats, path=self.path, retention_hours=self.retention_hours, size_bytes=self.size_bytes())
@@ -6,8 +6,9 @@ APP_ROOT="/opt/genesys-audiohook"
 UNIT="/etc/systemd/system/genesys-audiohook-collector.service"
 
 sudo mkdir -p "$APP_ROOT"
-sudo cp -f collector.py "$APP_ROOT/"
+sudo cp -f collector.py codec.py spool.py metrics.py channels.py dedup.py topic_cache.py token_manager.py logpipe.py partition.py rules.py columnar.py event_store.py segment_index.py window_stats.py alerts.py "$APP_ROOT/"
 [ -f topics.json ] && sudo cp -f topics.json "$APP_ROOT/"
+[ -f rules.json ] && sudo cp -f rules.json "$APP_ROOT/"
 [ -f .env ] && sudo cp -f .env "$APP_ROOT/" || true
 
 # Python venv + deps
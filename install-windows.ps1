@@ -4,7 +4,7 @@ Installs Genesys AudioHook Collector as a Windows service.
 
 .NOTES
 - Creates a venv under C:\ProgramData\GenesysAudioHookCollector\venv
-- Copies collector.py, topics.json, .env (if present)
+- Copies collector.py (and its helper modules), topics.json, .env (if present)
 - Registers service 'GenesysAudioHookCollector' running run-collector.ps1
 - Works on PowerShell 5.1 and 7+
 #>
@@ -30,11 +30,14 @@ if (-not (Test-Path $logDir)) { New-Item -ItemType Directory -Path $logDir | Out
 # -- Copy app files -----------------------------------------------------------
 $here = Split-Path -Parent $MyInvocation.MyCommand.Path
 
-# Required: collector.py
-Copy-Item -LiteralPath (Join-Path $here "collector.py") -Destination (Join-Path $InstallRoot "collector.py") -Force
+# Required: collector.py and its helper modules
+foreach ($module in @("collector.py", "codec.py", "spool.py", "metrics.py", "channels.py", "dedup.py", "topic_cache.py", "token_manager.py", "logpipe.py", "partition.py", "rules.py", "columnar.py", "event_store.py", "segment_index.py", "window_stats.py", "alerts.py")) {
+    Copy-Item -LiteralPath (Join-Path $here $module) -Destination (Join-Path $InstallRoot $module) -Force
+}
 
-# Optional: topics.json, .env, run-collector.ps1 (we always copy our launcher)
+# Optional: topics.json, rules.json, .env, run-collector.ps1 (we always copy our launcher)
 if (Test-Path (Join-Path $here "topics.json")) { Copy-Item (Join-Path $here "topics.json") $InstallRoot -Force }
+if (Test-Path (Join-Path $here "rules.json")) { Copy-Item (Join-Path $here "rules.json") $InstallRoot -Force }
 if (Test-Path (Join-Path $here ".env")) { Copy-Item (Join-Path $here ".env") $InstallRoot -Force }
 Copy-Item -LiteralPath (Join-Path $here "run-collector.ps1") -Destination (Join-Path $InstallRoot "run-collector.ps1") -Force
 
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Non-blocking structured logging shared by both collectors
+
+Serializing a record and print(..., flush=True)-ing it on the event loop
+stalls ingestion whenever stdout is slow (a container log pipe under load).
+LogPipeline keeps the caller's cost to a level check and a queue put:
+
+- Records below the configured level are rejected before anything is built.
+- Accepted records (epoch, level, message, fields) go on a bounded queue. A
+  daemon thread formats them (ISO timestamp + JSON) and writes whatever has
+  accumulated as one batch with a single flush.
+- A full queue never blocks the caller: the record is dropped and counted,
+  and the writer reports how many lines were lost.
+- close() (registered with atexit on first use) drains the queue.
+
+EventLogSampler replaces one INFO line per event with an optional 1-in-N
+sample plus periodic per-key rollups ("120 events of AUDIOHOOK-0001 in the
+last 10s"). It runs on the event loop and only counts per event.
+"""
+
+import asyncio
+import atexit
+import json
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import codec
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARN': 30, 'WARNING': 30, 'ERROR': 40, 'FATAL': 50, 'CRITICAL': 50}
+BATCH_MAX = 1000  # Records formatted per write/flush
+_STOP = object()
+
+
+def level_number(level: str) -> int:
+    """Numeric severity for a level name; unknown names count as INFO"""
+    return LEVELS.get(str(level).upper(), 20)
+
+
+class LogPipeline:
+    """Level-filtered structured records written by a background thread"""
+
+    def __init__(self, keys: Tuple[str, str, str] = ('timestamp', 'level', 'message'), level: str = 'INFO',
+                 queue_size: int = 10000, background: bool = True):
+        self.keys = keys
+        self.threshold = level_number(level)
+        self.background = background
+        self._queue: 'queue.Queue' = queue.Queue(maxsize=max(1, queue_size))
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._atexit = False
+        self._reported_drops = 0
+        self.stats = {
+            'written': 0,
+            'dropped': 0,
+            'filtered': 0,
+            'write_errors': 0
+        }
+
+    def set_level(self, level: str):
+        self.threshold = level_number(level)
+
+    def enabled_for(self, level: str) -> bool:
+        """Cheap check callers make before building a record"""
+        if LEVELS.get(level, 20) >= self.threshold:
+            return True
+        self.stats['filtered'] += 1
+        return False
+
+    # ---------- Producer side ----------
+    def emit(self, level: str, message: str, fields: Dict[str, Any], err: bool = False):
+        """Queue a record; never blocks (a full queue drops it)"""
+        item = (time.time(), level, message, fields, err)
+        if not self.background:
+            self._write([item])
+            return
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.stats['dropped'] += 1
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+            self._thread.start()
+            if not self._atexit:
+                atexit.register(self.close)
+                self._atexit = True
+
+    # ---------- Writer thread ----------
+    def _format(self, item) -> str:
+        ts, level, message, fields, _ = item
+        time_key, level_key, message_key = self.keys
+        entry = {time_key: datetime.fromtimestamp(ts, timezone.utc).isoformat(), level_key: level, message_key: message}
+        entry.update(fields)
+        try:
+            return codec.dumps_str(entry)
+        except (TypeError, ValueError):
+            # A bad field must not take the writer thread down
+            return json.dumps(entry, default=str)
+
+    def _write(self, items):
+        out, err = [], []
+        dropped = self.stats['dropped'] - self._reported_drops
+        if dropped > 0:
+            self._reported_drops += dropped
+            err.append(self._format((time.time(), 'WARN', 'Log records dropped (queue full)',
+                                     {'dropped': dropped}, True)))
+        for item in items:
+            (err if item[4] else out).append(self._format(item))
+        for lines, stream in ((out, sys.stdout), (err, sys.stderr)):
+            if not lines:
+                continue
+            try:
+                stream.write('\n'.join(lines) + '\n')
+                stream.flush()
+                self.stats['written'] += len(lines)
+            except (OSError, ValueError):
+                self.stats['write_errors'] += 1
+
+    def _run(self):
+        q = self._queue
+        while True:
+            batch = [q.get()]
+            while len(batch) < BATCH_MAX:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            records = [item for item in batch if item is not _STOP]
+            try:
+                if records:
+                    self._write(records)
+            finally:
+                for _ in batch:
+                    q.task_done()
+            if len(records) != len(batch):
+                return
+
+    # ---------- Lifecycle ----------
+    def flush(self):
+        """Block until everything queued so far has been written"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self, timeout: float = 5.0):
+        """Drain the queue and stop the writer; a later emit() starts a new one"""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is None or not thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        thread.join(timeout)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            queued=self._queue.qsize(),
+            background=self.background
+        )
+
+
+class EventLogSampler:
+    """Per-event log lines reduced to a 1-in-N sample and periodic per-key counts"""
+
+    def __init__(self, log: Callable[..., None], sample_every: int = 0, rollup_seconds: float = 10.0,
+                 noun: str = 'events'):
+        self.log = log  # log(level, message, **fields)
+        self.sample_every = sample_every  # 0 = no per-event lines, 1 = every event
+        self.rollup_seconds = rollup_seconds  # 0 = no rollups
+        self.noun = noun
+        self._counts: Dict[str, int] = {}
+        self._window_started = time.monotonic()
+        self.stats = {
+            'events': 0,
+            'sampled': 0,
+            'rollups': 0
+        }
+
+    def record(self, key: str, message: str, **fields):
+        """Count one event under `key`; log it if it falls in the sample"""
+        events = self.stats['events'] = self.stats['events'] + 1
+        every = self.sample_every
+        if every > 0 and (events - 1) % every == 0:
+            self.stats['sampled'] += 1
+            if every > 1:
+                fields['sample_every'] = every
+            self.log('INFO', message, **fields)
+        if self.rollup_seconds > 0:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def flush(self):
+        """Log one summary line per key counted since the last flush"""
+        now = time.monotonic()
+        elapsed = now - self._window_started
+        counts, self._counts = self._counts, {}
+        self._window_started = now
+        for key, count in counts.items():
+            self.stats['rollups'] += 1
+            self.log('INFO', f'{count} {self.noun} of {key} in the last {elapsed:.0f}s',
+                     event_code=key, count=count, window_seconds=round(elapsed, 1))
+
+    async def run(self):
+        """Background task: emit rollups every `rollup_seconds`"""
+        if self.rollup_seconds <= 0:
+            return
+        try:
+            while True:
+                await asyncio.sleep(self.rollup_seconds)
+                self.flush()
+        finally:
+            self.flush()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            sample_every=self.sample_every,
+            rollup_seconds=self.rollup_seconds,
+            pending_keys=len(self._counts)
+        )
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Key-partitioned worker processes shared by both collectors
+
+Decoding, classifying and re-encoding events is pure CPU work, so on one
+event-loop thread a single busy core caps throughput. PartitionedPool moves
+it to `workers` processes while keeping events of the same conversation in
+order:
+
+- The partition key (conversationId, else entityId) is read straight from the
+  raw frame text, so the socket reader never decodes a frame itself. Frames
+  without either id carry no ordering constraint and are spread round-robin.
+- Each partition is a single-process executor and always receives the same
+  keys, so one key's frames are handled in arrival order.
+- pump() submits batches and hands results to the caller in submission order,
+  with at most `max_inflight` batches outstanding (backpressure towards the
+  ingest queue).
+
+Workers are started with the 'spawn' method: the collectors run threads
+(log writer, segment compression) that must not be forked mid-operation.
+The function given to pump() must be a module-level function so it can be
+pickled; it receives a list of items and returns a list of results.
+"""
+
+import asyncio
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+KEY_FIELDS = ('conversationId', 'entityId')
+_NEEDLES = tuple(f'"{field}"' for field in KEY_FIELDS)
+
+
+def partition_key(frame: str) -> str:
+    """conversationId (else entityId) read from raw frame text without decoding it; '' if neither"""
+    for needle in _NEEDLES:
+        at = frame.find(needle)
+        while at >= 0:
+            # Skip `: ` to the opening quote of a string value (ids never contain escapes)
+            pos = at + len(needle)
+            while pos < len(frame) and frame[pos] in ' \t\r\n:':
+                pos += 1
+            if pos < len(frame) and frame[pos] == '"':
+                end = frame.find('"', pos + 1)
+                if end > pos + 1:
+                    return frame[pos + 1:end]
+            at = frame.find(needle, at + 1)
+    return ''
+
+
+def partition_of(key: str, partitions: int) -> int:
+    """Stable partition for a key (the same in every process and across restarts)"""
+    return zlib.crc32(key.encode('utf-8')) % partitions
+
+
+def _ready() -> bool:
+    return True
+
+
+class PartitionedPool:
+    """One single-process executor per partition; equal keys always share a partition"""
+
+    def __init__(self, workers: int, max_inflight: Optional[int] = None):
+        self.workers = max(1, workers)
+        self.max_inflight = max_inflight or self.workers * 4
+        self._context = multiprocessing.get_context('spawn')
+        self._executors = [self._executor() for _ in range(self.workers)]
+        self._next_unkeyed = 0
+        self.stats = {
+            'batches': 0,
+            'items': 0,
+            'unkeyed': 0,
+            'errors': 0,
+            'restarts': 0,
+            'inflight': 0,
+            'partition_items': [0] * self.workers
+        }
+
+    def _executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(1, mp_context=self._context)
+
+    def _submit(self, part: int, fn: Callable, items: List[Any]) -> asyncio.Future:
+        try:
+            return asyncio.wrap_future(self._executors[part].submit(fn, items))
+        except BrokenProcessPool:
+            # The worker died (its in-flight batch fails in pump); start a fresh one
+            self._executors[part] = self._executor()
+            self.stats['restarts'] += 1
+            return asyncio.wrap_future(self._executors[part].submit(fn, items))
+
+    async def start(self):
+        """Spawn every worker now so the first events do not pay the start-up cost"""
+        await asyncio.gather(*(asyncio.wrap_future(ex.submit(_ready)) for ex in self._executors))
+
+    def split(self, items: List[Any], text: Callable[[Any], str]) -> List[Tuple[int, List[Any]]]:
+        """Group items by partition, keeping their relative order within each group"""
+        groups: Dict[int, List[Any]] = {}
+        for item in items:
+            key = partition_key(text(item))
+            if key:
+                part = partition_of(key, self.workers)
+            else:
+                part = self._next_unkeyed
+                self._next_unkeyed = (part + 1) % self.workers
+                self.stats['unkeyed'] += 1
+            groups.setdefault(part, []).append(item)
+        return list(groups.items())
+
+    async def pump(self, fn: Callable[[List[Any]], List[Any]],
+                   next_batch: Callable[[], Awaitable[Optional[List[Any]]]], text: Callable[[Any], str],
+                   deliver: Callable[[Any], Awaitable[None]],
+                   on_error: Optional[Callable[[Exception], None]] = None):
+        """Run batches from next_batch() (None ends the stream) through fn on the workers
+
+        Results reach deliver() in submission order, which keeps per-key order.
+        """
+        inflight: asyncio.Queue = asyncio.Queue(self.max_inflight)
+
+        async def drain():
+            while True:
+                future = await inflight.get()
+                if future is None:
+                    return
+                try:
+                    results = await future
+                except Exception as e:
+                    # A crashed worker or an unpicklable batch; the other partitions keep going
+                    self.stats['errors'] += 1
+                    if on_error:
+                        on_error(e)
+                    results = []
+                finally:
+                    self.stats['inflight'] -= 1
+                for result in results:
+                    await deliver(result)
+
+        drainer = asyncio.create_task(drain())
+        try:
+            while True:
+                batch = await next_batch()
+                if batch is None:
+                    break
+                for part, items in self.split(batch, text):
+                    self.stats['batches'] += 1
+                    self.stats['items'] += len(items)
+                    self.stats['partition_items'][part] += len(items)
+                    self.stats['inflight'] += 1
+                    await inflight.put(self._submit(part, fn, items))
+        except BaseException:
+            drainer.cancel()
+            raise
+        await inflight.put(None)
+        await drainer
+
+    def shutdown(self):
+        for executor in self._executors:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            workers=self.workers,
+            partition_items=list(self.stats['partition_items'])
+        )
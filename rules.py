@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Classification rules shared by both collectors
+
+The AudioHook heuristics (event-code prefixes, substring checks on entity
+fields and topics, the severity buckets) live in a rule file instead of code.
+RuleEngine compiles each classifier into one generated Python function (field
+lookups and tests inlined, no per-rule calls) and re-compiles when the file
+changes, keeping the previous rules if the new file is invalid.
+
+Rule file (JSON; sections left out fall back to DEFAULT_RULES):
+  {
+    "classifiers": {
+      "<name>": [
+        {"name": "code-prefix", "field": "eventEntity.id", "prefix": ["AUDIOHOOK-"]},
+        {"name": "entity-type", "field": "entityType", "contains": "audiohook", "ignore_case": true},
+        {"name": "custom", "field": ["code", "eventId"], "regex": "^AH-\\\\d+$"}
+      ]
+    },
+    "severity": {"error": ["ERROR", "CRITICAL"], "warn": ["WARN"], "default": "info"}
+  }
+
+- `field` is a dotted path into the record, or a list of paths of which the
+  first non-empty value is used. Non-string values are compared as str().
+- Each rule has exactly one test: `equals`, `prefix`, `contains` (a string or
+  a list) or `regex`. `ignore_case` lower-cases the value (and the patterns).
+- A classifier matches when any of its rules does. Rules run cheapest first
+  (equals, prefix, contains, regex) and the first hit is credited to its rule.
+- Prefixes are bucketed by length, so many prefixes cost one set lookup per
+  distinct length rather than one comparison each.
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# The heuristics both collectors used before rules became configurable
+DEFAULT_RULES: Dict[str, Any] = {
+    'classifiers': {
+        # audiohook_collector.py: notification eventBody
+        'audiohook_event': [
+            {'name': 'event-code-prefix', 'field': 'eventEntity.id', 'prefix': ['AUDIOHOOK-']},
+            {'name': 'entity-type', 'field': 'entityType', 'contains': 'audiohook', 'ignore_case': True},
+            {'name': 'event-name', 'field': 'eventEntity.name', 'contains': 'audiohook', 'ignore_case': True}
+        ],
+        # collector.py: normalized code / component and the topic name
+        'audiohook_signal': [
+            {'name': 'code', 'field': 'code', 'contains': 'audiohook', 'ignore_case': True},
+            {'name': 'component', 'field': 'component', 'contains': 'audiohook', 'ignore_case': True},
+            {'name': 'topic', 'field': 'topic', 'contains': 'audiohook', 'ignore_case': True}
+        ]
+    },
+    'severity': {
+        'error': ['ERROR', 'CRITICAL', 'SEVERE'],
+        'warn': ['WARN', 'WARNING'],
+        'default': 'info'
+    }
+}
+
+TEST_COST = {'equals': 0, 'prefix': 1, 'contains': 2, 'regex': 3}
+PREFIX_TUPLE_MAX = 8  # Up to this many prefixes, str.startswith(tuple) beats the length buckets
+
+
+class Rule:
+    """One validated rule: where its value comes from and what it is tested against"""
+
+    __slots__ = ('name', 'kind', 'paths', 'ignore_case', 'patterns')
+
+    def __init__(self, name: str, kind: str, paths: List[Tuple[str, ...]], ignore_case: bool, patterns: List[str]):
+        self.name = name
+        self.kind = kind
+        self.paths = paths
+        self.ignore_case = ignore_case
+        self.patterns = patterns
+
+
+def parse_rule(spec: Dict[str, Any]) -> Rule:
+    """Validate one rule spec; raises ValueError if it is malformed"""
+    if not isinstance(spec, dict) or not isinstance(spec.get('name'), str):
+        raise ValueError(f'rule needs a name: {spec!r}')
+    name = spec['name']
+    kinds = [kind for kind in TEST_COST if kind in spec]
+    if len(kinds) != 1:
+        raise ValueError(f'rule {name!r} needs exactly one of {", ".join(TEST_COST)}')
+    kind = kinds[0]
+
+    field = spec.get('field')
+    paths = [field] if isinstance(field, str) else field
+    if not isinstance(paths, list) or not paths or not all(isinstance(p, str) and p for p in paths):
+        raise ValueError(f'rule {name!r}: invalid field {field!r}')
+
+    ignore_case = bool(spec.get('ignore_case'))
+    patterns = spec[kind]
+    patterns = [patterns] if isinstance(patterns, str) else patterns
+    if not isinstance(patterns, list) or not patterns or not all(isinstance(p, str) and p for p in patterns):
+        raise ValueError(f'rule {name!r}: {kind} needs non-empty strings')
+    if kind == 'regex':
+        if len(patterns) != 1:
+            raise ValueError(f'rule {name!r}: regex must be a single pattern')
+        try:
+            re.compile(patterns[0])
+        except re.error as e:
+            raise ValueError(f'rule {name!r}: bad regex: {e}') from None
+    elif ignore_case:
+        patterns = [p.lower() for p in patterns]
+    return Rule(name, kind, [tuple(p.split('.')) for p in paths], ignore_case, patterns)
+
+
+def _first_nonempty(paths: List[Tuple[str, ...]]) -> Callable[[Dict[str, Any]], Any]:
+    def get(record: Dict[str, Any]) -> Any:
+        for path in paths:
+            value: Any = record
+            for part in path:
+                value = value.get(part) if isinstance(value, dict) else None
+            if value:
+                return value
+        return None
+    return get
+
+
+class Classifier:
+    """A named rule list compiled into one generated predicate
+
+    `match(record)` evaluates the rules cheapest first with field lookups,
+    conversions and tests inlined, and counts the first hit in `hits`.
+    """
+
+    def __init__(self, name: str, rules: List[Rule]):
+        self.name = name
+        self.rules = sorted(rules, key=lambda rule: TEST_COST[rule.kind])  # Stable: file order within a cost
+        self.hits = [0] * len(self.rules)
+        self.source, self.match = self._compile()
+
+    def adopt(self, stable: Callable[[Dict[str, Any]], bool]):
+        """Move the compiled predicate into an existing function object (see RuleEngine.predicate)"""
+        stable.__globals__.clear()
+        stable.__globals__.update(self.match.__globals__)
+        stable.__code__ = self.match.__code__
+        self.match = stable
+
+    def _compile(self):
+        env: Dict[str, Any] = {'_hits': self.hits, '_str': str, '_dict': dict}
+        lines = ['def match(record):']
+        for i, rule in enumerate(self.rules):
+            # Value: inline dict lookups for one path, a helper for first-non-empty of several
+            if len(rule.paths) == 1:
+                path = rule.paths[0]
+                lines.append(f'    v = record.get({path[0]!r})')
+                for part in path[1:]:
+                    lines.append(f'    v = v.get({part!r}) if v.__class__ is _dict else None')
+            else:
+                env[f'_g{i}'] = _first_nonempty(rule.paths)
+                lines.append(f'    v = _g{i}(record)')
+
+            value = 'v.lower()' if rule.ignore_case and rule.kind != 'regex' else 'v'
+            patterns = rule.patterns
+            if rule.kind == 'equals':
+                env[f'_a{i}'] = frozenset(patterns)
+                test = f'{value} in _a{i}'
+            elif rule.kind == 'prefix' and len(patterns) <= PREFIX_TUPLE_MAX:
+                env[f'_a{i}'] = tuple(patterns)
+                test = f'{value}.startswith(_a{i})'
+            elif rule.kind == 'prefix':
+                buckets: Dict[int, set] = {}
+                for prefix in patterns:
+                    buckets.setdefault(len(prefix), set()).add(prefix)
+                ordered = sorted(buckets.items())
+                env[f'_a{i}'] = lambda s, ordered=ordered: any(s[:n] in bucket for n, bucket in ordered)
+                test = f'_a{i}({value})'
+            elif rule.kind == 'contains' and len(patterns) == 1:
+                env[f'_a{i}'] = patterns[0]
+                test = f'_a{i} in {value}'
+            elif rule.kind == 'contains':
+                env[f'_a{i}'] = lambda s, needles=tuple(patterns): any(needle in s for needle in needles)
+                test = f'_a{i}({value})'
+            else:
+                env[f'_a{i}'] = re.compile(patterns[0], re.IGNORECASE if rule.ignore_case else 0).search
+                test = f'_a{i}(v) is not None'
+            lines += [
+                '    if v:',
+                '        if v.__class__ is not _str:',
+                '            v = _str(v)',
+                f'        if {test}:',
+                f'            _hits[{i}] += 1',
+                '            return True'
+            ]
+        lines.append('    return False')
+        source = '\n'.join(lines) + '\n'
+        exec(compile(source, f'<rules:{self.name}>', 'exec'), env)
+        return source, env['match']
+
+
+def compile_rules(spec: Dict[str, Any]) -> Tuple[Dict[str, Classifier], Dict[str, str], str]:
+    """Compiled classifiers, the severity value -> bucket map and the default bucket"""
+    classifiers = {}
+    for name, rules in dict(DEFAULT_RULES['classifiers'], **(spec.get('classifiers') or {})).items():
+        if not isinstance(rules, list):
+            raise ValueError(f'classifier {name!r} must be a list of rules')
+        classifiers[name] = Classifier(name, [parse_rule(rule) for rule in rules])
+
+    severity = spec.get('severity') or DEFAULT_RULES['severity']
+    if not isinstance(severity, dict):
+        raise ValueError('severity must be an object')
+    buckets = {}
+    for bucket, values in severity.items():
+        if bucket == 'default':
+            continue
+        for value in [values] if isinstance(values, str) else values:
+            buckets[str(value).upper()] = bucket
+    return classifiers, buckets, str(severity.get('default', 'info'))
+
+
+class RuleEngine:
+    """Compiled classification rules with per-rule hit counters and hot reload"""
+
+    def __init__(self, path: Optional[str] = None, reload_seconds: float = 5.0):
+        self.path = path or None
+        self.reload_seconds = reload_seconds
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self.stats = {
+            'source': 'defaults',
+            'loaded_at': None,
+            'reloads': 0,
+            'reload_failures': 0,
+            'last_error': None
+        }
+        self.classifiers, self.severity_map, self.severity_default = compile_rules(DEFAULT_RULES)
+        self._predicates: Dict[str, Callable[[Dict[str, Any]], bool]] = {}
+        self.stats['loaded_at'] = time.time()
+        if self.path:
+            self.reload(force=True)
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-compile the rule file if it changed; returns whether new rules are in effect
+
+        A missing file means built-in defaults. An invalid file is reported and
+        the current rules stay in effect.
+        """
+        mtime = self._file_mtime()
+        if not force and mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            if mtime is None:
+                spec, source = DEFAULT_RULES, 'defaults'
+            else:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    spec = json.load(f)
+                if not isinstance(spec, dict):
+                    raise ValueError('rule file must contain a JSON object')
+                source = self.path
+            classifiers, severity_map, severity_default = compile_rules(spec)
+        except (OSError, ValueError) as e:
+            self.stats['reload_failures'] += 1
+            self.stats['last_error'] = str(e)[:200]
+            return False
+
+        # Counters carry over for rules that keep their classifier and name
+        previous = self.hits()
+        for name, compiled in classifiers.items():
+            for i, rule in enumerate(compiled.rules):
+                compiled.hits[i] = previous.get((name, rule.name), 0)
+            if name in self._predicates:
+                compiled.adopt(self._predicates[name])
+        self.classifiers, self.severity_map, self.severity_default = classifiers, severity_map, severity_default
+        if not force:
+            self.stats['reloads'] += 1
+        self.stats.update(source=source, loaded_at=time.time(), last_error=None)
+        return True
+
+    def maybe_reload(self) -> bool:
+        """reload() at most every reload_seconds; cheap enough to call per batch"""
+        if not self.path or self.reload_seconds <= 0:
+            return False
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.reload_seconds
+        return self.reload()
+
+    async def watch(self, on_reload: Optional[Callable[['RuleEngine'], None]] = None):
+        """Background task: pick up rule file changes every reload_seconds"""
+        if not self.path or self.reload_seconds <= 0:
+            return
+        while True:
+            await asyncio.sleep(self.reload_seconds)
+            failures = self.stats['reload_failures']
+            # On the loop, so a swap never interleaves with match()
+            if self.maybe_reload() or self.stats['reload_failures'] != failures:
+                if on_reload:
+                    on_reload(self)
+
+    def match(self, classifier: str, record: Dict[str, Any]) -> bool:
+        """True if any rule of the classifier matches the record"""
+        return self.classifiers[classifier].match(record)
+
+    def predicate(self, classifier: str) -> Callable[[Dict[str, Any]], bool]:
+        """The classifier's generated function itself, for hot paths
+
+        Reloads recompile into this same function object (its code and
+        globals are replaced in place), so callers can bind it once and skip
+        the match() lookup on every call.
+        """
+        if classifier not in self._predicates:
+            self._predicates[classifier] = self.classifiers[classifier].match
+        return self._predicates[classifier]
+
+    def severity(self, value: Optional[str]) -> str:
+        """Bucket for a severity value (compared upper-case)"""
+        return self.severity_map.get((value or '').upper(), self.severity_default)
+
+    def hits(self) -> Dict[Tuple[str, str], int]:
+        return {
+            (name, rule.name): hits
+            for name, classifier in self.classifiers.items()
+            for rule, hits in zip(classifier.rules, classifier.hits)
+        }
+
+    def take_hits(self) -> Dict[Tuple[str, str], int]:
+        """Non-zero counters since the last call, resetting them (worker processes report these)"""
+        taken = {}
+        for name, classifier in self.classifiers.items():
+            counts = classifier.hits
+            for i, rule in enumerate(classifier.rules):
+                if counts[i]:
+                    taken[(name, rule.name)] = counts[i]
+                    counts[i] = 0  # In place: the compiled match() holds this list
+        return taken
+
+    def add_hits(self, hits: Dict[Tuple[str, str], int]):
+        """Merge counters taken in a worker process; rules unknown here are skipped"""
+        for name, classifier in self.classifiers.items():
+            for i, rule in enumerate(classifier.rules):
+                n = hits.get((name, rule.name))
+                if n:
+                    classifier.hits[i] += n
+
+    def snapshot(self) -> Dict[str, Any]:
+        classifiers: Dict[str, Dict[str, int]] = {}
+        for (name, rule), hits in self.hits().items():
+            classifiers.setdefault(name, {})[rule] = hits
+        return dict(self.stats, file=self.path, classifiers=classifiers)
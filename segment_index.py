@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sparse time index over rotated JSONL segments
+
+Each closed segment (events-<stamp>.jsonl, or .jsonl.gz / .jsonl.zst once
+compressed) gets a sidecar events-<stamp>.jsonl.idx:
+
+  {"version": 1, "file": "events-20240115T103045Z.jsonl.gz", "compression": "gzip",
+   "lines": 10234, "raw_bytes": 10485123, "min_ts": 1705314645.1, "max_ts": 1705318244.9,
+   "blocks": [[raw_offset, lines, min_ts, max_ts], ...],
+   "members": [compressed_offset, ...]}
+
+- A block starts every `every` lines. Its min/max timestamp (epoch seconds
+  of the line's "timestamp") make the index exact even if lines are not in
+  perfect time order: blocks are located by binary search over the running
+  maximum (first block that can reach `start`) and the trailing minimum
+  (first block from which everything is past `end`).
+- Compressed segments are written as one gzip member (or zstd frame) per
+  block, so `members` gives the compressed offset where each block can be
+  decompressed on its own. The result is still a normal .gz / .zst file.
+- Segments without a sidecar, or compressed without members, are still
+  read correctly, by streaming the whole file.
+
+Command line:
+  python segment_index.py query audiohook_events.jsonl --from 2024-01-15T10:05:00Z --to 2024-01-15T10:20:00Z
+  python segment_index.py build audiohook_events.jsonl   # index segments written before indexing was enabled
+"""
+
+import argparse
+import bisect
+import gzip
+import json
+import os
+import re
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard as zstd
+except ImportError:  # Optional dependency for .zst segments
+    zstd = None
+
+INDEX_SUFFIX = '.idx'
+INDEX_VERSION = 1
+COMPRESSED_SUFFIXES = {'.gz': 'gzip', '.zst': 'zstd'}
+_TIMESTAMP_RE = re.compile(rb'"timestamp"\s*:\s*"([^"]+)"')
+
+
+def to_epoch(value: str) -> float:
+    """ISO-8601 timestamp to epoch seconds (naive values are UTC); raises ValueError"""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def line_timestamp(line: bytes) -> Optional[float]:
+    """Epoch seconds of a line's first "timestamp" field (the formatted event's own), if any"""
+    match = _TIMESTAMP_RE.search(line)
+    if match is None:
+        return None
+    try:
+        return to_epoch(match.group(1).decode('ascii'))
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+
+def list_segments(filepath: Path) -> List[Path]:
+    """Closed segments (compressed or not) for an output file, oldest first"""
+    return sorted(p for p in filepath.parent.glob(f'{filepath.stem}-*{filepath.suffix}*')
+                  if not p.name.endswith((INDEX_SUFFIX, '.tmp')))
+
+
+def index_path(segment: Path) -> Path:
+    """Sidecar of a segment, shared by its raw and compressed forms"""
+    name = segment.name
+    for suffix in COMPRESSED_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    return segment.with_name(name + INDEX_SUFFIX)
+
+
+class BlockIndexer:
+    """Builds the block list of a file as lines are appended to it"""
+
+    def __init__(self, every: int):
+        self.every = max(1, every)
+        self.reset()
+
+    def reset(self):
+        self.blocks: List[List[Any]] = []  # [raw_offset, lines, min_ts, max_ts]
+        self.lines = 0
+        self.end = 0
+
+    def add(self, offset: int, length: int, timestamp: Any = None):
+        """Record a line at `offset`; `timestamp` may be an ISO string, epoch seconds or None"""
+        if isinstance(timestamp, str):
+            try:
+                timestamp = to_epoch(timestamp)
+            except ValueError:
+                timestamp = None
+        if self.lines % self.every == 0:
+            self.blocks.append([offset, 0, None, None])
+        block = self.blocks[-1]
+        block[1] += 1
+        if timestamp is not None:
+            if block[2] is None or timestamp < block[2]:
+                block[2] = timestamp
+            if block[3] is None or timestamp > block[3]:
+                block[3] = timestamp
+        self.lines += 1
+        self.end = offset + length
+
+    def scan(self, stream):
+        """Start over from the lines of an existing (decompressed) stream"""
+        self.reset()
+        for offset, line in _iter_lines(stream):
+            self.add(offset, len(line) + 1, line_timestamp(line))
+
+    def to_index(self, file_name: str) -> Dict[str, Any]:
+        lows = [block[2] for block in self.blocks if block[2] is not None]
+        highs = [block[3] for block in self.blocks if block[3] is not None]
+        return {
+            'version': INDEX_VERSION,
+            'file': file_name,
+            'compression': 'none',
+            'lines': self.lines,
+            'raw_bytes': self.end,
+            'min_ts': min(lows) if lows else None,
+            'max_ts': max(highs) if highs else None,
+            'blocks': [list(block) for block in self.blocks],
+            'members': None
+        }
+
+
+def _open_stream(segment: Path):
+    compression = COMPRESSED_SUFFIXES.get(segment.suffix)
+    if compression == 'gzip':
+        return gzip.open(segment, 'rb')
+    if compression == 'zstd':
+        if zstd is None:
+            raise RuntimeError(f'zstandard is needed to read {segment}')
+        return zstd.ZstdDecompressor().stream_reader(segment.open('rb'), read_across_frames=True)
+    return segment.open('rb')
+
+
+def _iter_lines(stream) -> Iterator[Tuple[int, bytes]]:
+    """(raw offset, line without newline) for every line of a decompressed stream"""
+    offset = 0
+    tail = b''
+    while True:
+        chunk = stream.read(1024 * 1024)
+        if not chunk:
+            break
+        lines = (tail + chunk).split(b'\n')
+        tail = lines.pop()
+        for line in lines:
+            yield offset, line
+            offset += len(line) + 1
+    if tail:
+        yield offset, tail
+
+
+def scan_index(segment: Path, every: int) -> Dict[str, Any]:
+    """Index a segment by reading it (for files written without one)"""
+    indexer = BlockIndexer(every)
+    with _open_stream(segment) as stream:
+        indexer.scan(stream)
+    index = indexer.to_index(segment.name)
+    index['compression'] = COMPRESSED_SUFFIXES.get(segment.suffix, 'none')
+    return index
+
+
+def write_index(segment: Path, index: Dict[str, Any]):
+    """Atomically write a segment's sidecar"""
+    target = index_path(segment)
+    tmp = target.with_name(target.name + '.tmp')
+    tmp.write_text(json.dumps(index, separators=(',', ':')), encoding='utf-8')
+    os.replace(tmp, target)
+
+
+def load_index(segment: Path) -> Optional[Dict[str, Any]]:
+    """The sidecar of this exact file, or None if it is missing, stale or unreadable"""
+    try:
+        index = json.loads(index_path(segment).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get('version') != INDEX_VERSION or index.get('file') != segment.name:
+        return None
+    return index
+
+
+def compress_blocks(src, dst, index: Dict[str, Any], compression: str, compress: Callable[[bytes], bytes]):
+    """Write each block of `src` as its own gzip member / zstd frame and record where it starts"""
+    blocks = index['blocks']
+    members = []
+    for i, block in enumerate(blocks):
+        end = blocks[i + 1][0] if i + 1 < len(blocks) else index['raw_bytes']
+        src.seek(block[0])
+        members.append(dst.tell())
+        dst.write(compress(src.read(end - block[0])))
+    index['members'] = members
+    index['compression'] = compression
+
+
+def _decompress(compression: str, data: bytes) -> bytes:
+    if compression == 'gzip':
+        return gzip.decompress(data)
+    if zstd is None:
+        raise RuntimeError('zstandard is needed to read .zst segments')
+    return zstd.ZstdDecompressor().decompress(data)
+
+
+def block_range(index: Dict[str, Any], start: float, end: float) -> Tuple[int, int]:
+    """[first, last) blocks that can hold a timestamp in [start, end)"""
+    running_max, highest = [], float('-inf')
+    for block in index['blocks']:
+        if block[3] is not None:
+            highest = max(highest, block[3])
+        running_max.append(highest)
+    trailing_min, lowest = [], float('inf')
+    for block in reversed(index['blocks']):
+        if block[2] is not None:
+            lowest = min(lowest, block[2])
+        trailing_min.append(lowest)
+    trailing_min.reverse()
+    first = bisect.bisect_left(running_max, start)
+    last = bisect.bisect_left(trailing_min, end)
+    return first, max(first, last)
+
+
+def read_segment(segment: Path, start: float, end: float,
+                 index: Optional[Dict[str, Any]] = None) -> Iterator[bytes]:
+    """Lines of one segment with start <= timestamp < end, in file order"""
+    index = index or load_index(segment)
+    indexed = index is not None and (index['compression'] == 'none' or index.get('members') is not None)
+    if index is not None and (index['min_ts'] is None or index['max_ts'] < start or index['min_ts'] >= end):
+        return
+    if not indexed:
+        # Unindexed: stream everything
+        with _open_stream(segment) as stream:
+            for _, line in _iter_lines(stream):
+                ts = line_timestamp(line)
+                if ts is not None and start <= ts < end:
+                    yield line
+        return
+
+    first, last = block_range(index, start, end)
+    blocks, members = index['blocks'], index.get('members')
+    with segment.open('rb') as f:
+        for i in range(first, last):
+            if members is None:
+                stop = blocks[i + 1][0] if i + 1 < len(blocks) else index['raw_bytes']
+                f.seek(blocks[i][0])
+                data = f.read(stop - blocks[i][0])
+            else:
+                f.seek(members[i])
+                data = f.read(members[i + 1] - members[i]) if i + 1 < len(members) else f.read()
+                data = _decompress(index['compression'], data)
+            for line in data.split(b'\n'):
+                ts = line_timestamp(line)
+                if ts is not None and start <= ts < end:
+                    yield line
+
+
+def read_range(filepath: Path, start: float, end: float) -> Iterator[bytes]:
+    """Event lines with start <= timestamp < end from every segment of an output file and the file itself"""
+    segments = list_segments(filepath)
+    names = {segment.name for segment in segments}
+    for segment in segments:
+        # Mid-compression both forms exist for a moment; read the compressed one
+        if any(segment.name + suffix in names for suffix in COMPRESSED_SUFFIXES):
+            continue
+        yield from read_segment(segment, start, end)
+    if filepath.exists():
+        yield from read_segment(filepath, start, end, index=None)
+
+
+def build_missing(filepath: Path, every: int) -> List[Path]:
+    """Write sidecars for closed segments that have none; returns the segments indexed"""
+    built = []
+    for segment in list_segments(filepath):
+        if load_index(segment) is None:
+            write_index(segment, scan_index(segment, every))
+            built.append(segment)
+    return built
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Time-range reads over rotated JSONL event segments')
+    commands = parser.add_subparsers(dest='command', required=True)
+    query = commands.add_parser('query', help='print events with from <= timestamp < to')
+    query.add_argument('output_file', type=Path, help='active output file, e.g. ./audiohook_events.jsonl')
+    query.add_argument('--from', dest='start', required=True, help='ISO-8601 start (inclusive)')
+    query.add_argument('--to', dest='end', required=True, help='ISO-8601 end (exclusive)')
+    build = commands.add_parser('build', help='index closed segments that have no sidecar yet')
+    build.add_argument('output_file', type=Path)
+    build.add_argument('--every', type=int, default=int(os.environ.get('SEGMENT_INDEX_LINES', '1000')) or 1000,
+                       help='lines per block (default: SEGMENT_INDEX_LINES or 1000)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        for segment in build_missing(args.output_file, args.every):
+            print(f'indexed {segment}', file=sys.stderr)
+        return 0
+
+    try:
+        start, end = to_epoch(args.start), to_epoch(args.end)
+    except ValueError as e:
+        parser.error(str(e))
+    out = sys.stdout.buffer
+    for line in read_range(args.output_file, start, end):
+        out.write(line + b'\n')
+    out.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Disk-backed write-ahead spool for Elasticsearch _bulk payloads
+
+Used by both collectors to keep un-shipped bulk payloads on disk while the
+Elasticsearch cluster is unavailable, and to replay them once it is back.
+
+Layout:
+- spool-<seq>.seg   append-only segments of length-prefixed records
+- checkpoint.json   {"segment": <seq>, "offset": <byte offset>} of the next record to replay
+
+Each record is a header line "<payload bytes> <doc count> <created epoch>\\n"
+followed by the raw NDJSON payload.
+"""
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+SEGMENT_PREFIX = 'spool-'
+SEGMENT_SUFFIX = '.seg'
+CHECKPOINT_FILE = 'checkpoint.json'
+
+
+class BulkSpool:
+    """Segmented on-disk spool with a restart-safe replay checkpoint"""
+
+    def __init__(self, directory: str, segment_bytes: int = 16777216, max_bytes: int = 1073741824):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._write_fh = None
+        self._write_seq: Optional[int] = None
+        self._bytes = 0
+        self._pending: deque = deque()  # (segment, created, docs) for each unreplayed record
+        self.stats = {
+            'batches_spooled': 0,
+            'docs_spooled': 0,
+            'batches_replayed': 0,
+            'docs_replayed': 0,
+            'segments_dropped': 0,
+            'docs_dropped': 0
+        }
+        self.checkpoint = self._load_checkpoint()
+        self._scan()
+
+    # ---------- Segment helpers ----------
+    def _path(self, seq: int) -> Path:
+        return self.directory / f'{SEGMENT_PREFIX}{seq:012d}{SEGMENT_SUFFIX}'
+
+    def _segments(self) -> List[int]:
+        seqs = []
+        for path in self.directory.glob(f'{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}'):
+            try:
+                seqs.append(int(path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+            except ValueError:
+                continue
+        return sorted(seqs)
+
+    def _load_checkpoint(self) -> Tuple[int, int]:
+        try:
+            with (self.directory / CHECKPOINT_FILE).open(encoding='utf-8') as f:
+                data = json.load(f)
+            return int(data['segment']), int(data['offset'])
+        except (OSError, ValueError, KeyError):
+            segments = self._segments()
+            return (segments[0] if segments else 0), 0
+
+    def _save_checkpoint(self):
+        path = self.directory / CHECKPOINT_FILE
+        tmp = path.with_suffix('.tmp')
+        with tmp.open('w', encoding='utf-8') as f:
+            json.dump({'segment': self.checkpoint[0], 'offset': self.checkpoint[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _read_header(f) -> Optional[Tuple[int, int, float]]:
+        header = f.readline()
+        if not header.endswith(b'\n'):
+            return None  # EOF or torn write
+        length, docs, created = header.split()
+        return int(length), int(docs), float(created)
+
+    def _scan(self):
+        """Rebuild pending-record bookkeeping from the segments on disk"""
+        ck_seq, ck_offset = self.checkpoint
+        for seq in self._segments():
+            path = self._path(seq)
+            size = path.stat().st_size
+            if seq < ck_seq:
+                path.unlink()  # Fully replayed before the last shutdown
+                continue
+            self._bytes += size
+            with path.open('rb') as f:
+                if seq == ck_seq:
+                    f.seek(ck_offset)
+                while True:
+                    record = self._read_header(f)
+                    if record is None:
+                        break
+                    length, docs, created = record
+                    f.seek(length, os.SEEK_CUR)
+                    if f.tell() > size:
+                        break
+                    self._pending.append((seq, created, docs))
+
+    def _delete_segment(self, seq: int):
+        path = self._path(seq)
+        try:
+            self._bytes -= path.stat().st_size
+            path.unlink()
+        except OSError:
+            pass
+
+    # ---------- Writing ----------
+    def append(self, payload: bytes, docs: int):
+        """Append a bulk payload as a new record"""
+        with self._lock:
+            if self._write_fh is None or self._write_fh.tell() >= self.segment_bytes:
+                if self._write_fh is not None:
+                    self._write_fh.close()
+                segments = self._segments()
+                self._write_seq = (segments[-1] + 1) if segments else self.checkpoint[0] + 1
+                self._write_fh = self._path(self._write_seq).open('ab')
+                if not segments:
+                    self.checkpoint = (self._write_seq, 0)
+                    self._save_checkpoint()
+
+            created = time.time()
+            record = b'%d %d %.3f\n' % (len(payload), docs, created) + payload
+            self._write_fh.write(record)
+            self._write_fh.flush()
+            self._bytes += len(record)
+            self._pending.append((self._write_seq, created, docs))
+            self.stats['batches_spooled'] += 1
+            self.stats['docs_spooled'] += docs
+            self._enforce_limit()
+
+    def _enforce_limit(self):
+        """Drop the oldest segments while the spool exceeds max_bytes"""
+        while self._bytes > self.max_bytes:
+            segments = self._segments()
+            if len(segments) <= 1:
+                break
+            oldest = segments[0]
+            while self._pending and self._pending[0][0] == oldest:
+                self.stats['docs_dropped'] += self._pending.popleft()[2]
+            self._delete_segment(oldest)
+            self.stats['segments_dropped'] += 1
+            if self.checkpoint[0] <= oldest:
+                self.checkpoint = (segments[1], 0)
+                self._save_checkpoint()
+
+    # ---------- Replay ----------
+    def peek(self) -> Optional[Tuple[bytes, int, Tuple[int, int]]]:
+        """Return (payload, docs, next checkpoint) for the oldest unreplayed record"""
+        with self._lock:
+            while self._pending:
+                seq, offset = self.checkpoint
+                path = self._path(seq)
+                if path.exists():
+                    with path.open('rb') as f:
+                        f.seek(offset)
+                        record = self._read_header(f)
+                        if record is not None:
+                            length, docs, _ = record
+                            payload = f.read(length)
+                            if len(payload) == length:
+                                return payload, docs, (seq, f.tell())
+
+                # Segment exhausted or missing: move on to the next one
+                later = [s for s in self._segments() if s > seq]
+                if not later:
+                    return None
+                if seq != self._write_seq:
+                    self._delete_segment(seq)
+                self.checkpoint = (later[0], 0)
+                self._save_checkpoint()
+            return None
+
+    def commit(self, position: Tuple[int, int]):
+        """Advance the checkpoint past a successfully replayed record"""
+        with self._lock:
+            self.checkpoint = position
+            self._save_checkpoint()
+            if self._pending:
+                _, _, docs = self._pending.popleft()
+                self.stats['batches_replayed'] += 1
+                self.stats['docs_replayed'] += docs
+            if not self._pending and position[0] != self._write_seq:
+                self._delete_segment(position[0])
+
+    @property
+    def pending_batches(self) -> int:
+        return len(self._pending)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Spool size, age and lag metrics"""
+        oldest = self._pending[0][1] if self._pending else None
+        return dict(
+            self.stats,
+            bytes=self._bytes,
+            segments=len(self._segments()),
+            pending_batches=len(self._pending),
+            pending_docs=sum(docs for _, _, docs in self._pending),
+            oldest_age_seconds=round(time.time() - oldest, 3) if oldest else 0.0
+        )
+
+    def close(self):
+        with self._lock:
+            if self._write_fh is not None:
+                self._write_fh.close()
+                self._write_fh = None
+
+
+async def replay_spool(spool: BulkSpool, post: Callable[[bytes], Awaitable[bool]],
+                       rate: float, idle_interval: float = 1.0, max_backoff: float = 30.0):
+    """Drain spooled payloads through `post` at up to `rate` payloads per second
+
+    `post` returns True once the payload has been dealt with (shipped, or
+    rejected in a way that retrying cannot fix) and False to keep it spooled.
+    """
+    failures = 0
+    while True:
+        record = await asyncio.to_thread(spool.peek)
+        if record is None:
+            await asyncio.sleep(idle_interval)
+            continue
+
+        payload, _, position = record
+        try:
+            ok = await post(payload)
+        except Exception:
+            ok = False
+
+        if ok:
+            failures = 0
+            await asyncio.to_thread(spool.commit, position)
+            await asyncio.sleep(1.0 / rate if rate > 0 else 0)
+        else:
+            failures += 1
+            await asyncio.sleep(random.uniform(0, min(max_backoff, idle_interval * (2 ** failures))))
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Tests for the local alert engine and webhook dispatcher
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from alerts import AlertDispatcher, AlertEngine, AlertRule, load_alert_rules
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestAlertEngine(unittest.TestCase):
+    """Test thresholds, rate of change, grouping and cooldowns"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.fired = []
+
+    def engine(self, *specs, **kwargs):
+        return AlertEngine([AlertRule(spec) for spec in specs], self.fired.append, clock=self.clock, **kwargs)
+
+    def test_threshold_per_group_with_cooldown(self):
+        """Each integration has its own window; a fired group stays quiet for the cooldown"""
+        engine = self.engine({'name': 'errors', 'match': {'severity': ['ERROR']}, 'group_by': ['integration'],
+                              'window_seconds': 60, 'threshold': 3, 'cooldown_seconds': 120})
+        for _ in range(2):
+            engine.observe('AUDIOHOOK-0001', 'i-1', 't', 'ERROR', 'c-1')
+            engine.observe('AUDIOHOOK-0001', 'i-2', 't', 'ERROR', 'c-2')
+        engine.observe('AUDIOHOOK-0001', 'i-1', 't', 'INFO', 'c-1')  # Not matched
+        self.assertEqual(self.fired, [])
+
+        engine.observe('AUDIOHOOK-0001', 'i-1', 't', 'ERROR', 'c-1')
+        engine.observe('AUDIOHOOK-0001', 'i-1', 't', 'ERROR', 'c-1')
+        self.assertEqual([(a['alert'], a['kind'], a['group'], a['count']) for a in self.fired],
+                         [('errors', 'threshold', {'integration': 'i-1'}, 3)])
+        self.assertEqual(engine.stats['suppressed'], 1)
+
+        self.clock.now += 61  # Old events left the window
+        for _ in range(3):
+            engine.observe('AUDIOHOOK-0001', 'i-1', 't', 'ERROR', 'c-1')
+        self.assertEqual(len(self.fired), 1)  # Still cooling down
+        self.clock.now += 60
+        for _ in range(3):
+            engine.observe('AUDIOHOOK-0001', 'i-1', 't', 'ERROR', 'c-1')
+        self.assertEqual(len(self.fired), 2)
+        self.assertEqual(engine.stats['fired'], {'errors': 2})
+        self.assertGreater(engine.snapshot()['eval_ns_per_event'], 0)
+
+    def test_rate_change_against_previous_window(self):
+        """A spike fires once the count reaches rate_change x the previous window"""
+        engine = self.engine({'name': 'spike', 'group_by': ['event_id'], 'window_seconds': 10,
+                              'rate_change': 3, 'min_count': 4})
+        for _ in range(2):
+            engine.observe('AUDIOHOOK-0001', 'i-1', 't', None, None)
+        self.clock.now += 10
+        for _ in range(5):
+            engine.observe('AUDIOHOOK-0001', 'i-1', 't', None, None)
+        self.assertEqual(self.fired, [])
+        engine.observe('AUDIOHOOK-0001', 'i-1', 't', None, None)
+        self.assertEqual([(a['kind'], a['count'], a['previous_count']) for a in self.fired], [('rate_change', 6, 2)])
+
+    def test_group_limit_and_rule_file(self):
+        """Idle groups make room for new ones; invalid rule files are rejected"""
+        engine = self.engine({'name': 'per-conversation', 'group_by': ['conversation'], 'threshold': 100},
+                             max_groups=2)
+        engine.observe('A', 'i', 't', 'ERROR', 'c-1')
+        engine.observe('A', 'i', 't', 'ERROR', 'c-2')
+        engine.observe('A', 'i', 't', 'ERROR', 'c-3')
+        self.assertEqual(engine.stats['groups_dropped'], 1)
+        self.clock.now += 120
+        engine.observe('A', 'i', 't', 'ERROR', 'c-3')
+        self.assertEqual(engine.stats['groups'], 1)
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'alerts.json')
+            with open(path, 'w') as f:
+                json.dump({'webhooks': {'ops': 'http://127.0.0.1:1/hook'},
+                           'rules': [{'name': 'r', 'threshold': 1, 'webhook': 'ops'}]}, f)
+            rules, webhooks = load_alert_rules(path)
+            self.assertEqual((rules[0].name, webhooks['ops']['url']), ('r', 'http://127.0.0.1:1/hook'))
+            for bad in ({'name': 'r'}, {'name': 'r', 'threshold': 1, 'group_by': ['colour']}):
+                with open(path, 'w') as f:
+                    json.dump({'rules': [bad]}, f)
+                with self.assertRaises(ValueError):
+                    load_alert_rules(path)
+
+
+class TestAlertDispatcher(unittest.IsolatedAsyncioTestCase):
+    """Test webhook delivery against a local HTTP stub"""
+
+    async def asyncSetUp(self):
+        self.requests = []
+        self.statuses = []
+
+        async def hook(request):
+            self.requests.append(await request.json())
+            return web.Response(status=self.statuses.pop(0) if self.statuses else 200)
+
+        app = web.Application()
+        app.router.add_post('/hook', hook)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.webhooks = {'ops': {'url': str(self.server.make_url('/hook'))}}
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def test_grouped_delivery_with_retries(self):
+        """Queued alerts for a webhook share one request; 5xx responses are retried"""
+        self.statuses = [503]
+        dispatcher = AlertDispatcher(self.webhooks, retry_base=0.01)
+        for n in range(3):
+            dispatcher.submit({'alert': f'a-{n}', 'webhook': 'ops'})
+        dispatcher.submit({'alert': 'lost', 'webhook': 'missing'})
+        dispatcher.start()
+        await dispatcher.close()
+
+        self.assertEqual(len(self.requests), 2)  # The 503 and its retry
+        self.assertEqual([a['alert'] for a in self.requests[1]['alerts']], ['a-0', 'a-1', 'a-2'])
+        self.assertEqual((dispatcher.stats['sent'], dispatcher.stats['retries'], dispatcher.stats['failed']), (3, 1, 1))
+
+    async def test_bounded_queue_and_permanent_failures(self):
+        """A full queue drops alerts; 4xx responses are not retried"""
+        self.statuses = [400]
+        dispatcher = AlertDispatcher(self.webhooks, queue_size=2, concurrency=1, retry_base=0.01)
+        for n in range(3):
+            dispatcher.submit({'alert': f'a-{n}', 'webhook': 'ops'})
+        dispatcher.start()
+        await dispatcher.close()
+
+        self.assertEqual(dispatcher.stats['dropped'], 1)
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(dispatcher.stats['failed'], 2)
+        self.assertEqual(dispatcher.stats['last_error'], 'ops: HTTP 400')
+
+    async def test_unexpected_errors_keep_the_worker_running(self):
+        """A malformed webhook or an unencodable alert fails its group and is reported; delivery goes on"""
+        errors = []
+        self.webhooks['broken'] = {'url': self.webhooks['ops']['url'], 'headers': 'X-Token: abc'}
+        dispatcher = AlertDispatcher(self.webhooks, concurrency=1, on_error=lambda name, e: errors.append(name))
+        dispatcher.start()
+        dispatcher.submit({'alert': 'a-0', 'webhook': 'broken'})
+        await dispatcher.queue.join()
+        dispatcher.submit({'alert': {1, 2}, 'webhook': 'ops'})  # Not JSON-encodable
+        await dispatcher.queue.join()
+        dispatcher.submit({'alert': 'a-2', 'webhook': 'ops'})
+        await dispatcher.close()
+
+        self.assertEqual(errors, ['broken', 'ops'])
+        self.assertEqual((dispatcher.stats['failed'], dispatcher.stats['sent']), (2, 1))
+        self.assertEqual([a['alert'] for r in self.requests for a in r['alerts']], ['a-2'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the notification channel pool
+"""
+import os
+import sys
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from channels import ChannelPool, ChannelState, OverlapFilter, partition_topics
+
+
+class TestChannelPool(unittest.TestCase):
+    """Test topic partitioning, failover and rebalancing"""
+
+    TOPICS = [f'topic.{i}' for i in range(7)]
+
+    def test_partition_respects_count_and_limit(self):
+        """Topics are dealt evenly and extra channels are added to honor max_topics"""
+        self.assertEqual(partition_topics(['a', 'b', 'c'], 2), [['a', 'c'], ['b']])
+
+        pool = ChannelPool(self.TOPICS, count=2)
+        self.assertEqual([len(c.topics) for c in pool.channels], [4, 3])
+
+        pool = ChannelPool(self.TOPICS, count=1, max_topics=3)
+        self.assertEqual(len(pool.channels), 3)
+        self.assertTrue(all(len(c.topics) <= 3 for c in pool.channels))
+
+        self.assertEqual(len(ChannelPool(['only'], count=4).channels), 1)
+
+    def test_failover_then_rebalance(self):
+        """A dead channel's topics move to live ones and come back when it reconnects"""
+        pool = ChannelPool(self.TOPICS, count=3)
+        for channel in pool.channels:
+            channel.mark_connected()
+        dead = pool.channels[1]
+
+        dead.mark_disconnected()
+        changed = pool.plan_failover(dead)
+        self.assertEqual(dead.topics, [])
+        self.assertEqual({c.index for c in changed}, {0, 2})
+        carried = [t for c in pool.channels for t in c.topics]
+        self.assertEqual(sorted(carried), sorted(self.TOPICS))
+        self.assertEqual(dead.stats['disconnects'], 1)
+
+        dead.mark_connected()
+        changed = pool.plan_rebalance()
+        self.assertIn(dead, changed)
+        self.assertEqual(sorted(dead.topics + pool.channels[0].topics + pool.channels[2].topics),
+                         sorted(self.TOPICS))
+        self.assertTrue(all(len(c.topics) in (2, 3) for c in pool.channels))
+        self.assertEqual(pool.snapshot()['rebalances'], 2)
+
+    def test_failover_without_live_channels_keeps_topics(self):
+        """With nowhere to move them, a channel keeps its topics for its own reconnect"""
+        pool = ChannelPool(self.TOPICS, count=2)
+        channel = pool.channels[0]
+        topics = list(channel.topics)
+        self.assertEqual(pool.plan_failover(channel), [])
+        self.assertEqual(channel.topics, topics)
+
+    def test_failover_honors_max_topics(self):
+        """Topics that do not fit anywhere stay with the failed channel"""
+        pool = ChannelPool(self.TOPICS[:4], count=2, max_topics=3)
+        for channel in pool.channels:
+            channel.mark_connected()
+        pool.channels[0].mark_disconnected()
+        pool.plan_failover(pool.channels[0])
+        self.assertEqual(len(pool.channels[1].topics), 3)
+        self.assertEqual(len(pool.channels[0].topics), 1)
+
+
+class TestChannelRotation(unittest.TestCase):
+    """Test overlap duplicate suppression and gap accounting"""
+
+    def test_overlap_filter_drops_second_copy_only(self):
+        """Each frame is reported as a duplicate once, on its second sighting"""
+        overlap = OverlapFilter()
+        self.assertFalse(overlap.is_duplicate('{"seq": 1}'))
+        self.assertFalse(overlap.is_duplicate('{"seq": 2}'))
+        self.assertTrue(overlap.is_duplicate('{"seq": 1}'))
+        self.assertFalse(overlap.is_duplicate('{"seq": 1}'))
+
+        expired = OverlapFilter(window=0)
+        expired.is_duplicate('{"seq": 1}')
+        self.assertFalse(expired.is_duplicate('{"seq": 1}'))
+
+    def test_record_gap(self):
+        """Gaps accumulate into total, last and max"""
+        channel = ChannelState(0)
+        channel.record_gap(0.5)
+        channel.record_gap(0.25)
+        snapshot = channel.snapshot()
+        self.assertEqual(snapshot['gaps'], 2)
+        self.assertEqual(snapshot['gap_seconds_total'], 0.75)
+        self.assertEqual(snapshot['last_gap_seconds'], 0.25)
+        self.assertEqual(snapshot['max_gap_seconds'], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -2,10 +2,12 @@
 """
 Simple test for the AudioHook collector functionality
 """
+import asyncio
 import json
 import os
 import sys
 import tempfile
+import time
 import unittest
 from pathlib import Path
 
@@ -142,15 +144,16 @@ class TestAudioHookCollector(unittest.TestCase):
             rotate_file(test_file)
             
             # Check if rotation happened 
-            backup_file = test_file.with_suffix(f'{test_file.suffix}.1')
+            segments = audiohook_collector.list_segments(test_file)
             
-            # Either original file should not exist OR backup should exist
-            rotation_occurred = backup_file.exists() or not test_file.exists()
+            # Original file should be gone and a timestamped segment should exist
+            rotation_occurred = len(segments) == 1 and not test_file.exists()
             self.assertTrue(rotation_occurred, "File rotation should have occurred")
+            self.assertEqual(segments[0].read_text(), large_content)
             
             # Cleanup
-            if backup_file.exists():
-                backup_file.unlink()
+            for segment in segments:
+                segment.unlink()
                 
         finally:
             audiohook_collector.MAX_FILE_SIZE = original_max
@@ -158,6 +161,905 @@ class TestAudioHookCollector(unittest.TestCase):
                 test_file.unlink()
 
 
+class TestRawPassthrough(unittest.IsolatedAsyncioTestCase):
+    """Test RAW_PASSTHROUGH body location and raw_event splicing"""
+
+    FRAME = (
+        '{"topicName": "platform.integration.audiohook", "version": "2", '
+        '"eventBody": {"eventEntity": {"id": "AUDIOHOOK-0001", "name": "AudioHook integration error", '
+        '"description": "Brace } and quote \\" inside"}, "conversationId": "c-1", '
+        '"entityType": "integration", "details": {"nested": [{"entityId": "not-top-level"}], "x": "{["}, '
+        '"entityId": "e-1", "entityName": "Name", "version": "1.0"}, '
+        '"metadata": {"CorrelationId": "abc"}}'
+    )
+
+    def test_locate_event_body_is_verbatim(self):
+        """The located body text is the exact eventBody span of the frame"""
+        from audiohook_collector import locate_event_body
+
+        message = json.loads(self.FRAME)
+        body_text = locate_event_body(self.FRAME, message)
+        self.assertEqual(json.loads(body_text), message['eventBody'])
+        self.assertIn(body_text, self.FRAME)
+
+        last = '{"topicName": "t", "eventBody": {"a": {"b": "}"}} }'
+        self.assertEqual(locate_event_body(last, json.loads(last)), '{"a": {"b": "}"}}')
+
+        tricky = '{"topicName": "t", "eventBody": {"x": {"metadata": {"y": 1}}}, "metadata": {"metadata": 2}}'
+        self.assertEqual(locate_event_body(tricky, json.loads(tricky)), '{"x": {"metadata": {"y": 1}}}')
+
+        heartbeat = '{"topicName": "channel.metadata", "eventBody": "heartbeat"}'
+        self.assertIsNone(locate_event_body(heartbeat, json.loads(heartbeat)))
+
+        pretty = json.dumps(json.loads(self.FRAME), indent=2)
+        self.assertIsNone(locate_event_body(pretty, json.loads(pretty)))
+        self.assertIsNotNone(locate_event_body(self.FRAME + '\n', message))
+
+    async def test_pretty_printed_frame_stays_on_one_line(self):
+        """A multi-line frame is re-encoded, so the event is still one JSONL line"""
+        collector = AudioHookCollector()
+        collector.channel_id = 'test-channel'
+        pretty = json.dumps(json.loads(self.FRAME), indent=2)
+        self.assertIn('\n', pretty)
+
+        await collector.handle_raw_frame(pretty)
+        line = collector.file_queue.queue.get_nowait().data
+        self.assertNotIn(b'\n', line)
+        self.assertNotIn(b'\r', line)
+        self.assertEqual(json.loads(line)['raw_event'], json.loads(self.FRAME)['eventBody'])
+
+    async def test_passthrough_matches_decoded_output(self):
+        """The spliced line decodes to the same event as the regular path"""
+        collector = AudioHookCollector()
+        collector.channel_id = 'test-channel'
+        collector.dedup.window = 0  # The same frame goes through both paths
+
+        await collector.handle_raw_frame(self.FRAME)
+        await collector.handle_websocket_message(json.loads(self.FRAME))
+        raw_line = collector.file_queue.queue.get_nowait().data
+        decoded_line = collector.file_queue.queue.get_nowait().data
+
+        raw_event, decoded_event = json.loads(raw_line), json.loads(decoded_line)
+        raw_event.pop('timestamp'), decoded_event.pop('timestamp')
+        self.assertEqual(raw_event, decoded_event)
+        self.assertEqual(list(raw_event)[-1], 'raw_event')
+        self.assertEqual(collector.stats['audiohook_events'], 2)
+
+        await collector.handle_raw_frame('{"topicName": "channel.metadata", "eventBody": {"message": "WebSocket Heartbeat"}}')
+        await collector.handle_raw_frame('not json')
+        self.assertEqual(collector.stats['events_total'], 3)
+
+
+class TestJsonlWriter(unittest.TestCase):
+    """Test the persistent group-committed JSONL writer"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_path = Path(self.temp_dir.name) / 'events.jsonl'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_interval_policy_batches_lines(self):
+        """Lines stay pending until the interval elapses or commit is called"""
+        import audiohook_collector
+        from audiohook_collector import JsonlWriter
+
+        original = (audiohook_collector.FLUSH_POLICY, audiohook_collector.FLUSH_INTERVAL_MS)
+        audiohook_collector.FLUSH_POLICY = 'interval'
+        audiohook_collector.FLUSH_INTERVAL_MS = 60000
+        try:
+            writer = JsonlWriter(self.output_path)
+            writer.write(json.dumps({'n': 1}).encode())
+            writer.write(json.dumps({'n': 2}).encode())
+            self.assertEqual(writer.stats['pending'], 2)
+            self.assertEqual(writer.stats['commits'], 0)
+
+            writer.commit()
+            self.assertEqual(writer.stats['commits'], 1)
+            self.assertEqual(writer.stats['lines_written'], 2)
+            lines = self.output_path.read_text(encoding='utf-8').splitlines()
+            self.assertEqual([json.loads(line)['n'] for line in lines], [1, 2])
+            writer.close()
+        finally:
+            audiohook_collector.FLUSH_POLICY, audiohook_collector.FLUSH_INTERVAL_MS = original
+
+    def test_event_policy_and_rotation(self):
+        """Per-event policy commits immediately and rotates on tracked size"""
+        import audiohook_collector
+        from audiohook_collector import JsonlWriter
+
+        original = (audiohook_collector.FLUSH_POLICY, audiohook_collector.MAX_FILE_SIZE)
+        audiohook_collector.FLUSH_POLICY = 'event'
+        audiohook_collector.MAX_FILE_SIZE = 100
+        try:
+            writer = JsonlWriter(self.output_path)
+            for i in range(5):
+                writer.write(json.dumps({'n': i, 'pad': 'x' * 40}).encode())
+            writer.close()
+
+            self.assertEqual(writer.stats['commits'], 5)
+            self.assertGreaterEqual(writer.stats['rotations'], 1)
+            self.assertEqual(writer.stats['write_errors'], 0)
+        finally:
+            audiohook_collector.FLUSH_POLICY, audiohook_collector.MAX_FILE_SIZE = original
+
+    def test_time_based_rotation_hands_segment_to_manager(self):
+        """Segments rotate on ROTATE_INTERVAL_SECONDS and are compressed in the background"""
+        import gzip
+        import audiohook_collector
+        from audiohook_collector import JsonlWriter, SegmentManager, list_segments
+
+        original = (audiohook_collector.FLUSH_POLICY, audiohook_collector.ROTATE_INTERVAL_SECONDS,
+                    audiohook_collector.COMPRESSION)
+        audiohook_collector.FLUSH_POLICY = 'event'
+        audiohook_collector.ROTATE_INTERVAL_SECONDS = 1
+        audiohook_collector.COMPRESSION = 'gzip'
+        try:
+            segments = SegmentManager(self.output_path)
+            writer = JsonlWriter(self.output_path, segments)
+            writer.write(b'{"n":1}')
+            writer._opened_at -= 2  # Pretend the segment has been open for 2s
+            writer.maybe_commit()
+            writer.write(b'{"n":2}')
+            writer.close()
+            segments.close()
+
+            closed = list_segments(self.output_path)
+            self.assertEqual([p.suffix for p in closed], ['.gz'])
+            with gzip.open(closed[0], 'rb') as f:
+                self.assertEqual(f.read(), b'{"n":1}\n')
+            self.assertEqual(self.output_path.read_bytes(), b'{"n":2}\n')
+            self.assertEqual(writer.stats['rotations'], 1)
+            self.assertEqual(segments.stats['compressed'], 1)
+            self.assertIsNotNone(segments.stats['last_compress_ms'])
+        finally:
+            (audiohook_collector.FLUSH_POLICY, audiohook_collector.ROTATE_INTERVAL_SECONDS,
+             audiohook_collector.COMPRESSION) = original
+
+    def test_rotated_segments_are_indexed_by_time(self):
+        """Closed segments get a block index that survives compression and serves range reads"""
+        import audiohook_collector
+        import segment_index
+        from audiohook_collector import JsonlWriter, SegmentManager, list_segments
+
+        original = (audiohook_collector.FLUSH_POLICY, audiohook_collector.COMPRESSION,
+                    audiohook_collector.SEGMENT_INDEX_LINES)
+        audiohook_collector.FLUSH_POLICY = 'event'
+        audiohook_collector.COMPRESSION = 'gzip'
+        audiohook_collector.SEGMENT_INDEX_LINES = 2
+        try:
+            self.output_path.write_bytes(b'{"timestamp":"2024-01-15T10:30:00Z","n":0}\n')  # Left by a previous run
+            segments = SegmentManager(self.output_path)
+            writer = JsonlWriter(self.output_path, segments)
+            for n in range(1, 6):
+                stamp = f'2024-01-15T10:30:{n:02d}Z'
+                writer.write(json.dumps({'timestamp': stamp, 'n': n}).encode(), timestamp=stamp)
+            writer.rotate()
+            writer.write(b'{"timestamp":"2024-01-15T10:30:06Z","n":6}', timestamp='2024-01-15T10:30:06Z')
+            writer.close()
+            segments.close()
+
+            closed = list_segments(self.output_path)
+            self.assertEqual([p.suffix for p in closed], ['.gz'])
+            index = segment_index.load_index(closed[0])
+            self.assertEqual(index['lines'], 6)
+            self.assertEqual(len(index['members']), 3)
+            start, end = (segment_index.to_epoch(f'2024-01-15T10:30:0{s}Z') for s in (3, 7))
+            lines = segment_index.read_range(self.output_path, start, end)
+            self.assertEqual([json.loads(line)['n'] for line in lines], [3, 4, 5, 6])
+        finally:
+            (audiohook_collector.FLUSH_POLICY, audiohook_collector.COMPRESSION,
+             audiohook_collector.SEGMENT_INDEX_LINES) = original
+
+    def test_retention_by_bytes_and_age(self):
+        """Oldest segments are removed beyond the byte budget or maximum age"""
+        import audiohook_collector
+        from audiohook_collector import SegmentManager, list_segments
+
+        original = (audiohook_collector.RETENTION_MAX_BYTES, audiohook_collector.RETENTION_MAX_AGE_HOURS)
+        audiohook_collector.RETENTION_MAX_BYTES = 250
+        audiohook_collector.RETENTION_MAX_AGE_HOURS = 1
+        try:
+            now = time.time()
+            for i, age in enumerate([7200, 300, 200, 100]):
+                segment = self.output_path.with_name(f'events-2024011510000{i}Z.jsonl.gz')
+                segment.write_bytes(b'x' * 100)
+                os.utime(segment, (now - age, now - age))
+
+            segments = SegmentManager(self.output_path)
+            segments._apply_retention()
+            remaining = [p.name for p in list_segments(self.output_path)]
+            self.assertEqual(remaining, ['events-20240115100002Z.jsonl.gz', 'events-20240115100003Z.jsonl.gz'])
+            self.assertEqual(segments.stats['deleted'], 2)
+            self.assertEqual(segments.stats['segment_bytes'], 200)
+        finally:
+            audiohook_collector.RETENTION_MAX_BYTES, audiohook_collector.RETENTION_MAX_AGE_HOURS = original
+
+
+class TestPipeline(unittest.IsolatedAsyncioTestCase):
+    """Test the staged ingest -> processor -> sink pipeline"""
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_path = Path(self.temp_dir.name) / 'events.jsonl'
+
+    async def asyncTearDown(self):
+        self.temp_dir.cleanup()
+
+    async def test_events_flow_to_file_sink(self):
+        """Enqueued messages are formatted and written by the file sink"""
+        collector = AudioHookCollector()
+        collector.output_file = self.output_path
+        from audiohook_collector import JsonlWriter
+        collector.writer = JsonlWriter(self.output_path)
+        collector.metrics = collector._build_metrics()
+
+        collector.start_pipeline()
+        for i in range(3):
+            await collector.ingest_queue.put((time.monotonic(), None, {
+                'topicName': 'platform.integration.audiohook',
+                'eventBody': {'eventEntity': {'id': f'AUDIOHOOK-000{i + 1}'}}
+            }))
+        await collector.ingest_queue.put(
+            (time.monotonic(), None, {'topicName': 'channel.metadata', 'eventBody': {'message': 'WebSocket Heartbeat'}}))
+        await collector.stop_pipeline()
+        collector.writer.close()
+
+        lines = self.output_path.read_text(encoding='utf-8').splitlines()
+        self.assertEqual([json.loads(line)['event_id'] for line in lines],
+                         ['AUDIOHOOK-0001', 'AUDIOHOOK-0002', 'AUDIOHOOK-0003'])
+        self.assertEqual(collector.stats['events_total'], 4)
+        self.assertEqual(collector.ingest_queue.snapshot()['enqueued'], 5)
+        self.assertGreaterEqual(collector.file_queue.snapshot()['high_water'], 1)
+
+        exposition = collector.metrics.render()
+        self.assertIn('audiohook_events_total{topic="platform.integration.audiohook",event_id="AUDIOHOOK-0001"} 1',
+                      exposition)
+        self.assertIn('audiohook_messages_received_total 4', exposition)
+        self.assertIn('audiohook_receive_to_write_seconds_count 3', exposition)
+        self.assertIn('audiohook_queue_depth{queue="ingest"} 0', exposition)
+
+    async def test_duplicates_are_suppressed_with_stable_ids(self):
+        """A re-delivered event is dropped and the first copy carries its identity key as doc_id"""
+        from dedup import event_key
+
+        collector = AudioHookCollector()
+        body = {'eventEntity': {'id': 'AUDIOHOOK-0001'}, 'conversationId': 'c-1', 'entityId': 'e-1',
+                'eventTime': '2024-01-15T10:30:45.123Z'}
+        message = {'topicName': 'platform.integration.audiohook', 'eventBody': body}
+        for _ in range(3):
+            await collector.handle_websocket_message(message)
+
+        self.assertEqual(collector.file_queue.queue.qsize(), 1)
+        self.assertEqual(collector.file_queue.queue.get_nowait().doc_id, event_key(body))
+        self.assertEqual(collector.stats['audiohook_events'], 1)
+        self.assertEqual(collector.dedup.snapshot()['hits'], 2)
+        self.assertIn('audiohook_dedup_hits_total 2', collector.metrics.render())
+
+    async def test_events_without_timestamp_are_not_deduplicated(self):
+        """Timestamp-less events with the same code are distinct occurrences and all reach the file queue"""
+        collector = AudioHookCollector()
+        body = {'eventEntity': {'id': 'AUDIOHOOK-0001'}, 'conversationId': 'c-1', 'entityId': 'e-1'}
+        for _ in range(2):
+            await collector.handle_websocket_message({'topicName': 'platform.integration.audiohook',
+                                                      'eventBody': body})
+
+        self.assertEqual(collector.file_queue.queue.qsize(), 2)
+        self.assertIsNone(collector.file_queue.queue.get_nowait().doc_id)
+        self.assertEqual(collector.dedup.snapshot()['hits'], 0)
+        self.assertEqual(collector.dedup.snapshot()['unkeyed'], 2)
+
+    async def test_envelope_bytes_shared_by_sinks(self):
+        """An event is encoded once and the same bytes reach every sink"""
+        import audiohook_collector
+        from audiohook_collector import EventEnvelope, ElasticShipper
+
+        original = audiohook_collector.ELASTIC_URL
+        audiohook_collector.ELASTIC_URL = 'http://elastic.invalid:9200'
+        try:
+            collector = AudioHookCollector()
+            envelope = EventEnvelope({'timestamp': '2024-01-15T10:30:45+00:00', 'event_id': 'AUDIOHOOK-0001'},
+                                     doc_id='abc123')
+            await collector.write_event(envelope)
+
+            file_line = collector.file_queue.queue.get_nowait().data
+            bulk_doc = collector.elastic_queue.queue.get_nowait().data
+            self.assertIs(file_line, envelope.data)
+            self.assertIs(bulk_doc, envelope.data)
+            self.assertIs(collector.recent_events.events[-1][1], envelope.data)
+
+            payload = ElasticShipper.build_payload([ElasticShipper.bulk_item(bulk_doc, envelope.doc_id),
+                                                    ElasticShipper.bulk_item(bulk_doc)])
+            lines = payload.split(b'\n')
+            self.assertEqual(lines[1], envelope.data)
+            self.assertEqual(lines[3], envelope.data)
+            self.assertEqual(json.loads(lines[0]),
+                             {'index': {'_index': audiohook_collector.ELASTIC_INDEX, '_id': 'abc123'}})
+            self.assertEqual(json.loads(lines[2]), {'index': {'_index': audiohook_collector.ELASTIC_INDEX}})
+            self.assertEqual(lines[-1], b'')
+        finally:
+            audiohook_collector.ELASTIC_URL = original
+
+    async def test_process_workers_keep_per_conversation_order(self):
+        """With PROCESS_WORKERS, frames are handled in worker processes without reordering a conversation"""
+        import audiohook_collector
+        from audiohook_collector import JsonlWriter, RULES
+
+        hits_before = sum(n for (name, _), n in RULES.hits().items() if name == 'audiohook_event')
+
+        original = audiohook_collector.PROCESS_WORKERS
+        audiohook_collector.PROCESS_WORKERS = 2
+        try:
+            collector = AudioHookCollector()
+            collector.writer = JsonlWriter(self.output_path)
+            collector.start_pipeline()
+            frames = [json.dumps({'topicName': 'platform.integration.audiohook', 'eventBody': {
+                'eventEntity': {'id': 'AUDIOHOOK-0001'}, 'conversationId': f'c-{i % 5}',
+                'eventTime': f'2024-01-15T10:30:{i:02d}.000Z', 'sequence': i}}) for i in range(40)]
+            frames += [frames[0], 'not json', '{"topicName": "channel.metadata", "eventBody": {"message": "hb"}}']
+            for frame in frames:
+                await collector.ingest_queue.put((time.monotonic(), 'ch-1', frame))
+            await collector.stop_pipeline()
+            collector.writer.close()
+        finally:
+            audiohook_collector.PROCESS_WORKERS = original
+
+        events = [json.loads(line) for line in self.output_path.read_text(encoding='utf-8').splitlines()]
+        self.assertEqual(len(events), 40)
+        for conversation in range(5):
+            sequence = [e['raw_event']['sequence'] for e in events if e['conversation_id'] == f'c-{conversation}']
+            self.assertEqual(sequence, list(range(conversation, 40, 5)))
+        self.assertEqual(events[0]['channel'], 'ch-1')
+        self.assertEqual(collector.stats['events_total'], 42)
+        self.assertEqual(collector.stats['audiohook_events'], 40)
+        self.assertEqual(collector.dedup.stats['hits'], 1)
+        workers = collector.process_pool.snapshot()
+        self.assertEqual(workers['items'], 43)
+        # Rule hits counted in the workers reach the parent's counters
+        hits_after = sum(n for (name, _), n in RULES.hits().items() if name == 'audiohook_event')
+        self.assertEqual(hits_after - hits_before, 41)
+        self.assertTrue(all(workers['partition_items']))
+
+    async def test_parquet_sink_partitions_by_hour_and_code(self):
+        """With PARQUET_DIR, events are also exported as Parquet, in and out of worker processes"""
+        import audiohook_collector
+        import columnar
+        from audiohook_collector import JsonlWriter
+
+        if not columnar.available():
+            self.skipTest('pyarrow not installed')
+        import pyarrow.dataset as ds
+
+        parquet_dir = Path(self.temp_dir.name) / 'parquet'
+        originals = audiohook_collector.PARQUET_DIR, audiohook_collector.PROCESS_WORKERS
+        audiohook_collector.PARQUET_DIR = str(parquet_dir)
+        try:
+            for workers in (0, 1):
+                audiohook_collector.PROCESS_WORKERS = workers
+                collector = AudioHookCollector()
+                collector.writer = JsonlWriter(self.output_path)
+                collector.start_pipeline()
+                for i in range(4):
+                    await collector.ingest_queue.put((time.monotonic(), 'ch-1', json.dumps({
+                        'topicName': 'platform.integration.audiohook',
+                        'eventBody': {'eventEntity': {'id': f'AUDIOHOOK-000{i % 2 + 1}', 'name': 'AudioHook error'},
+                                      'conversationId': f'c-{workers}-{i}', 'severity': 'ERROR'}})))
+                await collector.stop_pipeline()
+                collector.writer.close()
+                self.assertEqual(collector.parquet.snapshot()['rows'], 4)
+        finally:
+            audiohook_collector.PARQUET_DIR, audiohook_collector.PROCESS_WORKERS = originals
+
+        table = ds.dataset(str(parquet_dir), format='parquet', partitioning='hive').to_table()
+        self.assertEqual(table.num_rows, 8)
+        self.assertEqual(set(table.column('event_code').to_pylist()), {'AUDIOHOOK-0001', 'AUDIOHOOK-0002'})
+        self.assertEqual(set(table.column('severity').to_pylist()), {'ERROR'})
+        self.assertEqual(set(table.column('topic').to_pylist()), {'platform.integration.audiohook'})
+        self.assertNotIn('raw_event', table.schema.names)
+        hours = {path.parent.parent.name for path in parquet_dir.rglob('*.parquet')}
+        self.assertEqual(len(hours), 1)
+        self.assertTrue(next(iter(hours)).startswith('hour='))
+
+    async def test_event_store_answers_filtered_event_queries(self):
+        """With EVENT_STORE_PATH, /events filters and pages through the SQLite store"""
+        import aiohttp
+        from aiohttp.test_utils import TestServer
+        import audiohook_collector
+        from audiohook_collector import JsonlWriter
+
+        original = audiohook_collector.EVENT_STORE_PATH
+        audiohook_collector.EVENT_STORE_PATH = os.path.join(self.temp_dir.name, 'events.db')
+        try:
+            collector = AudioHookCollector()
+        finally:
+            audiohook_collector.EVENT_STORE_PATH = original
+        collector.writer = JsonlWriter(self.output_path)
+        collector.start_pipeline()
+        for i in range(5):
+            await collector.ingest_queue.put((time.monotonic(), None, {
+                'topicName': 'platform.integration.audiohook',
+                'eventBody': {'eventEntity': {'id': f'AUDIOHOOK-000{i % 2 + 1}'}, 'conversationId': f'c-{i % 2}',
+                              'eventTime': f'2024-01-15T10:30:0{i}.000Z', 'sequence': i}}))
+        await collector.stop_pipeline()
+        collector.writer.close()
+
+        server = TestServer(collector.http_app())
+        await server.start_server()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async def get(query):
+                    async with session.get(server.make_url('/events'), params=query) as response:
+                        return response.status, await response.json()
+
+                status, page = await get({'conversation_id': 'c-0', 'code': 'AUDIOHOOK-0001', 'limit': '2'})
+                self.assertEqual(status, 200)
+                self.assertEqual([e['raw_event']['sequence'] for e in page['events']], [0, 2])
+                status, page = await get({'conversation_id': 'c-0', 'cursor': page['next_cursor']})
+                self.assertEqual([e['raw_event']['sequence'] for e in page['events']], [4])
+                self.assertIsNone(page['next_cursor'])
+                status, page = await get({'from': '2000-01-01T00:00:00Z', 'to': '2000-01-02T00:00:00Z'})
+                self.assertEqual(page['events'], [])
+                self.assertEqual((await get({'from': 'yesterday'}))[0], 400)
+                status, recent = await get({'limit': '3'})  # No filters: the in-memory ring buffer
+                self.assertEqual(len(recent['recent_events']), 3)
+        finally:
+            await server.close()
+            collector.store.close()
+        self.assertEqual(collector.store.stats['rows_written'], 5)
+
+    async def test_stats_endpoint_reports_sliding_windows(self):
+        """/stats serves windowed counts per code, integration and topic plus top conversations"""
+        import aiohttp
+        from aiohttp.test_utils import TestServer
+        from audiohook_collector import JsonlWriter
+
+        collector = AudioHookCollector()
+        collector.writer = JsonlWriter(self.output_path)
+        collector.start_pipeline()
+        for i in range(5):
+            await collector.ingest_queue.put((time.monotonic(), None, {
+                'topicName': 'platform.integration.audiohook',
+                'eventBody': {'eventEntity': {'id': f'AUDIOHOOK-000{i % 2 + 1}'}, 'conversationId': f'c-{i % 3}',
+                              'entityId': 'i-1', 'severity': 'ERROR', 'sequence': i}}))
+        await collector.stop_pipeline()
+        collector.writer.close()
+
+        server = TestServer(collector.http_app())
+        await server.start_server()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(server.make_url('/stats')) as response:
+                    self.assertEqual(response.status, 200)
+                    stats = await response.json()
+        finally:
+            await server.close()
+        self.assertEqual(set(stats['windows']), {'1m', '5m', '1h'})
+        one_minute = stats['windows']['1m']
+        self.assertEqual(one_minute['events'], 5)
+        self.assertEqual(one_minute['event_code'], {'AUDIOHOOK-0001': 3, 'AUDIOHOOK-0002': 2})
+        self.assertEqual(one_minute['severity'], {'ERROR': 5})
+        self.assertEqual(one_minute['integration'], {'i-1': 5})
+        self.assertEqual(one_minute['topic'], {'platform.integration.audiohook': 5})
+        self.assertEqual([t['key'] for t in stats['top']['conversation']][:2], ['c-0', 'c-1'])
+        self.assertEqual(stats['counters']['audiohook_events'], 5)
+
+    async def test_alert_rules_post_to_webhook(self):
+        """A threshold rule fires on the live stream and is delivered to the webhook; severities are upper-cased"""
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        import audiohook_collector
+        from audiohook_collector import JsonlWriter
+
+        received = []
+
+        async def hook(request):
+            received.append(await request.json())
+            return web.Response()
+
+        app = web.Application()
+        app.router.add_post('/hook', hook)
+        server = TestServer(app)
+        await server.start_server()
+        rules_file = os.path.join(self.temp_dir.name, 'alerts.json')
+        with open(rules_file, 'w') as f:
+            json.dump({'webhooks': {'default': str(server.make_url('/hook'))},
+                       'rules': [{'name': 'integration-errors',
+                                  'match': {'event_id': ['AUDIOHOOK-0001'], 'severity': ['ERROR']},
+                                  'group_by': ['integration'], 'threshold': 3}]}, f)
+        original = audiohook_collector.ALERT_RULES_FILE
+        audiohook_collector.ALERT_RULES_FILE = rules_file
+        try:
+            collector = AudioHookCollector()
+        finally:
+            audiohook_collector.ALERT_RULES_FILE = original
+        collector.writer = JsonlWriter(self.output_path)
+        collector.metrics = collector._build_metrics()
+        try:
+            collector.start_pipeline()
+            for i in range(4):
+                await collector.ingest_queue.put((time.monotonic(), None, {
+                    'topicName': 'platform.integration.audiohook',
+                    'eventBody': {'eventEntity': {'id': 'AUDIOHOOK-0001'}, 'entityId': 'i-1',
+                                  ('severity' if i % 2 else 'logLevel'): 'error',
+                                  'eventTime': f'2024-01-15T10:30:0{i}.000Z', 'sequence': i}}))
+            await collector.stop_pipeline()
+            collector.writer.close()
+        finally:
+            await server.close()
+
+        self.assertEqual([[(a['alert'], a['group'], a['count']) for a in r['alerts']] for r in received],
+                         [[('integration-errors', {'integration': 'i-1'}, 3)]])
+        self.assertEqual(collector.alerts.stats['events'], 4)
+        self.assertEqual(collector.windows.window('1m')['severity'], {'ERROR': 4})
+        exposition = collector.metrics.render()
+        self.assertIn('audiohook_alerts_fired_total{rule="integration-errors"} 1', exposition)
+        self.assertIn('audiohook_alert_deliveries_total{outcome="sent"} 1', exposition)
+        self.assertIn('audiohook_alert_evaluation_seconds_total', exposition)
+
+    async def test_drop_policy_counts_overflow(self):
+        """A full queue drops items under the 'drop' policy"""
+        import audiohook_collector
+        from audiohook_collector import PipelineQueue
+
+        original = audiohook_collector.QUEUE_FULL_POLICY
+        audiohook_collector.QUEUE_FULL_POLICY = 'drop'
+        try:
+            queue = PipelineQueue('test', 2)
+            results = [await queue.put(i) for i in range(4)]
+            self.assertEqual(results, [True, True, False, False])
+            self.assertEqual(queue.snapshot()['dropped'], 2)
+            self.assertEqual(queue.snapshot()['high_water'], 2)
+        finally:
+            audiohook_collector.QUEUE_FULL_POLICY = original
+
+
+class TestRecentEvents(unittest.TestCase):
+    """Test the /events ring buffer and reverse tail reader"""
+
+    def test_render_limit_since_and_etag(self):
+        """Rendering honours limit/since and caches until new events arrive"""
+        from audiohook_collector import RecentEvents, parse_timestamp
+
+        recent = RecentEvents(3)
+        for i in range(5):
+            recent.add(f'2024-01-15T10:00:0{i}+00:00', json.dumps({'n': i}).encode())
+
+        etag, body = recent.render(10)
+        self.assertEqual([e['n'] for e in json.loads(body)['recent_events']], [2, 3, 4])
+        self.assertEqual(recent.render(10), (etag, body))
+
+        _, body = recent.render(1)
+        self.assertEqual([e['n'] for e in json.loads(body)['recent_events']], [4])
+
+        _, body = recent.render(10, parse_timestamp('2024-01-15T10:00:03Z'))
+        self.assertEqual([e['n'] for e in json.loads(body)['recent_events']], [4])
+
+        recent.add('2024-01-15T10:00:09+00:00', b'{"n": 9}')
+        self.assertNotEqual(recent.render(10)[0], etag)
+
+    def test_tail_lines_reads_from_end(self):
+        """The tail reader returns the last lines across block boundaries"""
+        from audiohook_collector import tail_lines
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / 'events.jsonl'
+            path.write_text(''.join(json.dumps({'n': i}) + '\n' for i in range(100)))
+
+            lines = tail_lines(path, 5, block_size=16)
+            self.assertEqual([json.loads(line)['n'] for line in lines], [95, 96, 97, 98, 99])
+            self.assertEqual(len(tail_lines(path, 500)), 100)
+            self.assertEqual(tail_lines(Path(temp_dir) / 'missing.jsonl', 5), [])
+
+
+class TestElasticShipper(unittest.IsolatedAsyncioTestCase):
+    """Test the bulk shipper against a local _bulk stub"""
+
+    async def asyncSetUp(self):
+        from aiohttp import web
+        from aiohttp.test_utils import TestServer
+        import audiohook_collector
+
+        self.requests = []
+        self.responses = []
+        self.down = False  # Outage: every request fails with 503
+
+        async def bulk(request):
+            body = await request.read()
+            self.requests.append(body)
+            if self.down:
+                return web.json_response({}, status=503)
+            status, payload = self.responses.pop(0) if self.responses else (200, {'errors': False, 'items': []})
+            return web.json_response(payload, status=status)
+
+        app = web.Application()
+        app.router.add_post('/_bulk', bulk)
+        self.server = TestServer(app)
+        await self.server.start_server()
+
+        self.original = {name: getattr(audiohook_collector, name) for name in
+                         ('ELASTIC_URL', 'BULK_SIZE', 'BULK_MAX_SECONDS', 'RETRY_BASE_SLEEP')}
+        audiohook_collector.ELASTIC_URL = str(self.server.make_url('')).rstrip('/')
+        audiohook_collector.BULK_SIZE = 3
+        audiohook_collector.BULK_MAX_SECONDS = 0.05
+        audiohook_collector.RETRY_BASE_SLEEP = 0.001
+
+        import aiohttp
+        self.session = aiohttp.ClientSession()
+        self.shipper = audiohook_collector.ElasticShipper()
+        self.shipper.session = self.session
+
+    async def asyncTearDown(self):
+        import audiohook_collector
+        for name, value in self.original.items():
+            setattr(audiohook_collector, name, value)
+        await self.session.close()
+        await self.server.close()
+
+    async def test_flush_by_count_and_retry(self):
+        """A full batch is flushed and retried after a retryable failure"""
+        self.responses = [(503, {}), (200, {'errors': False, 'items': []})]
+        for i in range(3):
+            await self.shipper.add(json.dumps({'n': i}, separators=(',', ':')).encode())
+        await self.shipper.close()
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.requests[0].count(b'\n'), 6)
+        self.assertEqual(self.shipper.stats['docs_sent'], 3)
+        self.assertEqual(self.shipper.stats['retries'], 1)
+        self.assertEqual(self.shipper.stats['flushes']['docs'], 1)
+
+    async def test_only_rejected_items_are_retried(self):
+        """Items rejected with 429 are resent; others are counted as sent"""
+        self.responses = [(200, {'errors': True, 'items': [
+            {'index': {'status': 201}},
+            {'index': {'status': 429}},
+        ]})]
+        await self.shipper.add(b'{"n":0}')
+        await self.shipper.add(b'{"n":1}')
+        await self.shipper.close()
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertIn(b'"n":1', self.requests[1])
+        self.assertNotIn(b'"n":0', self.requests[1])
+        self.assertEqual(self.shipper.stats['docs_sent'], 2)
+
+    async def test_failed_batches_are_spooled_and_replayed(self):
+        """Batches that exhaust retries go to the spool and replay later"""
+        import audiohook_collector
+        from spool import BulkSpool
+
+        original_retries = audiohook_collector.BULK_MAX_RETRIES
+        audiohook_collector.BULK_MAX_RETRIES = 1
+        with tempfile.TemporaryDirectory() as spool_dir:
+            try:
+                self.shipper.spool = BulkSpool(spool_dir)
+                self.responses = [(503, {}), (503, {})]
+                for i in range(3):
+                    await self.shipper.add(json.dumps({'n': i}, separators=(',', ':')).encode())
+                await wait_inflight(self.shipper)
+
+                self.assertEqual(self.shipper.stats['docs_dropped'], 0)
+                self.assertEqual(self.shipper.spool.pending_batches, 1)
+
+                # While the cluster is failing, new batches are spooled without a request
+                await self.shipper.add(b'{"n":3}')
+                await self.shipper.flush('age')
+                await wait_inflight(self.shipper)
+                self.assertEqual(len(self.requests), 2)
+                self.assertEqual(self.shipper.spool.pending_batches, 2)
+
+                payload, _, position = self.shipper.spool.peek()
+                self.assertTrue(await self.shipper._replay_payload(payload))
+                self.shipper.spool.commit(position)
+                self.assertEqual(self.shipper.stats['docs_sent'], 3)
+                self.assertEqual(self.shipper.spool.pending_batches, 1)
+
+                # The cluster answered again: new batches skip the remaining backlog
+                await self.shipper.add(b'{"n":4}')
+                await self.shipper.flush('age')
+                await wait_inflight(self.shipper)
+                self.assertEqual(self.shipper.spool.pending_batches, 1)
+                self.assertEqual(self.shipper.stats['docs_sent'], 4)
+            finally:
+                audiohook_collector.BULK_MAX_RETRIES = original_retries
+                self.shipper.spool.close()
+
+    async def test_outage_recovery_under_sustained_load(self):
+        """After an outage, live batches bypass the spool while the backlog replays at its own rate"""
+        import asyncio
+        import audiohook_collector
+        from spool import BulkSpool, replay_spool
+
+        original_retries = audiohook_collector.BULK_MAX_RETRIES
+        audiohook_collector.BULK_MAX_RETRIES = 1
+        with tempfile.TemporaryDirectory() as spool_dir:
+            self.shipper.spool = BulkSpool(spool_dir)
+            replay = None
+            try:
+                self.down = True
+                for i in range(9):
+                    await self.shipper.add(b'{"n":%d}' % i)
+                await wait_inflight(self.shipper)
+                spooled = self.shipper.spool.stats['batches_spooled']
+                self.assertEqual((spooled, self.shipper.stats['cluster_ok']), (3, False))
+
+                self.down = False
+                replay = asyncio.create_task(replay_spool(self.shipper.spool, self.shipper._replay_payload,
+                                                          rate=5, idle_interval=0.01))
+                while not self.shipper.stats['cluster_ok']:
+                    await asyncio.sleep(0.01)
+                # Sustained load while two spooled batches still wait for the replay
+                for i in range(9, 129):
+                    await self.shipper.add(b'{"n":%d}' % i)
+                await wait_inflight(self.shipper)
+                self.assertEqual(self.shipper.spool.stats['batches_spooled'], spooled)
+                self.assertGreaterEqual(self.shipper.stats['docs_sent'], 120)
+
+                for _ in range(200):
+                    if not self.shipper.spool.pending_batches:
+                        break
+                    await asyncio.sleep(0.05)
+                self.assertEqual(self.shipper.spool.pending_batches, 0)
+                self.assertEqual(self.shipper.stats['docs_sent'], 129)
+                self.assertEqual(self.shipper.stats['docs_dropped'], 0)
+            finally:
+                if replay:
+                    replay.cancel()
+                    await asyncio.gather(replay, return_exceptions=True)
+                audiohook_collector.BULK_MAX_RETRIES = original_retries
+                self.shipper.spool.close()
+
+    async def test_age_trigger(self):
+        """A partial batch becomes due after BULK_MAX_SECONDS"""
+        import asyncio
+        await self.shipper.add(b'{"n":0}')
+        self.assertGreater(self.shipper.time_until_due(), 0)
+        await asyncio.sleep(0.06)
+        self.assertEqual(self.shipper.time_until_due(), 0)
+        await self.shipper.flush('age')
+        await self.shipper.close()
+        self.assertEqual(self.shipper.stats['flushes']['age'], 1)
+        self.assertEqual(self.shipper.stats['docs_sent'], 1)
+
+
+class TestMockGenesys(unittest.IsolatedAsyncioTestCase):
+    """Run the collector end to end against benchmarks/mock_genesys.py"""
+
+    async def test_collector_against_mock(self):
+        """URL overrides route OAuth, channel setup and the WebSocket to the mock"""
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+        from mock_genesys import MockGenesys
+        import audiohook_collector
+
+        mock = MockGenesys(rate=0, events=25, sockets=2)
+        base_url = await mock.start()
+        names = ('GENESYS_LOGIN_URL', 'GENESYS_API_URL', 'CLIENT_ID', 'CLIENT_SECRET', 'CUSTOM_TOPICS_FILE',
+                 'OUTPUT_FILE', 'HTTP_HOST', 'HTTP_PORT', 'ELASTIC_URL', 'CHANNEL_COUNT', 'TOPIC_CACHE_FILE')
+        original = {name: getattr(audiohook_collector, name) for name in names}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            audiohook_collector.GENESYS_LOGIN_URL = audiohook_collector.GENESYS_API_URL = base_url
+            audiohook_collector.CLIENT_ID = audiohook_collector.CLIENT_SECRET = 'test'
+            audiohook_collector.CUSTOM_TOPICS_FILE = os.path.join(temp_dir, 'missing.json')
+            audiohook_collector.TOPIC_CACHE_FILE = os.path.join(temp_dir, 'topic_cache.json')
+            audiohook_collector.OUTPUT_FILE = os.path.join(temp_dir, 'events.jsonl')
+            audiohook_collector.HTTP_HOST, audiohook_collector.HTTP_PORT = '127.0.0.1', 0
+            audiohook_collector.ELASTIC_URL = ''
+            audiohook_collector.CHANNEL_COUNT = 2
+            try:
+                async with AudioHookCollector() as collector:
+                    task = asyncio.create_task(collector.run())
+                    for _ in range(200):
+                        if collector.writer.stats['lines_written'] >= 25:
+                            break
+                        await asyncio.sleep(0.02)
+                    collector.stop()
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    collector.writer.close()
+                    collector.segments.close()
+
+                self.assertEqual(collector.writer.stats['lines_written'], 25)
+                self.assertEqual(mock.tokens_issued, 1)
+                self.assertIn('platform.integration.audiohook', collector.topics)
+
+                # Topics are split across two channels, each with its own socket
+                self.assertEqual(len(mock.channels), 2)
+                self.assertEqual(sorted(t for topics in mock.channels.values() for t in topics),
+                                 sorted(collector.topics))
+                channel_ids = {json.loads(line)['channel'] for line in
+                               Path(audiohook_collector.OUTPUT_FILE).read_text(encoding='utf-8').splitlines()}
+                self.assertLessEqual(channel_ids, set(mock.channels))
+
+                # Discovery is cached on disk: a restart does not download the catalog again
+                async with AudioHookCollector() as restarted:
+                    self.assertEqual(await restarted.load_topics(), collector.topics)
+                self.assertEqual(mock.topic_requests, 1)
+            finally:
+                for name, value in original.items():
+                    setattr(audiohook_collector, name, value)
+                await mock.stop()
+
+    async def test_rotation_overlaps_without_loss_or_duplicates(self):
+        """A make-before-break rotation delivers every event exactly once"""
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks'))
+        from mock_genesys import MockGenesys
+        import audiohook_collector
+
+        mock = MockGenesys(rate=200, events=150)
+        base_url = await mock.start()
+        names = ('GENESYS_LOGIN_URL', 'GENESYS_API_URL', 'CLIENT_ID', 'CLIENT_SECRET', 'CUSTOM_TOPICS_FILE',
+                 'OUTPUT_FILE', 'HTTP_HOST', 'HTTP_PORT', 'ELASTIC_URL', 'CHANNEL_ROTATE_SECONDS',
+                 'CHANNEL_OVERLAP_SECONDS', 'TOPIC_CACHE_FILE')
+        original = {name: getattr(audiohook_collector, name) for name in names}
+        with tempfile.TemporaryDirectory() as temp_dir:
+            audiohook_collector.GENESYS_LOGIN_URL = audiohook_collector.GENESYS_API_URL = base_url
+            audiohook_collector.CLIENT_ID = audiohook_collector.CLIENT_SECRET = 'test'
+            audiohook_collector.CUSTOM_TOPICS_FILE = os.path.join(temp_dir, 'missing.json')
+            audiohook_collector.TOPIC_CACHE_FILE = os.path.join(temp_dir, 'topic_cache.json')
+            audiohook_collector.OUTPUT_FILE = os.path.join(temp_dir, 'events.jsonl')
+            audiohook_collector.HTTP_HOST, audiohook_collector.HTTP_PORT = '127.0.0.1', 0
+            audiohook_collector.ELASTIC_URL = ''
+            audiohook_collector.CHANNEL_ROTATE_SECONDS = 0.3
+            audiohook_collector.CHANNEL_OVERLAP_SECONDS = 0.2
+            try:
+                async with AudioHookCollector() as collector:
+                    task = asyncio.create_task(collector.run())
+                    for _ in range(200):
+                        if mock.emitted >= 150 and collector.writer.stats['lines_written'] >= 150:
+                            break
+                        await asyncio.sleep(0.02)
+                    await asyncio.sleep(0.1)
+                    collector.stop()
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    collector.writer.close()
+                    collector.segments.close()
+
+                channel = collector.channel_pool.channels[0]
+                self.assertGreaterEqual(channel.stats['rotations'], 1)
+                self.assertGreater(channel.stats['overlap_duplicates'], 0)
+                self.assertEqual(mock.missed, 0)
+                seqs = [json.loads(line)['raw_event']['seq'] for line in
+                        Path(audiohook_collector.OUTPUT_FILE).read_text(encoding='utf-8').splitlines()]
+                self.assertEqual(sorted(seqs), list(range(150)))
+                # A rotation may still be in flight at shutdown
+                self.assertGreaterEqual(len(mock.channels), 1 + channel.stats['rotations'])
+            finally:
+                for name, value in original.items():
+                    setattr(audiohook_collector, name, value)
+                await mock.stop()
+
+
+class TestCodec(unittest.TestCase):
+    """Test the pluggable JSON codec"""
+
+    def test_backends_produce_identical_output(self):
+        """stdlib and orjson backends round-trip and encode the same bytes"""
+        import codec
+
+        event = {'event_id': 'AUDIOHOOK-0001', 'name': 'Ünïcode ✓', 'n': [1, 2.5, None, True]}
+        active = codec.BACKEND
+        try:
+            encoded = {}
+            for backend in ('json', 'orjson'):
+                name = codec.use_backend(backend)
+                encoded[name] = codec.dumps(event)
+                self.assertEqual(codec.loads(encoded[name]), event)
+                self.assertEqual(codec.loads(encoded[name].decode('utf-8')), event)
+            self.assertEqual(len(set(encoded.values())), 1)
+            with self.assertRaises(codec.DecodeError):
+                codec.loads(b'{not json')
+        finally:
+            codec.use_backend(active)
+
+
+async def wait_inflight(shipper):
+    """Wait for a shipper's in-flight bulk requests"""
+    import asyncio
+    await asyncio.gather(*shipper._inflight)
+
+
 def run_syntax_test():
     """Test that the collector can be imported and basic classes work"""
     try:
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the partitioned Parquet sink
+"""
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import columnar
+from columnar import NULL_PARTITION, ParquetSink, partition_value
+
+if columnar.available():
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+COLUMNS = (('timestamp', 'timestamp'), ('event_id', 'string'), ('severity', 'string'))
+
+
+def row(second, event_id, severity=None):
+    return f'2024-01-15T10:30:{second:02d}.000000+00:00', event_id, severity
+
+
+@unittest.skipUnless(columnar.available(), 'pyarrow not installed')
+class TestParquetSink(unittest.TestCase):
+    """Test partition layout, row groups and file rolling"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def sink(self, **kwargs):
+        return ParquetSink(str(self.root), COLUMNS, ('hour', 'event_code'), **kwargs)
+
+    def test_hive_layout_reads_back_as_a_dataset(self):
+        """Rows land in hour/event_code directories and read back with typed columns"""
+        sink = self.sink(row_group_rows=2)
+        for second in range(5):
+            sink.add(('2024-01-15T10', 'AUDIOHOOK-0001'), row(second, 'AUDIOHOOK-0001', 'ERROR'))
+        sink.add(('2024-01-15T10', None), row(9, None))
+        self.assertEqual(sink.snapshot()['open_files'], 2)
+        self.assertEqual(list(self.root.rglob('*.parquet')), [])  # Nothing published while open
+        sink.close()
+
+        files = sorted(self.root.rglob('*.parquet'))
+        self.assertEqual([f.parent.relative_to(self.root).as_posix() for f in files],
+                         ['hour=2024-01-15T10/event_code=AUDIOHOOK-0001',
+                          f'hour=2024-01-15T10/event_code={NULL_PARTITION}'])
+        self.assertEqual(pq.ParquetFile(files[0]).metadata.num_row_groups, 3)  # 2 + 2 + 1 rows
+
+        table = ds.dataset(str(self.root), format='parquet', partitioning='hive').to_table()
+        self.assertEqual(table.num_rows, 6)
+        self.assertEqual(str(table.schema.field('timestamp').type), 'timestamp[us, tz=UTC]')
+        self.assertEqual(table.column('event_code').to_pylist().count(None), 1)  # Hive null partition
+        self.assertEqual(sink.snapshot()['files'], 2)
+        self.assertEqual(sink.snapshot()['rows'], 6)
+
+    def test_files_roll_on_age_and_size(self):
+        """Files are published after roll_seconds, or once they exceed max_file_bytes"""
+        sink = self.sink(roll_seconds=0.05)
+        sink.add(('2024-01-15T10', 'A'), row(0, 'A'))
+        sink.maybe_roll()
+        self.assertEqual(sink.stats['files'], 0)
+        time.sleep(0.06)
+        sink.maybe_roll()
+        self.assertEqual(sink.stats['files'], 1)
+
+        sink = self.sink(row_group_rows=1, max_file_bytes=1)
+        for second in range(3):
+            sink.add(('2024-01-15T11', 'A'), row(second, 'A'))
+        self.assertEqual(sink.stats['files'], 3)
+        self.assertEqual(sink.snapshot()['open_files'], 0)
+
+    def test_bad_values(self):
+        """Unparsable timestamps become nulls; a row that cannot be converted drops its file"""
+        sink = self.sink()
+        sink.add(('h', 'A'), ('yesterday', 'A', None))
+        sink.add(('h', 'A'), row(1, 'A'))
+        sink.add(('h', 'B'), row(1, 7, None))  # Not a string
+        sink.close()
+
+        self.assertEqual(sink.stats['errors'], 1)
+        self.assertEqual(sink.stats['rows_dropped'], 1)
+        self.assertIn('event_code=B', sink.stats['last_error'])
+        table = pq.read_table(next(self.root.rglob('*.parquet')))
+        self.assertEqual(table.column('timestamp').null_count, 1)
+        self.assertEqual(list(self.root.rglob('.*.tmp')), [])
+        self.assertEqual(partition_value('a/b c'), 'a_b_c')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
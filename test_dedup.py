@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for duplicate-event suppression
+"""
+import os
+import sys
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from dedup import DedupCache, event_key
+
+
+class TestDedup(unittest.TestCase):
+    """Test event keys, the windowed cache and the Bloom fallback"""
+
+    EVENT = {
+        'eventEntity': {'id': 'AUDIOHOOK-0001', 'name': 'AudioHook integration error'},
+        'entityId': '0f8f91f9-a27d-4ddf-9026-7e1e3a8d73a6',
+        'conversationId': '34c18827-77a6-4970-ad66-6f2966c85bad',
+        'eventTime': '2024-01-15T10:30:45.123Z'
+    }
+
+    def test_event_key_is_stable_and_identity_based(self):
+        """Keys ignore non-identity fields and unidentifiable bodies get none"""
+        key = event_key(self.EVENT)
+        self.assertEqual(len(key), 32)
+        self.assertEqual(event_key(dict(self.EVENT, entityName='renamed')), key)
+        self.assertNotEqual(event_key(dict(self.EVENT, eventTime='2024-01-15T10:30:46.000Z')), key)
+        self.assertNotEqual(event_key(dict(self.EVENT, conversationId='other')), key)
+        self.assertIsNone(event_key({'message': 'WebSocket Heartbeat'}))
+        self.assertIsNone(event_key({'conversationId': 'c-1'}))
+        self.assertIsNone(event_key({k: v for k, v in self.EVENT.items() if k != 'eventTime'}))
+
+    def test_window_and_size_bounds(self):
+        """Repeats within the window are hits; old and overflowing keys are forgotten"""
+        cache = DedupCache(window=60, max_entries=2)
+        self.assertFalse(cache.seen('a'))
+        self.assertTrue(cache.seen('a'))
+        self.assertFalse(cache.seen('b'))
+        self.assertFalse(cache.seen('c'))  # Evicts 'a'
+        self.assertEqual(len(cache), 2)
+        self.assertFalse(cache.seen('a'))
+        self.assertFalse(cache.seen(None))
+
+        snapshot = cache.snapshot()
+        self.assertEqual(snapshot['checks'], 5)
+        self.assertEqual(snapshot['hits'], 1)
+        self.assertEqual(snapshot['unkeyed'], 1)
+        self.assertEqual(snapshot['evictions'], 2)
+        self.assertEqual(snapshot['hit_rate'], 0.2)
+
+        expired = DedupCache(window=0)
+        self.assertFalse(expired.seen('a'))
+        self.assertFalse(expired.seen('a'))
+        self.assertFalse(expired.snapshot()['enabled'])
+
+    def test_bloom_catches_evicted_keys(self):
+        """With a Bloom filter, duplicates beyond max_entries are still suppressed"""
+        keys = [event_key(dict(self.EVENT, conversationId=str(i))) for i in range(200)]
+        cache = DedupCache(window=60, max_entries=10, bloom_bits=1 << 16)
+        for key in keys:
+            self.assertFalse(cache.seen(key))
+        self.assertEqual(len(cache), 10)
+        self.assertTrue(all(cache.seen(key) for key in keys[:50]))
+        self.assertEqual(cache.stats['bloom_hits'], 50)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite event store
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import event_store
+from event_store import EventStore
+
+BASE = 1705314645.0  # 2024-01-15T10:30:45Z
+
+
+def row(n, conversation='c-1', code='AUDIOHOOK-0001', ts=None, doc_id=None):
+    data = json.dumps({'n': n, 'conversation_id': conversation, 'event_id': code}).encode()
+    return (BASE + n if ts is None else ts, code, 'AudioHook error', conversation, 'e-1',
+            'platform.integration.audiohook', 'ERROR', doc_id or f'doc-{n}', data)
+
+
+class TestEventStore(unittest.TestCase):
+    """Test indexed queries, keyset pagination, shared doc_ids and retention"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = EventStore(os.path.join(self.temp_dir.name, 'events.db'), retention_hours=0)
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def numbers(self, lines):
+        return [json.loads(line)['n'] for line in lines]
+
+    def test_filters_and_pagination(self):
+        """Filters combine; pages follow (ts, id) order and end with a None cursor"""
+        self.store.add_many([row(n, conversation=f'c-{n % 2}', code=f'AUDIOHOOK-000{n % 3}') for n in range(12)])
+        self.store.add_many([row(99, conversation='c-9', ts=BASE + 5)])  # Same ts as n=5, inserted later
+
+        lines, cursor = self.store.query(conversation_id='c-1', limit=10)
+        self.assertEqual(self.numbers(lines), [1, 3, 5, 7, 9, 11])
+        self.assertIsNone(cursor)
+        self.assertEqual(self.numbers(self.store.query(event_id='AUDIOHOOK-0000', conversation_id='c-0')[0]), [0, 6])
+        self.assertEqual(self.numbers(self.store.query(start=BASE + 3, end=BASE + 6)[0]), [3, 4, 5, 99])
+
+        pages, cursor = [], None
+        while True:
+            lines, cursor = self.store.query(limit=4, cursor=cursor)
+            pages.append(self.numbers(lines))
+            if cursor is None:
+                break
+        self.assertEqual(pages, [[0, 1, 2, 3], [4, 5, 99, 6], [7, 8, 9, 10], [11]])
+        with self.assertRaises(ValueError):
+            self.store.query(cursor='bogus')
+
+    def test_duplicates_and_retention(self):
+        """Rows sharing a doc_id are all kept; retention prunes old rows in chunks"""
+        self.store.add_many([row(n) for n in range(5)])
+        self.store.add_many([row(n, doc_id='doc-4') for n in range(5, 7)])
+        self.assertEqual(self.store.stats['rows_written'], 7)
+
+        original = event_store.PRUNE_CHUNK
+        event_store.PRUNE_CHUNK = 2
+        try:
+            self.store.retention_hours = 1
+            self.assertEqual(self.store.prune(now=BASE + 3600 + 4.5), 5)
+        finally:
+            event_store.PRUNE_CHUNK = original
+        self.assertEqual(self.numbers(self.store.query()[0]), [5, 6])
+        self.assertEqual(self.store.snapshot()['pruned'], 5)
+        self.assertGreater(self.store.snapshot()['size_bytes'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
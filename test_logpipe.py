@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for the background logging pipeline and per-event log sampling
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from logpipe import EventLogSampler, LogPipeline
+
+
+class TestLogPipeline(unittest.TestCase):
+    """Test level filtering, background writes and the drop policy"""
+
+    def test_records_are_filtered_then_written_by_the_thread(self):
+        """Below-threshold records are never queued; the rest reach stdout/stderr in order"""
+        logs = LogPipeline(('ts', 'lvl', 'msg'), level='WARN')
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            self.assertFalse(logs.enabled_for('INFO'))
+            for i in range(3):
+                if logs.enabled_for('WARN'):
+                    logs.emit('WARN', 'retrying', {'attempt': i})
+            logs.emit('ERROR', 'failed', {'error': object()}, err=True)  # Unserializable field
+            logs.close()
+
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([line['attempt'] for line in lines], [0, 1, 2])
+        self.assertEqual(set(lines[0]), {'ts', 'lvl', 'msg', 'attempt'})
+        self.assertTrue(lines[0]['ts'].endswith('+00:00'))
+        self.assertEqual(json.loads(err.getvalue())['lvl'], 'ERROR')
+        self.assertEqual(logs.stats['filtered'], 1)
+        self.assertEqual(logs.stats['written'], 4)
+
+    def test_full_queue_drops_and_reports(self):
+        """emit() never blocks; dropped lines are counted and reported by the writer"""
+        release = threading.Event()
+
+        class StalledStream(io.StringIO):
+            def write(self, text):
+                release.wait(5)  # A console pipe nobody is reading
+                return super().write(text)
+
+        logs = LogPipeline(queue_size=2)
+        out, err = StalledStream(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            logs.emit('INFO', 'event', {'n': 0})
+            while logs.snapshot()['queued']:
+                time.sleep(0.001)  # Writer took the first line and is now stuck on it
+            started = time.monotonic()
+            for i in range(1, 6):
+                logs.emit('INFO', 'event', {'n': i})
+            self.assertLess(time.monotonic() - started, 0.5)
+            self.assertEqual(logs.stats['dropped'], 3)
+            release.set()
+            logs.close()
+        self.assertEqual([json.loads(line)['n'] for line in out.getvalue().splitlines()], [0, 1, 2])
+        self.assertEqual(json.loads(err.getvalue())['dropped'], 3)
+
+
+class TestEventLogSampler(unittest.IsolatedAsyncioTestCase):
+    """Test 1-in-N sampling and periodic rollups"""
+
+    async def asyncSetUp(self):
+        self.lines = []
+
+    def log(self, level, message, **fields):
+        self.lines.append((message, fields))
+
+    async def test_sampling(self):
+        """The first event and every Nth after it are logged; 0 logs none"""
+        sampler = EventLogSampler(self.log, sample_every=3, rollup_seconds=0)
+        for i in range(7):
+            sampler.record('AUDIOHOOK-0001', 'AudioHook event processed', n=i)
+        self.assertEqual([fields['n'] for _, fields in self.lines], [0, 3, 6])
+        self.assertEqual(self.lines[0][1]['sample_every'], 3)
+
+        self.lines.clear()
+        silent = EventLogSampler(self.log, sample_every=0, rollup_seconds=0)
+        silent.record('AUDIOHOOK-0001', 'AudioHook event processed')
+        self.assertEqual(self.lines, [])
+
+    async def test_rollups(self):
+        """run() logs one count per key each interval and a final one when cancelled"""
+        sampler = EventLogSampler(self.log, rollup_seconds=0.05, noun='AudioHook events')
+        task = asyncio.create_task(sampler.run())
+        for _ in range(4):
+            sampler.record('AUDIOHOOK-0001', 'AudioHook event processed')
+        sampler.record('AUDIOHOOK-0002', 'AudioHook event processed')
+        await asyncio.sleep(0.08)
+        sampler.record('AUDIOHOOK-0002', 'AudioHook event processed')
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        counts = [(fields['event_code'], fields['count']) for _, fields in self.lines]
+        self.assertEqual(counts, [('AUDIOHOOK-0001', 4), ('AUDIOHOOK-0002', 1), ('AUDIOHOOK-0002', 1)])
+        self.assertEqual(self.lines[0][0], '4 AudioHook events of AUDIOHOOK-0001 in the last 0s')
+        self.assertEqual(sampler.stats['rollups'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
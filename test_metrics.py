@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the Prometheus metrics registry
+"""
+import os
+import sys
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from metrics import Registry
+
+
+class TestMetrics(unittest.TestCase):
+    """Test counters, gauges, histograms and the text exposition"""
+
+    def test_counter_and_gauge_exposition(self):
+        """Labelled samples render with HELP/TYPE headers and escaped values"""
+        registry = Registry()
+        events = registry.counter('events_total', 'Events seen', ('topic',))
+        events.inc('a')
+        events.inc('a')
+        events.inc('say "hi"', amount=3)
+        registry.gauge('depth', 'Queue depth', ('queue',), callback=lambda: {('ingest',): 7})
+
+        lines = registry.render().splitlines()
+        self.assertEqual(lines[:2], ['# HELP events_total Events seen', '# TYPE events_total counter'])
+        self.assertIn('events_total{topic="a"} 2', lines)
+        self.assertIn('events_total{topic="say \\"hi\\""} 3', lines)
+        self.assertIn('# TYPE depth gauge', lines)
+        self.assertIn('depth{queue="ingest"} 7', lines)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Observations land in the first bucket >= value and buckets accumulate"""
+        registry = Registry()
+        latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            latency.observe(value)
+
+        lines = registry.render().splitlines()
+        self.assertIn('latency_seconds_bucket{le="0.1"} 2', lines)
+        self.assertIn('latency_seconds_bucket{le="1"} 3', lines)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4', lines)
+        self.assertIn('latency_seconds_sum 5.65', lines)
+        self.assertIn('latency_seconds_count 4', lines)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for the key-partitioned worker pool
+"""
+import asyncio
+import os
+import sys
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from partition import PartitionedPool, partition_key, partition_of
+
+
+def tag_with_pid(items):
+    """Worker function: echo each item with the worker's pid"""
+    return [(item, os.getpid()) for item in items]
+
+
+def fail_on_boom(items):
+    if 'boom' in items:
+        raise ValueError('boom')
+    return items
+
+
+class TestPartitionKey(unittest.TestCase):
+    """Test key extraction from raw frame text"""
+
+    def test_conversation_then_entity(self):
+        """conversationId wins over entityId; whitespace and null values are handled"""
+        self.assertEqual(partition_key('{"eventBody": {"entityId": "e-1", "conversationId": "c-1"}}'), 'c-1')
+        self.assertEqual(partition_key('{"eventBody": {"conversationId" : "c-2"}}'), 'c-2')
+        self.assertEqual(partition_key('{"eventBody": {"conversationId": null, "entityId": "e-1"}}'), 'e-1')
+        self.assertEqual(partition_key('{"eventBody": {"message": "WebSocket Heartbeat"}}'), '')
+        self.assertEqual(partition_of('c-1', 4), partition_of('c-1', 4))
+
+
+class TestPartitionedPool(unittest.IsolatedAsyncioTestCase):
+    """Test partition affinity, ordered delivery and batch failures"""
+
+    async def asyncSetUp(self):
+        self.pool = PartitionedPool(2, max_inflight=2)
+
+    async def asyncTearDown(self):
+        await asyncio.to_thread(self.pool.shutdown)
+
+    async def pump(self, fn, batches, on_error=None):
+        delivered = []
+        pending = list(batches)
+
+        async def next_batch():
+            return pending.pop(0) if pending else None
+
+        async def deliver(result):
+            delivered.append(result)
+
+        await self.pool.pump(fn, next_batch, lambda frame: frame, deliver, on_error)
+        return delivered
+
+    async def test_same_key_same_worker_in_order(self):
+        """Every frame of a key runs on one worker and results keep per-key order"""
+        frames = [f'{{"conversationId": "c-{i % 6}", "seq": {i}}}' for i in range(60)]
+        frames += ['{"message": "heartbeat"}'] * 4
+        delivered = await self.pump(tag_with_pid, [frames[i:i + 7] for i in range(0, len(frames), 7)])
+
+        self.assertEqual(sorted(frame for frame, _ in delivered), sorted(frames))
+        pids = {}
+        for frame, pid in delivered:
+            pids.setdefault(partition_key(frame), set()).add(pid)
+        self.assertTrue(all(len(owners) == 1 for key, owners in pids.items() if key))
+        for key in range(6):
+            order = [frame for frame, _ in delivered if partition_key(frame) == f'c-{key}']
+            self.assertEqual(order, [f for f in frames if partition_key(f) == f'c-{key}'])
+
+        snapshot = self.pool.snapshot()
+        self.assertEqual(snapshot['items'], 64)
+        self.assertEqual(snapshot['unkeyed'], 4)
+        self.assertEqual(snapshot['inflight'], 0)
+
+    async def test_failed_batch_is_reported(self):
+        """A batch that raises is reported and skipped; later batches still arrive"""
+        errors = []
+        delivered = await self.pump(fail_on_boom, [['boom'], ['ok']], errors.append)
+        self.assertEqual(delivered, ['ok'])
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(self.pool.stats['errors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
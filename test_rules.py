@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for the compiled classification rules
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from rules import DEFAULT_RULES, PREFIX_TUPLE_MAX, RuleEngine, compile_rules, parse_rule
+
+
+class TestCompiledRules(unittest.TestCase):
+    """Test the generated predicates against the original heuristics"""
+
+    def test_defaults_match_the_old_heuristics(self):
+        """The shipped rule file equals the built-in rules and classifies like the old code"""
+        with open(os.path.join(os.path.dirname(__file__), 'rules.json'), encoding='utf-8') as f:
+            self.assertEqual(json.load(f), DEFAULT_RULES)
+
+        match = RuleEngine().predicate('audiohook_event')
+        self.assertTrue(match({'eventEntity': {'id': 'AUDIOHOOK-0001'}}))
+        self.assertTrue(match({'entityType': 'AudioHook'}))
+        self.assertTrue(match({'eventEntity': {'id': 'X', 'name': 'Audiohook Connection'}}))
+        self.assertFalse(match({'eventEntity': {'id': 'audiohook-0001'}}))  # Prefix is case-sensitive
+        self.assertFalse(match({'eventEntity': 'AUDIOHOOK-0001', 'entityType': None}))
+        self.assertFalse(match({'presenceDefinition': {'id': 'available'}}))
+
+        engine = RuleEngine()
+        self.assertTrue(engine.match('audiohook_signal', {'code': None, 'component': None,
+                                                          'topic': 'v2.integrations.audiohook'}))
+        self.assertEqual(engine.severity('critical'), 'error')
+        self.assertEqual(engine.severity(None), 'info')
+
+    def test_cheapest_rule_runs_first_and_is_credited(self):
+        """Rules are ordered by test cost and the first hit counts for that rule only"""
+        classifiers, _, _ = compile_rules({'classifiers': {'demo': [
+            {'name': 're', 'field': 'code', 'regex': '^AH'},
+            {'name': 'eq', 'field': 'code', 'equals': ['AH-1']},
+            {'name': 'fallback', 'field': ['missing', 'nested.code'], 'contains': ['x', 'AH']}
+        ]}})
+        demo = classifiers['demo']
+        self.assertEqual([rule.name for rule in demo.rules], ['eq', 'fallback', 're'])
+        self.assertTrue(demo.match({'code': 'AH-1'}))
+        self.assertTrue(demo.match({'code': 'AH-2'}))
+        self.assertTrue(demo.match({'nested': {'code': 'ZAH'}}))
+        self.assertFalse(demo.match({'code': 7}))
+        self.assertEqual(demo.hits, [1, 1, 1])
+
+    def test_many_prefixes_and_invalid_rules(self):
+        """Large prefix lists use length buckets; malformed rules are rejected"""
+        prefixes = [f'AH{i}-' for i in range(PREFIX_TUPLE_MAX * 2)] + ['LONGER-PREFIX-']
+        classifiers, _, _ = compile_rules({'classifiers': {'p': [{'name': 'p', 'field': 'id', 'prefix': prefixes}]}})
+        self.assertTrue(classifiers['p'].match({'id': 'AH12-x'}))
+        self.assertTrue(classifiers['p'].match({'id': 'LONGER-PREFIX-x'}))
+        self.assertFalse(classifiers['p'].match({'id': 'AH-x'}))
+
+        for spec in ({'field': 'id', 'equals': 'x'},
+                     {'name': 'two', 'field': 'id', 'equals': 'x', 'prefix': 'y'},
+                     {'name': 'nofield', 'equals': 'x'},
+                     {'name': 'regex', 'field': 'id', 'regex': '('}):
+            with self.assertRaises(ValueError):
+                parse_rule(spec)
+
+
+class TestRuleEngineReload(unittest.TestCase):
+    """Test hot reload of the rule file"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'rules.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, content, mtime):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(content if isinstance(content, str) else json.dumps(content))
+        os.utime(self.path, (mtime, mtime))
+
+    def test_reload_swaps_rules_in_place(self):
+        """A bound predicate sees new rules; counters for unchanged rules carry over"""
+        engine = RuleEngine(self.path)
+        match = engine.predicate('audiohook_event')
+        self.assertTrue(match({'eventEntity': {'id': 'AUDIOHOOK-1'}}))
+
+        rules = json.loads(json.dumps(DEFAULT_RULES))
+        rules['classifiers']['audiohook_event'].append({'name': 'ah-code', 'field': 'eventEntity.id', 'prefix': 'AH-'})
+        self.write(rules, 1000)
+        self.assertTrue(engine.reload())
+        self.assertIs(engine.predicate('audiohook_event'), match)
+        self.assertTrue(match({'eventEntity': {'id': 'AH-1'}}))
+        self.assertEqual(engine.hits()[('audiohook_event', 'event-code-prefix')], 1)
+        self.assertEqual(engine.hits()[('audiohook_event', 'ah-code')], 1)
+        self.assertFalse(engine.reload())  # Unchanged mtime
+
+    def test_invalid_file_keeps_previous_rules(self):
+        """A broken edit is counted and reported; the loaded rules stay in effect"""
+        self.write({'classifiers': {'audiohook_event': [{'name': 'ah', 'field': 'code', 'equals': 'AH'}]}}, 1000)
+        engine = RuleEngine(self.path)
+        self.assertEqual(engine.stats['source'], self.path)
+
+        self.write('{"classifiers": ', 2000)
+        self.assertFalse(engine.reload())
+        self.assertTrue(engine.match('audiohook_event', {'code': 'AH'}))
+        self.assertEqual(engine.stats['reload_failures'], 1)
+        self.assertTrue(engine.snapshot()['last_error'])
+
+        os.remove(self.path)
+        self.assertTrue(engine.reload())  # Removing the file restores the defaults
+        self.assertEqual(engine.stats['source'], 'defaults')
+        self.assertFalse(engine.match('audiohook_event', {'code': 'AH'}))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
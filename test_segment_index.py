@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for the sparse segment time index
+"""
+import contextlib
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+import segment_index
+from segment_index import BlockIndexer, block_range, index_path, load_index, read_range, to_epoch
+
+BASE = 1705314645.0  # 2024-01-15T10:30:45Z
+
+
+def line(n, second=None):
+    stamp = datetime.fromtimestamp(BASE + (n if second is None else second), timezone.utc).isoformat()
+    return json.dumps({'timestamp': stamp, 'n': n}).encode()
+
+
+def numbers(lines):
+    return [json.loads(data)['n'] for data in lines]
+
+
+class TestSegmentIndex(unittest.TestCase):
+    """Test block lookup, compressed block reads and unindexed fallbacks"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.output_path = Path(self.temp_dir.name) / 'events.jsonl'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_segment(self, name, lines, every=None):
+        """Write a raw segment, and its sidecar when `every` is given"""
+        segment = self.output_path.with_name(name)
+        indexer = BlockIndexer(every or 1)
+        with segment.open('wb') as f:
+            for data in lines:
+                indexer.add(f.tell(), len(data) + 1, json.loads(data)['timestamp'])
+                f.write(data + b'\n')
+        if every:
+            segment_index.write_index(segment, indexer.to_index(segment.name))
+        return segment
+
+    def test_block_range_tolerates_unordered_lines(self):
+        """Running max / trailing min keep late lines reachable"""
+        indexer = BlockIndexer(2)
+        for offset, second in enumerate([0, 1, 2, 9, 4, 5, 6, 7]):  # 9 arrived early
+            indexer.add(offset * 10, 10, BASE + second)
+        index = indexer.to_index('events-1.jsonl')
+        self.assertEqual(index['lines'], 8)
+        self.assertEqual(index['raw_bytes'], 80)
+        self.assertEqual(block_range(index, BASE + 8, BASE + 10), (1, 4))
+        self.assertEqual(block_range(index, BASE + 0, BASE + 2), (0, 1))
+        self.assertEqual(block_range(index, BASE + 20, BASE + 30), (4, 4))
+
+    def test_compressed_blocks_read_independently(self):
+        """Per-block gzip members stay one valid .gz file and are read by offset"""
+        segment = self.write_segment('events-20240115T103045Z.jsonl', [line(n) for n in range(10)], every=3)
+        index = load_index(segment)
+        target = segment.with_name(segment.name + '.gz')
+        with segment.open('rb') as src, target.open('wb') as dst:
+            segment_index.compress_blocks(src, dst, index, 'gzip', gzip.compress)
+        index['file'] = target.name
+        segment_index.write_index(target, index)
+        segment.unlink()
+
+        self.assertEqual(index_path(target), segment.with_name(segment.name + '.idx'))
+        self.assertEqual(len(load_index(target)['members']), 4)
+        with gzip.open(target, 'rb') as f:
+            self.assertEqual(numbers(f.read().splitlines()), list(range(10)))
+
+        self.output_path.write_bytes(line(10) + b'\n' + line(11) + b'\n')  # Active file
+        self.assertEqual(numbers(read_range(self.output_path, BASE + 4, BASE + 11)), [4, 5, 6, 7, 8, 9, 10])
+        self.assertEqual(numbers(read_range(self.output_path, BASE + 100, BASE + 200)), [])
+
+    def test_unindexed_segments_and_cli(self):
+        """Segments without a sidecar are streamed; build writes the missing sidecars"""
+        old = self.write_segment('events-20240115T100000Z.jsonl', [line(n, second=n * 2) for n in range(5)])
+        self.write_segment('events-20240115T110000Z.jsonl', [line(n) for n in range(5, 8)], every=2)
+        with gzip.open(old.with_name(old.name + '.gz'), 'wb') as gz:
+            gz.write(old.read_bytes())
+        old.unlink()
+
+        self.assertEqual(numbers(read_range(self.output_path, BASE + 4, BASE + 7)), [2, 3, 5, 6])
+        built = segment_index.build_missing(self.output_path, 2)
+        self.assertEqual([p.name for p in built], ['events-20240115T100000Z.jsonl.gz'])
+        self.assertIsNone(load_index(built[0])['members'])  # Streamed, but skipped when out of range
+
+        out = io.TextIOWrapper(io.BytesIO())
+        with contextlib.redirect_stdout(out):
+            segment_index.main(['query', str(self.output_path),
+                                '--from', '2024-01-15T10:30:49Z', '--to', '2024-01-15T10:30:51Z'])
+        out.flush()
+        self.assertEqual(numbers(out.buffer.getvalue().splitlines()), [2, 5])
+        self.assertEqual(to_epoch('2024-01-15T10:30:45'), BASE)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
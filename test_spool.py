@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for the Elasticsearch outage spool
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from spool import BulkSpool, replay_spool
+
+
+class TestBulkSpool(unittest.TestCase):
+    """Test spool segments, checkpoints and limits"""
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.spool_dir = Path(self.temp_dir.name) / 'spool'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_append_peek_commit(self):
+        """Records replay in order and the checkpoint advances on commit"""
+        spool = BulkSpool(str(self.spool_dir), segment_bytes=64)
+        for i in range(4):
+            spool.append(b'{"index":{}}\n{"n":%d}\n' % i, 1)
+        self.assertEqual(spool.pending_batches, 4)
+        self.assertGreater(spool.snapshot()['segments'], 1)
+
+        replayed = []
+        while True:
+            record = spool.peek()
+            if record is None:
+                break
+            payload, docs, position = record
+            replayed.append(payload)
+            spool.commit(position)
+
+        self.assertEqual([p.split(b'\n')[1] for p in replayed],
+                         [b'{"n":%d}' % i for i in range(4)])
+        snapshot = spool.snapshot()
+        self.assertEqual(snapshot['pending_batches'], 0)
+        self.assertEqual(snapshot['docs_replayed'], 4)
+        spool.close()
+
+    def test_checkpoint_survives_restart(self):
+        """A reopened spool resumes after the last committed record"""
+        spool = BulkSpool(str(self.spool_dir))
+        for i in range(3):
+            spool.append(b'payload-%d' % i, 2)
+        _, _, position = spool.peek()
+        spool.commit(position)
+        spool.close()
+
+        reopened = BulkSpool(str(self.spool_dir))
+        self.assertEqual(reopened.pending_batches, 2)
+        self.assertEqual(reopened.snapshot()['pending_docs'], 4)
+        payload, _, _ = reopened.peek()
+        self.assertEqual(payload, b'payload-1')
+        reopened.close()
+
+    def test_max_bytes_drops_oldest_segment(self):
+        """Exceeding max_bytes discards the oldest segment and counts the loss"""
+        spool = BulkSpool(str(self.spool_dir), segment_bytes=32, max_bytes=100)
+        for i in range(10):
+            spool.append(b'x' * 30, 1)
+        snapshot = spool.snapshot()
+        self.assertLessEqual(snapshot['bytes'], 100)
+        self.assertGreater(snapshot['segments_dropped'], 0)
+        self.assertEqual(snapshot['pending_batches'] + snapshot['docs_dropped'], 10)
+        spool.close()
+
+
+class TestReplay(unittest.IsolatedAsyncioTestCase):
+    """Test the rate-limited replay task"""
+
+    async def test_replay_retries_until_post_succeeds(self):
+        """Failed posts keep the record; successful posts drain the spool"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            spool = BulkSpool(temp_dir)
+            spool.append(b'a', 1)
+            spool.append(b'b', 1)
+
+            attempts = []
+
+            async def post(payload):
+                attempts.append(payload)
+                return len(attempts) > 1
+
+            task = asyncio.create_task(replay_spool(spool, post, rate=1000, idle_interval=0.01))
+            for _ in range(200):
+                if spool.pending_batches == 0:
+                    break
+                await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+            self.assertEqual(attempts[:3], [b'a', b'a', b'b'])
+            self.assertEqual(spool.pending_batches, 0)
+            spool.close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
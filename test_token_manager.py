@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared OAuth token manager
+"""
+import asyncio
+import os
+import stat
+import sys
+import tempfile
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from token_manager import TokenManager
+
+
+class TestTokenManager(unittest.IsolatedAsyncioTestCase):
+    """Test single-flight refresh, proactive renewal and the cache file"""
+
+    async def asyncSetUp(self):
+        self.requests = 0
+        self.expires_in = 3600
+        self.delay = 0.0
+        self.observed = []
+
+    async def request(self):
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        return f'token-{self.requests}', self.expires_in
+
+    def manager(self, **kwargs):
+        return TokenManager(self.request, observe=lambda s, o: self.observed.append(o), **kwargs)
+
+    async def test_concurrent_callers_share_one_request(self):
+        """Callers that arrive while a refresh is in flight wait for it instead of starting their own"""
+        self.delay = 0.05
+        tokens = self.manager()
+        results = await asyncio.gather(*(tokens.get() for _ in range(10)))
+        self.assertEqual(set(results), {'token-1'})
+        self.assertEqual(self.requests, 1)
+        self.assertEqual(tokens.stats['coalesced'], 9)
+        self.assertEqual(self.observed, ['success'])
+
+        # A valid token is served without a request
+        self.assertEqual(await tokens.get(), 'token-1')
+        self.assertEqual(self.requests, 1)
+
+    async def test_cancelled_caller_keeps_request_single_flight(self):
+        """Cancelling the caller that started a refresh does not let the next caller start another"""
+        self.delay = 0.05
+        tokens = self.manager()
+        first = asyncio.create_task(tokens.refresh())
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+
+        self.assertEqual(await tokens.get(), 'token-1')
+        self.assertEqual(self.requests, 1)
+        self.assertEqual(tokens.stats['coalesced'], 1)
+        self.assertIsNone(tokens._inflight)
+
+    async def test_failures_are_reported_and_retried(self):
+        """A failed request raises and is counted; the next call tries again"""
+        async def failing():
+            self.requests += 1
+            raise RuntimeError('TokenFailed 401')
+
+        tokens = TokenManager(failing, observe=lambda s, o: self.observed.append(o))
+        with self.assertRaises(RuntimeError):
+            await tokens.get()
+        self.assertEqual(tokens.snapshot()['failures'], 1)
+        self.assertIn('401', tokens.snapshot()['last_error'])
+        tokens.request = self.request
+        self.assertEqual(await tokens.get(), 'token-2')
+        self.assertEqual(self.observed, ['failure', 'success'])
+
+    async def test_cache_file_survives_restart(self):
+        """The token is persisted with 0600 permissions and only reused for the same identity"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'token.json')
+            first = self.manager(cache_file=path, cache_key='login|client-a')
+            await first.get()
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+            with open(path, encoding='utf-8') as f:
+                self.assertNotIn('client-a', f.read())
+
+            restarted = self.manager(cache_file=path, cache_key='login|client-a')
+            self.assertEqual(await restarted.get(), 'token-1')
+            self.assertEqual(restarted.stats['cache_loads'], 1)
+
+            other = self.manager(cache_file=path, cache_key='login|client-b')
+            self.assertEqual(await other.get(), 'token-2')
+            self.assertEqual(self.requests, 2)
+
+    async def test_background_renewal_before_expiry(self):
+        """run() replaces a short-lived token before callers would have to wait"""
+        self.expires_in = 0.4  # Renewed at a quarter of its lifetime
+        tokens = self.manager()
+        task = asyncio.create_task(tokens.run())
+        await asyncio.sleep(0.5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        self.assertGreaterEqual(tokens.stats['proactive_refreshes'], 3)
+        self.assertTrue(tokens.valid)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
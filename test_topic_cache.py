@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tests for the persisted topic-discovery cache
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from topic_cache import TopicCache
+
+
+def select_audiohook(catalog):
+    return [t['id'] for t in catalog if 'audiohook' in t['id']]
+
+
+class TestTopicCache(unittest.IsolatedAsyncioTestCase):
+    """Test TTL reuse, per-selector persistence and background refresh"""
+
+    CATALOG = [{'id': 'platform.integration.audiohook'}, {'id': 'v2.users.me.presence'}]
+
+    async def asyncSetUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'topic_cache.json')
+        self.fetches = 0
+        self.catalog = list(self.CATALOG)
+
+    async def asyncTearDown(self):
+        self.temp_dir.cleanup()
+
+    async def fetch(self):
+        self.fetches += 1
+        return self.catalog
+
+    async def test_fresh_entry_is_reused_across_instances(self):
+        """A restart within the TTL resolves from disk without fetching"""
+        first = TopicCache(self.path, 3600, 'org-a', select_audiohook)
+        self.assertEqual(await first.resolve(self.fetch), ['platform.integration.audiohook'])
+        self.assertEqual(first.snapshot()['catalog_size'], 2)
+
+        second = TopicCache(self.path, 3600, 'org-a', select_audiohook)
+        self.assertEqual(await second.resolve(self.fetch), ['platform.integration.audiohook'])
+        self.assertEqual(self.fetches, 1)
+        self.assertEqual(second.stats['cache_hits'], 1)
+
+        # Another selector keeps its own entry in the same file
+        other = TopicCache(self.path, 3600, 'org-b', select_audiohook)
+        await other.resolve(self.fetch)
+        self.assertEqual(self.fetches, 2)
+        self.assertEqual(set(json.loads(Path(self.path).read_text())['entries']), {'org-a', 'org-b'})
+
+    async def test_stale_entry_is_served_then_refreshed(self):
+        """An expired entry is returned immediately and the background refresh reports changes"""
+        Path(self.path).write_text(json.dumps({'entries': {'org-a': {
+            'fetched_at': time.time() - 7200, 'topics': ['old.audiohook'], 'catalog_size': 1}}}))
+        cache = TopicCache(self.path, 3600, 'org-a', select_audiohook)
+        self.assertEqual(await cache.resolve(self.fetch), ['old.audiohook'])
+        self.assertEqual(self.fetches, 0)
+
+        changes = []
+
+        async def on_change(topics):
+            changes.append(topics)
+
+        task = asyncio.create_task(cache.refresh_loop(self.fetch, on_change))
+        for _ in range(50):
+            if changes:
+                break
+            await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        self.assertEqual(changes, [['platform.integration.audiohook']])
+        self.assertTrue(cache.fresh)
+
+    async def test_empty_match_keeps_previous_topics(self):
+        """A refresh that matches nothing does not wipe the known topics"""
+        cache = TopicCache(None, 3600, 'org-a', select_audiohook)
+        await cache.resolve(self.fetch)
+        self.catalog = [{'id': 'v2.users.me.presence'}]
+        self.assertFalse(await cache.refresh(self.fetch))
+        self.assertEqual(cache.topics, ['platform.integration.audiohook'])
+        self.assertEqual(cache.stats['refresh_failures'], 1)
+
+    async def test_rejected_catalog_backs_off(self):
+        """The refresh loop waits retry_seconds after a catalog that matches nothing"""
+        Path(self.path).write_text(json.dumps({'entries': {'org-a': {
+            'fetched_at': time.time() - 7200, 'topics': ['old.audiohook'], 'catalog_size': 1}}}))
+        cache = TopicCache(self.path, 3600, 'org-a', select_audiohook)
+        self.catalog = [{'id': 'v2.users.me.presence'}]
+
+        async def on_change(topics):
+            pass
+
+        task = asyncio.create_task(cache.refresh_loop(self.fetch, on_change, retry_seconds=0.1))
+        await asyncio.sleep(0.25)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        self.assertLessEqual(self.fetches, 3)
+        self.assertEqual(cache.topics, ['old.audiohook'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for sliding-window event statistics
+"""
+import os
+import sys
+import unittest
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(__file__))
+
+from window_stats import EventStats, SpaceSaving
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestEventStats(unittest.TestCase):
+    """Test ring buckets expiring per window and the top-K sketches"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.stats = EventStats(top_k=2, top_seconds=300, clock=self.clock)
+
+    def test_windows_slide_by_bucket(self):
+        """Counts leave the 1m window after 60s, the 5m after 300s and the 1h after 3600s"""
+        for _ in range(3):
+            self.stats.record('AUDIOHOOK-0001', 'ERROR', 'i-1', 'platform.integration.audiohook', 'c-1')
+        self.clock.now += 30
+        self.stats.record('AUDIOHOOK-0002', None, 'i-2', 'platform.integration.audiohook', 'c-2')
+
+        one_minute = self.stats.window('1m')
+        self.assertEqual(one_minute['events'], 4)
+        self.assertEqual(one_minute['event_code'], {'AUDIOHOOK-0001': 3, 'AUDIOHOOK-0002': 1})
+        self.assertEqual(one_minute['severity'], {'ERROR': 3, 'unknown': 1})
+        self.assertEqual(one_minute['integration'], {'i-1': 3, 'i-2': 1})
+        self.assertEqual(one_minute['rate_per_second'], round(4 / 60, 4))
+
+        self.clock.now += 45  # First events are 75s old
+        self.assertEqual(self.stats.window('1m')['events'], 1)
+        self.assertEqual(self.stats.window('5m')['events'], 4)
+        self.clock.now += 300
+        self.assertEqual(self.stats.window('5m')['events'], 0)
+        self.assertEqual(self.stats.window('1h')['events'], 4)
+        self.clock.now += 3600
+        snapshot = self.stats.snapshot()
+        self.assertEqual(snapshot['windows']['1h']['events'], 0)
+        self.assertEqual(snapshot['events'], 4)
+        with self.assertRaises(KeyError):
+            self.stats.window('1d')
+
+    def test_top_k_periods(self):
+        """Heavy hitters rank first and expire after two idle periods"""
+        for conversation, n in (('c-1', 50), ('c-2', 30), ('c-3', 5)):
+            for _ in range(n):
+                self.stats.record('AUDIOHOOK-0001', 'ERROR', 'i-1', 't', conversation)
+        self.assertEqual([(t['key'], t['count']) for t in self.stats.top('conversation')], [('c-1', 50), ('c-2', 30)])
+
+        self.clock.now += 301  # Previous period still reported
+        self.stats.record('AUDIOHOOK-0001', 'ERROR', 'i-1', 't', 'c-3')
+        self.assertEqual(self.stats.top('conversation')[0]['key'], 'c-1')
+        self.assertEqual(self.stats.top('integration'), [{'key': 'i-1', 'count': 86, 'error': 0}])
+        self.clock.now += 700
+        self.assertEqual(self.stats.top('conversation'), [])
+
+    def test_space_saving_bounds(self):
+        """Counters stay within capacity; an estimate overcounts by at most its error"""
+        sketch = SpaceSaving(3)
+        stream = ['a'] * 20 + ['b', 'c', 'd', 'e', 'f'] * 2 + ['a'] * 5 + ['g']
+        for item in stream:
+            sketch.add(item)
+        self.assertEqual(len(sketch), 3)
+        self.assertEqual(max(sketch.counts, key=sketch.counts.get), 'a')
+        for item, estimate in sketch.counts.items():
+            self.assertLessEqual(estimate - sketch.errors[item], stream.count(item))
+            self.assertGreaterEqual(estimate, stream.count(item))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OAuth client-credentials token manager shared by both collectors
+
+- Single flight: concurrent callers that find the token missing or expiring
+  all await the same in-flight token request.
+- Proactive refresh: run() renews the token `refresh_margin` seconds before it
+  expires, so API calls normally never wait for the OAuth round-trip. Failed
+  renewals are retried with backoff while the current token is still valid.
+- Optional cache file: the token and its expiry are written with 0600
+  permissions and reused on restart if they are still valid for the same
+  login host and client id.
+
+The collectors own the HTTP call: `request` is an async callable returning
+(access_token, expires_in_seconds).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+RETRY_MIN_SECONDS = 5.0
+RETRY_MAX_SECONDS = 300.0
+
+
+class TokenManager:
+    """Caches one bearer token and refreshes it ahead of expiry"""
+
+    def __init__(self, request: Callable[[], Awaitable[Tuple[str, float]]], refresh_margin: float = 300.0,
+                 cache_file: Optional[str] = None, cache_key: str = '',
+                 observe: Optional[Callable[[float, str], None]] = None):
+        self.request = request
+        self.refresh_margin = refresh_margin
+        self.cache_file = Path(cache_file) if cache_file else None
+        # Only a digest of the identity is stored next to the token
+        self.cache_key = hashlib.sha256(cache_key.encode('utf-8')).hexdigest()
+        self.observe = observe
+        self.token: Optional[str] = None
+        self.expires_at = 0.0
+        self.lifetime = 0.0
+        self._inflight: Optional[asyncio.Future] = None
+        self.stats = {
+            'refreshes': 0,
+            'proactive_refreshes': 0,
+            'failures': 0,
+            'coalesced': 0,
+            'cache_loads': 0,
+            'last_refresh_seconds': None,
+            'last_error': None
+        }
+        self._load_cache()
+
+    # ---------- Cache file ----------
+    def _load_cache(self):
+        if self.cache_file is None:
+            return
+        try:
+            with self.cache_file.open('r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get('key') != self.cache_key:
+            return
+        if data.get('access_token') and float(data.get('expires_at') or 0) - time.time() > self.refresh_margin:
+            self.token = data['access_token']
+            self.expires_at = float(data['expires_at'])
+            self.lifetime = float(data.get('lifetime') or 0)
+            self.stats['cache_loads'] += 1
+
+    def _save_cache(self):
+        if self.cache_file is None:
+            return
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.cache_file.with_name(self.cache_file.name + '.tmp')
+        fd = os.open(temp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'key': self.cache_key, 'access_token': self.token, 'expires_at': self.expires_at,
+                       'lifetime': self.lifetime}, f)
+        os.replace(temp, self.cache_file)
+
+    # ---------- Token access ----------
+    def _margin(self) -> float:
+        # Short-lived tokens are renewed at half their lifetime instead
+        return min(self.refresh_margin, self.lifetime / 2) if self.lifetime else self.refresh_margin
+
+    @property
+    def valid(self) -> bool:
+        """Token present and outside the refresh margin"""
+        return bool(self.token) and time.time() < self.expires_at - self._margin()
+
+    async def get(self) -> str:
+        """Current token, fetching one first if it is missing or about to expire"""
+        if self.valid:
+            return self.token
+        return await self.refresh()
+
+    async def refresh(self) -> str:
+        """Fetch a new token; concurrent calls share one request"""
+        if self._inflight is not None:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(self._inflight)
+        self._inflight = asyncio.ensure_future(self._fetch())
+        # Cleared when the fetch ends, not when this caller does: a cancelled
+        # caller must not let the next one start a second request
+        self._inflight.add_done_callback(self._fetch_done)
+        return await asyncio.shield(self._inflight)
+
+    def _fetch_done(self, future: asyncio.Future):
+        if self._inflight is future:
+            self._inflight = None
+        if not future.cancelled():
+            future.exception()  # Retrieved here in case every waiter was cancelled
+
+    async def _fetch(self) -> str:
+        started = time.monotonic()
+        try:
+            token, expires_in = await self.request()
+        except Exception as e:
+            elapsed = time.monotonic() - started
+            self.stats['failures'] += 1
+            self.stats['last_error'] = str(e)[:200]
+            if self.observe:
+                self.observe(elapsed, 'failure')
+            raise
+        elapsed = time.monotonic() - started
+        self.token = token
+        self.lifetime = float(expires_in)
+        self.expires_at = time.time() + self.lifetime
+        self.stats['refreshes'] += 1
+        self.stats['last_refresh_seconds'] = round(elapsed, 3)
+        self.stats['last_error'] = None
+        if self.observe:
+            self.observe(elapsed, 'success')
+        try:
+            await asyncio.to_thread(self._save_cache)
+        except OSError:
+            pass  # The cache only speeds up restarts
+        return token
+
+    async def run(self):
+        """Background task: renew the token before it enters the refresh margin"""
+        failures = 0
+        while True:
+            if self.token:
+                # Renew a little before get() would, so callers never block on it
+                margin = self._margin()
+                lead = margin + min(60.0, margin / 2)
+                await asyncio.sleep(max(0.0, self.expires_at - lead - time.time()))
+            try:
+                await self.refresh()
+                self.stats['proactive_refreshes'] += 1
+                failures = 0
+            except Exception:
+                failures += 1
+                await asyncio.sleep(min(RETRY_MAX_SECONDS, RETRY_MIN_SECONDS * 2 ** (failures - 1)))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            valid=self.valid,
+            expires_in_seconds=round(self.expires_at - time.time(), 1) if self.token else None
+        )
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persisted topic-discovery cache shared by both collectors
+
+The /api/v2/notifications/availabletopics catalog is large and rarely
+changes, yet both collectors only need the handful of topic ids that match
+their filter. TopicCache keeps the *resolved* list (the filter runs once, when
+the catalog is fetched) in a small JSON file so that restarts skip the
+download while the entry is younger than the TTL. A background loop refetches
+when the entry expires and reports changes so the caller can resubscribe.
+
+File layout (one entry per selector, so both collectors can share a file):
+  {"entries": {"<selector>": {"fetched_at": <epoch>, "topics": [...], "catalog_size": <n>}}}
+
+The selector should name everything the resolved list depends on (API host,
+client id, filter patterns); an entry written under another selector is
+ignored.
+"""
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+Catalog = List[Dict[str, Any]]
+
+
+class TopicCache:
+    """Resolved topic ids with a TTL, persisted per selector"""
+
+    def __init__(self, path: Optional[str], ttl: float, selector: str,
+                 select: Callable[[Catalog], List[str]]):
+        self.path = Path(path) if path else None
+        self.ttl = ttl
+        self.selector = selector
+        self.select = select
+        self.topics: List[str] = []
+        self.fetched_at: Optional[float] = None
+        self.stats = {
+            'cache_hits': 0,
+            'stale_hits': 0,
+            'refreshes': 0,
+            'refresh_failures': 0,
+            'changes': 0,
+            'catalog_size': 0,
+            'last_refresh_seconds': None
+        }
+        self._load()
+
+    # ---------- Persistence ----------
+    def _read_file(self) -> Dict[str, Any]:
+        try:
+            with self.path.open('r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _load(self):
+        if self.path is None:
+            return
+        entry = self._read_file().get('entries', {}).get(self.selector)
+        if isinstance(entry, dict) and isinstance(entry.get('topics'), list):
+            self.topics = [t for t in entry['topics'] if isinstance(t, str) and t]
+            self.fetched_at = float(entry.get('fetched_at') or 0)
+            self.stats['catalog_size'] = entry.get('catalog_size', 0)
+
+    def _save(self):
+        if self.path is None:
+            return
+        data = self._read_file()
+        entries = data.setdefault('entries', {})
+        entries[self.selector] = {
+            'fetched_at': self.fetched_at,
+            'topics': self.topics,
+            'catalog_size': self.stats['catalog_size']
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.path.with_name(self.path.name + '.tmp')
+        with temp.open('w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp, self.path)
+
+    # ---------- Resolution ----------
+    @property
+    def age(self) -> Optional[float]:
+        return None if self.fetched_at is None else max(0.0, time.time() - self.fetched_at)
+
+    @property
+    def fresh(self) -> bool:
+        return self.fetched_at is not None and self.age < self.ttl
+
+    def time_until_stale(self) -> float:
+        return 0.0 if self.fetched_at is None else max(0.0, self.ttl - self.age)
+
+    async def refresh(self, fetch: Callable[[], Awaitable[Catalog]]) -> bool:
+        """Refetch the catalog and re-run the filter; returns whether the topic list changed"""
+        started = time.monotonic()
+        try:
+            catalog = await fetch()
+        except Exception:
+            self.stats['refresh_failures'] += 1
+            raise
+        topics = self.select(catalog)
+        if not topics and self.topics:
+            # An empty match is far more likely a partial catalog than every topic disappearing
+            self.stats['refresh_failures'] += 1
+            return False
+        self.stats['refreshes'] += 1
+        self.stats['catalog_size'] = len(catalog)
+        self.stats['last_refresh_seconds'] = round(time.monotonic() - started, 3)
+        changed = self.fetched_at is not None and topics != self.topics
+        if changed:
+            self.stats['changes'] += 1
+        self.topics = topics
+        self.fetched_at = time.time()
+        await asyncio.to_thread(self._save)
+        return changed
+
+    async def resolve(self, fetch: Callable[[], Awaitable[Catalog]]) -> List[str]:
+        """Cached topics if any exist (stale ones are refreshed by refresh_loop), else fetch now"""
+        if self.fresh:
+            self.stats['cache_hits'] += 1
+            return self.topics
+        if self.topics and self.ttl > 0:
+            self.stats['stale_hits'] += 1
+            return self.topics
+        await self.refresh(fetch)
+        return self.topics
+
+    async def refresh_loop(self, fetch: Callable[[], Awaitable[Catalog]],
+                           on_change: Callable[[List[str]], Awaitable[None]], retry_seconds: float = 300.0):
+        """Refetch whenever the entry expires; call on_change with the new list when it differs"""
+        while True:
+            await asyncio.sleep(self.time_until_stale())
+            try:
+                changed = await self.refresh(fetch)
+            except Exception:
+                await asyncio.sleep(min(retry_seconds, self.ttl))
+                continue
+            if changed:
+                await on_change(self.topics)
+            elif not self.fresh:
+                # The catalog was rejected (matched nothing): back off like a failed fetch
+                await asyncio.sleep(min(retry_seconds, self.ttl))
+
+    def snapshot(self) -> Dict[str, Any]:
+        age = self.age
+        return dict(
+            self.stats,
+            topics=len(self.topics),
+            age_seconds=round(age, 1) if age is not None else None,
+            ttl_seconds=self.ttl,
+            fresh=self.fresh
+        )
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Incremental sliding-window event statistics shared by both collectors
+
+The collectors' counters are lifetime totals; EventStats answers "what
+happened in the last 1m / 5m / 1h" per event code, severity, integration
+and topic without keeping or scanning events:
+
+- Events are counted into a dict for the current second, keyed by the
+  (code, severity, integration, topic) combination: one increment per
+  event. Whenever the second changes (or a snapshot is taken) those counts
+  are split per dimension and merged into one ring per window (60 x 1s,
+  60 x 5s, 60 x 60s buckets), so merging costs O(distinct combinations)
+  per second, not per event.
+- A ring slot remembers which bucket it holds and is cleared when reused,
+  so idle periods need no timer. A window is the sum of the ring buckets
+  still inside it: O(buckets) per read, independent of the event rate.
+  Window edges move in whole buckets (a 5m window spans 295-300s).
+- Noisy conversations and integrations are tracked with the space-saving
+  sketch (Metwally et al.): `capacity` counters, each estimate too high by
+  at most `error`. Two sketches rotate every `top_seconds`, so the ranking
+  covers the last one to two periods.
+
+Everything runs on the event loop; nothing here locks or blocks.
+"""
+
+import heapq
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+WINDOWS = (('1m', 1, 60), ('5m', 5, 60), ('1h', 60, 60))  # (name, bucket seconds, buckets)
+DIMENSIONS = ('event_code', 'severity', 'integration', 'topic')
+TOP_DIMENSIONS = ('conversation', 'integration')
+_TOTAL = (-1, None)
+_UNKNOWN = 'unknown'
+
+
+class Ring:
+    """Fixed number of time buckets of (dimension, value) counts"""
+
+    __slots__ = ('width', 'slots', 'epochs', 'counts')
+
+    def __init__(self, width: int, slots: int):
+        self.width = width
+        self.slots = slots
+        self.epochs = [-1] * slots
+        self.counts: List[Dict[Tuple[int, Any], int]] = [{} for _ in range(slots)]
+
+    def merge(self, second: int, counts: Dict[Tuple[int, Any], int]):
+        epoch = second // self.width
+        slot = epoch % self.slots
+        if self.epochs[slot] != epoch:
+            self.epochs[slot] = epoch
+            self.counts[slot] = dict(counts)
+            return
+        bucket = self.counts[slot]
+        for key, n in counts.items():
+            bucket[key] = bucket.get(key, 0) + n
+
+    def total(self, second: int) -> Dict[Tuple[int, Any], int]:
+        """Counts of the buckets that are still inside the window ending at `second`"""
+        oldest = second // self.width - self.slots
+        totals: Dict[Tuple[int, Any], int] = {}
+        for epoch, bucket in zip(self.epochs, self.counts):
+            if epoch > oldest:
+                for key, n in bucket.items():
+                    totals[key] = totals.get(key, 0) + n
+        return totals
+
+
+class SpaceSaving:
+    """Approximate heavy hitters over a stream with a fixed number of counters"""
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        self._heap: List[Tuple[int, int, Hashable]] = []  # (count, seq, item), one live entry per item
+        self._live: Dict[Hashable, int] = {}  # seq of each item's live heap entry
+        self._seq = 0
+
+    def add(self, item: Hashable):
+        counts = self.counts
+        if item in counts:
+            counts[item] += 1
+            return
+        if len(counts) < self.capacity:
+            floor = 0
+        else:
+            # Evict the smallest counter; entries whose count has grown since they were pushed are re-pushed
+            while True:
+                count, seq, victim = heapq.heappop(self._heap)
+                if self._live.get(victim) != seq:
+                    continue
+                if counts[victim] == count:
+                    break
+                self._push(counts[victim], victim)
+            floor = counts.pop(victim)
+            del self.errors[victim], self._live[victim]
+        counts[item] = floor + 1
+        self.errors[item] = floor
+        self._push(floor + 1, item)
+
+    def _push(self, count: int, item: Hashable):
+        self._seq += 1
+        self._live[item] = self._seq
+        heapq.heappush(self._heap, (count, self._seq, item))
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+
+class EventStats:
+    """Sliding-window counts per dimension plus top-K conversations and integrations"""
+
+    def __init__(self, top_k: int = 10, top_seconds: float = 300.0, clock=time.monotonic):
+        self.clock = clock
+        self.rings = [(name, Ring(width, slots)) for name, width, slots in WINDOWS]
+        self._second = int(clock())
+        self._current: Dict[Tuple[Any, ...], int] = {}  # (code, severity, integration, topic) -> count
+        self.top_k = top_k
+        self.top_seconds = top_seconds
+        self._top = self._new_sketches()
+        self._previous_top = self._new_sketches()
+        self._top_started = clock()
+        self.events = 0
+
+    def _new_sketches(self) -> Dict[str, SpaceSaving]:
+        return {name: SpaceSaving(self.top_k * 10) for name in TOP_DIMENSIONS} if self.top_k > 0 else {}
+
+    def record(self, event_code: Optional[str], severity: Optional[str], integration: Optional[str],
+               topic: Optional[str], conversation: Optional[str] = None):
+        """Count one event; missing values are counted as 'unknown'"""
+        now = self.clock()
+        second = int(now)
+        if second != self._second:
+            self._flush()
+            self._second = second
+        key = (event_code, severity, integration, topic)
+        current = self._current
+        current[key] = current.get(key, 0) + 1
+        self.events += 1
+
+        if self._top:
+            if now - self._top_started >= self.top_seconds:
+                self._rotate_top(now)
+            if conversation:
+                self._top['conversation'].add(conversation)
+            if integration:
+                self._top['integration'].add(integration)
+
+    def _rotate_top(self, now: float):
+        # After a whole idle period the previous sketch is stale as well
+        stale = now - self._top_started >= 2 * self.top_seconds
+        self._previous_top = self._new_sketches() if stale else self._top
+        self._top = self._new_sketches()
+        self._top_started = now
+
+    def _flush(self):
+        if self._current:
+            counts: Dict[Tuple[int, Any], int] = {}
+            for values, n in self._current.items():
+                counts[_TOTAL] = counts.get(_TOTAL, 0) + n
+                for dimension, value in enumerate(values):
+                    key = (dimension, value or _UNKNOWN)
+                    counts[key] = counts.get(key, 0) + n
+            for _, ring in self.rings:
+                ring.merge(self._second, counts)
+            self._current = {}
+
+    def window(self, name: str) -> Dict[str, Any]:
+        """Events in one window (1m, 5m or 1h): total, rate and per-dimension counts"""
+        self._flush()
+        second = int(self.clock())
+        for window_name, ring in self.rings:
+            if window_name == name:
+                break
+        else:
+            raise KeyError(name)
+        totals = ring.total(second)
+        seconds = ring.width * ring.slots
+        result: Dict[str, Any] = {
+            'seconds': seconds,
+            'events': totals.pop(_TOTAL, 0),
+        }
+        result['rate_per_second'] = round(result['events'] / seconds, 4)
+        for dimension in DIMENSIONS:
+            result[dimension] = {}
+        for (dimension, value), n in sorted(totals.items(), key=lambda item: -item[1]):
+            result[DIMENSIONS[dimension]][value] = n
+        return result
+
+    def top(self, dimension: str) -> List[Dict[str, Any]]:
+        """Largest estimated counts of the current and previous top-K period"""
+        if not self._top:
+            return []
+        now = self.clock()
+        if now - self._top_started >= self.top_seconds:
+            self._rotate_top(now)
+        counts: Dict[Hashable, int] = {}
+        errors: Dict[Hashable, int] = {}
+        for sketches in (self._previous_top, self._top):
+            sketch = sketches[dimension]
+            for item, n in sketch.counts.items():
+                counts[item] = counts.get(item, 0) + n
+                errors[item] = errors.get(item, 0) + sketch.errors[item]
+        ranked = heapq.nlargest(self.top_k, counts.items(), key=lambda item: item[1])
+        return [{'key': item, 'count': n, 'error': errors[item]} for item, n in ranked]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'events': self.events,
+            'windows': {name: self.window(name) for name, _ in self.rings},
+            'top': {dimension: self.top(dimension) for dimension in TOP_DIMENSIONS},
+            'top_k': self.top_k,
+            'top_seconds': self.top_seconds
+        }